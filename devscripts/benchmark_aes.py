@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the throughput of the native AES implementation
+
+The test/test_aes.py vectors are checked before the benchmark is run.
+Compares the native implementation with decrypting one list of bytes at a time
+using aes_decrypt/aes_encrypt and, if it is available, with pycryptodome
+"""
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import io
+import time
+import unittest
+
+from test.test_aes import TestAES
+from yt_dlp import aes
+from yt_dlp.dependencies import Cryptodome
+from yt_dlp.utils import bytes_to_intlist, intlist_to_bytes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        '--size', metavar='KIB', type=int, default=256,
+        help='Size of the data to decrypt in KiB (default: %(default)s)')
+    parser.add_argument(
+        '--repeat', metavar='N', type=int, default=3,
+        help='Number of times to run each benchmark (default: %(default)s)')
+    return parser.parse_args()
+
+
+def check_vectors():
+    result = unittest.TextTestRunner(stream=io.StringIO()).run(
+        unittest.defaultTestLoader.loadTestsFromTestCase(TestAES))
+    for test, traceback in result.failures + result.errors:
+        print(f'FAILED {test.id()}\n{traceback}', file=sys.stderr)
+    return result.wasSuccessful()
+
+
+def reference_cbc_decrypt(data, key, iv):
+    expanded_key = aes.key_expansion(bytes_to_intlist(key))
+    data, previous = bytes_to_intlist(data), bytes_to_intlist(iv)
+    decrypted = []
+    for i in range(0, len(data), aes.BLOCK_SIZE_BYTES):
+        block = data[i: i + aes.BLOCK_SIZE_BYTES]
+        decrypted += aes.xor(aes.aes_decrypt(block, expanded_key), previous)
+        previous = block
+    return intlist_to_bytes(decrypted)
+
+
+def reference_ctr_decrypt(data, key, iv):
+    expanded_key = aes.key_expansion(bytes_to_intlist(key))
+    data, counter = bytes_to_intlist(data), int.from_bytes(iv, 'big')
+    decrypted = []
+    for i in range(0, len(data), aes.BLOCK_SIZE_BYTES):
+        counter_block = bytes_to_intlist(counter.to_bytes(aes.BLOCK_SIZE_BYTES, 'big'))
+        decrypted += aes.xor(data[i: i + aes.BLOCK_SIZE_BYTES], aes.aes_encrypt(counter_block, expanded_key))
+        counter += 1
+    return intlist_to_bytes(decrypted)
+
+
+def gcm_decrypt(data, key, nonce):
+    # The tag is not known, but it is only checked after the data has been decrypted and hashed
+    try:
+        aes._gcm_decrypt_and_verify(data, key, bytes(aes.BLOCK_SIZE_BYTES), nonce)
+    except ValueError:
+        pass
+
+
+def benchmark(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    args = parse_args()
+    if not check_vectors():
+        sys.exit('The test/test_aes.py vectors do not pass')
+
+    data = os.urandom(args.size * 1024)
+    key, iv = os.urandom(aes.BLOCK_SIZE_BYTES), os.urandom(aes.BLOCK_SIZE_BYTES)
+    if aes._cbc_decrypt(data, key, iv) != reference_cbc_decrypt(data, key, iv):
+        sys.exit('CBC decryption does not match the reference')
+    if aes._ctr_crypt(data, key, iv) != reference_ctr_decrypt(data, key, iv):
+        sys.exit('CTR decryption does not match the reference')
+
+    benchmarks = {
+        'CBC': {
+            'reference': lambda: reference_cbc_decrypt(data, key, iv),
+            'native': lambda: aes._cbc_decrypt(data, key, iv),
+        },
+        'CTR': {
+            'reference': lambda: reference_ctr_decrypt(data, key, iv),
+            'native': lambda: aes._ctr_crypt(data, key, iv),
+        },
+        'GCM': {
+            'native': lambda: gcm_decrypt(data, key, iv[:12]),
+        },
+    }
+    if Cryptodome.AES:
+        benchmarks['CBC']['pycryptodome'] = lambda: Cryptodome.AES.new(key, Cryptodome.AES.MODE_CBC, iv).decrypt(data)
+        benchmarks['CTR']['pycryptodome'] = lambda: Cryptodome.AES.new(
+            key, Cryptodome.AES.MODE_CTR, nonce=b'', initial_value=iv).decrypt(data)
+        benchmarks['GCM']['pycryptodome'] = lambda: Cryptodome.AES.new(
+            key, Cryptodome.AES.MODE_GCM, iv[:12]).decrypt(data)
+
+    print(f'Decrypting {args.size}KiB')
+    for mode, funcs in benchmarks.items():
+        for name, func in funcs.items():
+            seconds = benchmark(func, args.repeat)
+            print(f'{mode} {name:<14} {seconds * 1000:10.1f}ms {args.size / 1024 / seconds:10.2f}MiB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the detection of embeds in the _WEBPAGE_TESTS webpages
+
+Compares running every _EMBED_REGEX of every extractor on each webpage
+against only running those of the extractors chosen by YoutubeDL._iter_embed_ies,
+which searches for each required literal with a substring search, and by
+a single alternation regex of all the required literals
+"""
+
+# Allow direct execution
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import argparse
+import hashlib
+import re
+import time
+
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor import gen_extractor_classes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        '--cache-dir', metavar='DIR', default='.cache/webpage_tests',
+        help='Directory to cache the downloaded webpages in (default: %(default)s)')
+    parser.add_argument(
+        '--repeat', metavar='N', type=int, default=5,
+        help='Number of times to run each benchmark (default: %(default)s)')
+    parser.add_argument(
+        'files', nargs='*', metavar='FILE',
+        help='HTML files to use instead of the _WEBPAGE_TESTS webpages')
+    return parser.parse_args()
+
+
+def get_webpages(ydl, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    for ie in gen_extractor_classes():
+        for test in ie.get_webpage_testcases():
+            url = test['url']
+            filename = os.path.join(cache_dir, f'{hashlib.md5(url.encode()).hexdigest()}.html')
+            if not os.path.exists(filename):
+                try:
+                    with ydl.urlopen(url) as response:
+                        data = response.read()
+                except Exception as e:
+                    print(f'Skipping {url}: {e}', file=sys.stderr)
+                    continue
+                with open(filename, 'wb') as f:
+                    f.write(data)
+            with open(filename, 'rb') as f:
+                yield url, f.read().decode('utf-8', 'replace')
+
+
+def find_embeds(ies, url, webpage):
+    # Only the extractors that use _EMBED_REGEX can be run without network access
+    return [embed for _, ie in ies if ie._get_embed_literals() is not None
+            for embed in ie._extract_embed_urls(url, webpage)]
+
+
+class AlternationIndex:
+    """Chooses the extractors like YoutubeDL._iter_embed_ies, but finds the literals with one regex"""
+
+    def __init__(self, ydl):
+        self._index = [
+            (ie_key, ie, literals) for ie_key, ie in ydl._ies.items()
+            for literals in [ie._get_embed_literals()] if literals != ()]
+        literals = {literal for _, _, ie_literals in self._index for literal in ie_literals or ()}
+        # Longest first, so that a literal is not hidden by a shorter one that is its prefix
+        self._regex = re.compile('|'.join(map(re.escape, sorted(literals, key=len, reverse=True))))
+
+    def iter_embed_ies(self, webpage):
+        found = set(self._regex.findall(webpage))
+        for ie_key, ie, literals in self._index:
+            if literals is None or not found.isdisjoint(literals):
+                yield ie_key, ie
+
+
+def benchmark(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    args = parse_args()
+    ydl = YoutubeDL({'quiet': True})
+
+    if args.files:
+        webpages = []
+        for filename in args.files:
+            with open(filename, 'rb') as f:
+                webpages.append((f'file:{filename}', f.read().decode('utf-8', 'replace')))
+    else:
+        webpages = list(get_webpages(ydl, args.cache_dir))
+
+    # Compile the regexes and build the indexes beforehand
+    alternation = AlternationIndex(ydl)
+    for url, webpage in webpages:
+        find_embeds(ydl._ies.items(), url, webpage)
+        find_embeds(ydl._iter_embed_ies(webpage), url, webpage)
+        find_embeds(alternation.iter_embed_ies(webpage), url, webpage)
+
+    total_linear = total_indexed = total_alternation = total_size = 0
+    print(f'{"All":>11} {"Indexed":>11} {"Regex":>11} {"Size":>12}')
+    for url, webpage in webpages:
+        linear, expected = benchmark(lambda: find_embeds(ydl._ies.items(), url, webpage), args.repeat)
+        indexed, result = benchmark(lambda: find_embeds(ydl._iter_embed_ies(webpage), url, webpage), args.repeat)
+        if result != expected:
+            print(f'MISMATCH for {url}: {result} != {expected}', file=sys.stderr)
+        regex, result = benchmark(lambda: find_embeds(alternation.iter_embed_ies(webpage), url, webpage), args.repeat)
+        if result != expected:
+            print(f'MISMATCH (regex) for {url}: {result} != {expected}', file=sys.stderr)
+        total_linear += linear
+        total_indexed += indexed
+        total_alternation += regex
+        total_size += len(webpage)
+        print(f'{linear * 1000:9.2f}ms {indexed * 1000:9.2f}ms {regex * 1000:9.2f}ms '
+              f'{len(webpage) / 1024:9.0f}KiB  {url}')
+
+    print(f'\n{len(webpages)} webpages ({total_size / 1024 / 1024:.1f}MiB)')
+    print(f'All extractors: {total_linear * 1000:.1f}ms')
+    print(f'Indexed:        {total_indexed * 1000:.1f}ms ({total_linear / (total_indexed or 1):.1f}x faster)')
+    print(f'Regex:          {total_alternation * 1000:.1f}ms ({total_linear / (total_alternation or 1):.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
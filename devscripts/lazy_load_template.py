@@ -6,6 +6,8 @@
     age_restricted,
     bug_reports_message,
     classproperty,
+    required_literals,
+    url_host_labels,
     variadic,
     write_string,
 )
@@ -18,12 +18,15 @@
     '_WORKING', 'IE_DESC', '_NETRC_MACHINE', 'SEARCH_KEY',  # Used for --extractor-descriptions
     'age_limit',  # Used for --age-limit (evaluated)
     '_RETURN_TYPE',  # Accessed in CLI only with instance (evaluated)
+    '_HOST_LABELS',  # Used for URL dispatch (evaluated)
+    '_EMBED_LITERALS',  # Used for finding embeds in generic webpages (evaluated)
 ]
 CLASS_METHODS = [
-    'ie_key', 'suitable', '_match_valid_url',  # Used for URL matching
+    'ie_key', 'suitable', '_match_valid_url', '_get_host_labels',  # Used for URL matching
     'working', 'get_temp_id', '_match_id',  # Accessed just before instance creation
     'description',  # Used for --extractor-descriptions
     'is_suitable',  # Used for --age-limit
+    '_get_embed_literals',  # Used for finding embeds in generic webpages
     'supports_login', 'is_single_video',  # Accessed in CLI only with instance
 ]
 IE_TEMPLATE = '''
@@ -46,7 +49,8 @@ def main():
     # Filter out plugins
     _ALL_CLASSES = [cls for cls in _ALL_CLASSES if not cls.__module__.startswith(f'{yt_dlp.plugins.PACKAGE_NAME}.')]
 
-    DummyInfoExtractor = type('InfoExtractor', (InfoExtractor,), {'IE_NAME': NO_ATTR})
+    DummyInfoExtractor = type('InfoExtractor', (InfoExtractor,), {
+        'IE_NAME': NO_ATTR, '_HOST_LABELS': NO_ATTR, '_EMBED_LITERALS': NO_ATTR})
     module_src = '\n'.join((
         MODULE_TEMPLATE,
         '    _module = None',
@@ -88,6 +92,9 @@ def extra_ie_code(ie, base=None):
 def build_ies(ies, bases, attr_base):
     names = []
     for ie in sort_ies(ies, bases):
+        # Cache the values in the class
+        ie._get_host_labels()
+        ie._get_embed_literals()
         yield build_lazy_ie(ie, ie.__name__, attr_base)
         if ie in ies:
             names.append(ie.__name__)
@@ -10,6 +10,10 @@
 
 import copy
 import json
+import shutil
+import tempfile
+import threading
+import time
 
 from test.helper import FakeYDL, assertRegexpMatches, try_rm
 from yt_dlp import YoutubeDL
@@ -18,8 +22,11 @@
 from yt_dlp.extractor.common import InfoExtractor
 from yt_dlp.postprocessor.common import PostProcessor
 from yt_dlp.utils import (
+    DownloadCancelled,
+    ExistingVideoReached,
     ExtractorError,
     LazyList,
+    MaxDownloadsReached,
     OnDemandPagedList,
     int_or_none,
     match_filter_func,
@@ -1147,6 +1154,38 @@ def _real_extract(self, url):
         self.assertEqual(downloaded['extractor'], 'testex')
         self.assertEqual(downloaded['extractor_key'], 'TestEx')
 
+    def test_iter_embed_ies(self):
+        ydl = YDL()
+
+        class FooIE(InfoExtractor):
+            _VALID_URL = False
+            _EMBED_REGEX = [r'<iframe[^>]+src="(?P<url>https?://foo\.example/embed/\d+)"']
+
+        class BarIE(InfoExtractor):
+            _VALID_URL = False
+            _EMBED_REGEX = [r'<video[^>]+data-bar="(?P<url>[^"]+)"', r'<bar-player\s+url="(?P<url>[^"]+)"']
+
+        class BazIE(InfoExtractor):
+            _VALID_URL = False
+
+            @classmethod
+            def _extract_embed_urls(cls, url, webpage):
+                return []
+
+        class QuxIE(InfoExtractor):
+            _VALID_URL = False
+
+        for ie in (FooIE, BarIE, BazIE, QuxIE):
+            ydl.add_info_extractor(ie)
+
+        def embed_ies(webpage):
+            return [ie_key for ie_key, _ in ydl._iter_embed_ies(webpage)]
+
+        self.assertEqual(embed_ies('<iframe src="https://foo.example/embed/1">'), ['Foo', 'Baz'])
+        self.assertEqual(embed_ies('<video data-bar="x"><bar-player url="y">'), ['Bar', 'Baz'])
+        self.assertEqual(embed_ies('<iframe src="https://foo.example/embed/1"><bar-player url="y">'), ['Foo', 'Bar', 'Baz'])
+        self.assertEqual(embed_ies(''), ['Baz'])
+
     # Test case for https://github.com/ytdl-org/youtube-dl/issues/27064
     def test_ignoreerrors_for_playlist_with_url_transparent_iterable_entries(self):
 
@@ -1218,6 +1257,304 @@ def _real_extract(self, url):
         self.assertEqual(downloaded['extractor'], 'Video')
         self.assertEqual(downloaded['extractor_key'], 'Video')
 
+    def test_concurrent_downloads(self):
+        barrier = threading.Barrier(3, timeout=10)
+
+        class VideoIE(InfoExtractor):
+            _VALID_URL = r'video:(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                if int(video_id) <= 3:
+                    # Fails unless the first 3 URLs are extracted concurrently
+                    barrier.wait()
+                return {
+                    'id': video_id,
+                    'title': 'Video %s' % video_id,
+                    'url': TEST_URL,
+                }
+
+        def run(params, count=3, archive=None):
+            archive = set() if archive is None else archive
+            ydl = YoutubeDL({
+                'simulate': True,
+                'quiet': True,
+                'force_write_download_archive': True,
+                'download_archive': archive,
+                'concurrent_downloads': 3,
+                **params,
+            }, auto_init=False)
+            ydl.add_info_extractor(VideoIE(ydl))
+            barrier.reset()
+            ydl.download([f'video:{i}' for i in range(1, count + 1)])
+            return archive
+
+        self.assertEqual(run({}), {'video 1', 'video 2', 'video 3'})
+        self.assertEqual(run({}, 6), {f'video {i}' for i in range(1, 7)})
+
+        archive = set()
+        with self.assertRaises(MaxDownloadsReached):
+            run({'max_downloads': 4}, 10, archive)
+        self.assertEqual(len(archive), 4)
+
+        with self.assertRaises(ExistingVideoReached):
+            run({'break_on_existing': True}, archive={'video 1'})
+
+        class PlaylistIE(InfoExtractor):
+            _VALID_URL = r'playlist:(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                playlist_id = self._match_id(url)
+                return self.playlist_result([
+                    self.url_result(f'video:{video_id}', VideoIE)
+                    for video_id in (playlist_id, *(f'{playlist_id}{i}' for i in range(4, 7)))], playlist_id)
+
+        # With break_per_url, max_downloads is counted separately for each of the concurrent URLs
+        archive = set()
+        ydl = YoutubeDL({
+            'simulate': True,
+            'quiet': True,
+            'force_write_download_archive': True,
+            'download_archive': archive,
+            'concurrent_downloads': 3,
+            'max_downloads': 2,
+            'break_per_url': True,
+        }, auto_init=False)
+        ydl.add_info_extractor(PlaylistIE(ydl))
+        ydl.add_info_extractor(VideoIE(ydl))
+        barrier.reset()
+        ydl.download([f'playlist:{i}' for i in range(1, 4)])
+        self.assertEqual(archive, {f'video {i}{j}' for i in range(1, 4) for j in ('', '4')})
+
+        # The progress of the concurrent URLs is printed on new lines
+        progress_params = []
+        ydl = YoutubeDL({'simulate': True, 'quiet': True, 'concurrent_downloads': 3}, auto_init=False)
+        ydl.add_info_extractor(VideoIE(ydl))
+        ydl.process_info = lambda _: progress_params.append(ydl._progress_params().get('progress_with_newline'))
+        barrier.reset()
+        ydl.download([f'video:{i}' for i in range(1, 4)])
+        self.assertEqual(progress_params, [True] * 3)
+        self.assertIsNone(ydl._progress_params().get('progress_with_newline'))
+
+    def test_download_cancelled_checker(self):
+        ydl = YDL()
+        cancelled = False
+        ydl._thread_state.formats_cancelled = lambda: cancelled
+        check = ydl._download_cancelled_checker()
+        del ydl._thread_state.formats_cancelled
+        errors = []
+
+        def run():
+            try:
+                check()
+            except DownloadCancelled as e:
+                errors.append(e)
+
+        # The cancellation of the downloads of a thread is seen by the threads that download its fragments
+        for cancelled in (False, True):
+            thread = threading.Thread(target=run)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(errors), 1)
+        ydl._check_download_cancelled()
+
+    def test_concurrent_playlist_entries(self):
+        barrier = threading.Barrier(3, timeout=10)
+
+        class _YDL(YDL):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.errors = []
+
+            def trouble(self, message=None, tb=None, is_error=True):
+                self.errors.append(message)
+
+        class VideoIE(InfoExtractor):
+            _VALID_URL = r'video:(?P<id>\d+)'
+
+            def _real_extract(self, url):
+                video_id = self._match_id(url)
+                if int(video_id) <= 3:
+                    # Fails unless the first 3 entries are extracted concurrently
+                    barrier.wait()
+                if video_id in ('2', '3'):
+                    raise ExtractorError('foo', expected=True)
+                return {
+                    'id': video_id,
+                    'title': 'Video %s' % video_id,
+                    'url': TEST_URL,
+                }
+
+        class PlaylistIE(InfoExtractor):
+            _VALID_URL = r'playlist:'
+
+            def _real_extract(self, url):
+                return self.playlist_result(
+                    self.url_result(f'video:{i}', VideoIE) for i in range(1, 11))
+
+        def run(params):
+            ydl = _YDL({'concurrent_playlist_entries': 3, 'ignoreerrors': True, **params})
+            ydl.add_info_extractor(VideoIE(ydl))
+            ydl.add_info_extractor(PlaylistIE(ydl))
+            barrier.reset()
+            return ydl, ydl.extract_info('playlist:')
+
+        ydl, info = run({})
+        self.assertEqual(len(ydl.errors), 2)
+        self.assertEqual([traverse_obj(entry, 'id') for entry in info['entries']],
+                         ['1', None, None, '4', '5', '6', '7', '8', '9', '10'])
+        self.assertEqual(
+            sorted((int(info['id']), info['playlist_index'], info['playlist_autonumber'])
+                   for info in ydl.downloaded_info_dicts),
+            [(i, i, i) for i in (1, 4, 5, 6, 7, 8, 9, 10)])
+
+        ydl, info = run({'skip_playlist_after_errors': 2})
+        self.assertEqual(len(ydl.errors), 3)
+        self.assertIn('Skipping the remaining entries', ydl.errors[-1])
+        self.assertEqual([traverse_obj(entry, 'id') for entry in info['entries'][:2]], ['1', None])
+        self.assertEqual([entry['_type'] for entry in info['entries'][2:]], ['url'] * 8)
+
+    def test_postprocessor_workers(self):
+        events = []
+
+        class _YDL(YoutubeDL):
+            def dl(self, name, info, *args, **kwargs):
+                with open(name, 'w') as f:
+                    f.write('EXAMPLE')
+                events.append(('dl', info['id']))
+                return True, True
+
+            def to_stdout(self, message, *args, **kwargs):
+                dumped.append(json.loads(message))
+
+        class Archive(set):
+            def add(self, vid_id):
+                events.append(('archive', vid_id.split()[-1]))
+                super().add(vid_id)
+
+        class SlowPP(PostProcessor):
+            def run(self, info):
+                # The later videos finish post-processing first, unless they are waited for
+                time.sleep((4 - int(info['id'])) * 0.05)
+                events.append(('pp', info['id']))
+                return [], info
+
+        class AfterVideoPP(PostProcessor):
+            def run(self, info):
+                # A new dict, which replaces the one returned by process_video_result
+                return [], {**info, 'after_video': True}
+
+        class PlaylistPP(PostProcessor):
+            def run(self, info):
+                playlist_entries.extend(info['entries'])
+                return [], info
+
+        class PlaylistIE(InfoExtractor):
+            _VALID_URL = r'playlist:'
+
+            def _real_extract(self, url):
+                return self.playlist_result({
+                    'id': str(i),
+                    'title': f'Video {i}',
+                    'url': TEST_URL,
+                    'ext': 'mp4',
+                } for i in range(1, 4))
+
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+
+        playlist_entries, dumped = [], []
+
+        def run(workers):
+            events.clear()
+            playlist_entries.clear()
+            dumped.clear()
+            ydl = _YDL({
+                'outtmpl': os.path.join(test_dir, f'{workers}-%(id)s.%(ext)s'),
+                'quiet': True,
+                'fixup': 'never',
+                'download_archive': Archive(),
+                'post_hooks': [lambda filepath: events.append(('hook', os.path.basename(filepath)[2]))],
+                'postprocessor_workers': workers,
+                'dump_single_json': True,
+            }, auto_init=False)
+            ydl.add_info_extractor(PlaylistIE(ydl))
+            ydl.add_post_processor(SlowPP(ydl))
+            ydl.add_post_processor(AfterVideoPP(ydl), when='after_video')
+            ydl.add_post_processor(PlaylistPP(ydl), when='playlist')
+            ydl.download(['playlist:'])
+            ydl.close()
+            # The playlist post-processors see the post-processed entries
+            self.assertEqual(
+                [(entry.get('after_video'), traverse_obj(entry, ('requested_downloads', 0, 'filepath')))
+                 for entry in playlist_entries],
+                [(True, os.path.join(test_dir, f'{workers}-{vid}.mp4')) for vid in '123'])
+            self.assertEqual(traverse_obj(dumped, (0, 'entries', ..., 'after_video')), [True] * 3)
+            self.assertCountEqual(events, [(event, vid) for vid in '123' for event in ('dl', 'pp', 'hook', 'archive')])
+            for event in ('dl', 'hook', 'archive'):
+                self.assertEqual([vid for name, vid in events if name == event], ['1', '2', '3'])
+            return events.index(('dl', '2')) < events.index(('pp', '1'))
+
+        self.assertFalse(run(0))
+        self.assertTrue(run(3))
+
+    def test_concurrent_formats(self):
+        barrier = threading.Barrier(2, timeout=10)
+        events = []
+
+        class _YDL(YDL):
+            fail = False
+
+            def process_info(self, info_dict):
+                return YoutubeDL.process_info(self, info_dict)
+
+            def dl(self, name, info, *args, **kwargs):
+                # Fails unless the formats are downloaded concurrently
+                barrier.wait()
+                if info['format_id'] == 'audio' and self.fail:
+                    events.append('failed')
+                    return False, True
+                elif self.fail:
+                    while True:
+                        try:
+                            self._check_download_cancelled()
+                        except DownloadCancelled:
+                            events.append('cancelled')
+                            raise
+                        time.sleep(0.01)
+                with open(name, 'w') as f:
+                    f.write('EXAMPLE')
+                events.append(info['format_id'])
+                return True, True
+
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        info = _make_result([
+            {'format_id': 'video', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'url': TEST_URL},
+            {'format_id': 'audio', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a', 'url': TEST_URL},
+        ])
+
+        def run(fail):
+            events.clear()
+            barrier.reset()
+            ydl = _YDL({
+                'format': 'video+audio',
+                'outtmpl': os.path.join(test_dir, f'{fail}-%(id)s.%(ext)s'),
+                'ignoreerrors': True,
+                'fixup': 'never',
+            })
+            ydl.fail = fail
+            ydl.report_warning = lambda *_, **__: None
+            ydl.process_ie_result(copy.deepcopy(info))
+            return ydl
+
+        run(False)
+        self.assertCountEqual(events, ['video', 'audio'])
+        self.assertLessEqual({'False-testid.fvideo.mp4', 'False-testid.faudio.m4a'}, set(os.listdir(test_dir)))
+
+        run(True)
+        self.assertEqual(events, ['failed', 'cancelled'])
+
     def test_header_cookies(self):
         from http.cookiejar import Cookie
 
@@ -1322,6 +1659,84 @@ def test(initial_info, note):
 
         try_rm(TEST_FILE)
 
+    def test_infojson_stream_comments(self):
+        TEST_FILE = 'test_infojson_stream_comments.info.json'
+        COMMENTS = [{'id': str(i), 'text': f'comment {i}', 'parent': 'root', 'like_count': None} for i in range(3)]
+
+        class CommentsIE(InfoExtractor):
+            def _get_comments(self):
+                yield from COMMENTS
+
+        for stream_comments in (False, True):
+            with self.subTest(stream_comments=stream_comments):
+                ydl = FakeYDL({'getcomments': True, 'stream_comments': stream_comments, 'writeinfojson': True})
+                ydl.process_info = lambda x: ydl._write_info_json('test', x, TEST_FILE)
+                self.addCleanup(try_rm, TEST_FILE)
+                info = ydl.process_ie_result(_make_result(
+                    [{'url': TEST_URL}], __post_extractor=CommentsIE(ydl).extract_comments()))
+
+                self.assertEqual(info['comment_count'], 3)
+                self.assertEqual(ydl.evaluate_outtmpl('%(comments.1.text)s %(comments)j', info),
+                                 f'comment 1 {json.dumps(COMMENTS)}')
+                with open(TEST_FILE, encoding='utf-8') as f:
+                    loaded = json.load(f)
+                self.assertEqual(loaded['comments'], [{k: v for k, v in c.items() if v is not None} for c in COMMENTS])
+                self.assertEqual(loaded['comment_count'], 3)
+
+    def test_extraction_cache(self):
+        TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'extraction_cache_test')
+        calls = []
+
+        class CachedIE(InfoExtractor):
+            _VALID_URL = r'cached:(?P<id>\w+)'
+
+            def _real_extract(self, url):
+                calls.append(url)
+                return {'id': self._match_id(url), 'title': 'title', 'formats': [{'url': TEST_URL, 'ext': 'mp4'}]}
+
+        def extract(url, **params):
+            ydl = FakeYDL({'cachedir': TEST_DIR, 'extraction_cache': 24 * 60 * 60, **params})
+            ydl.add_info_extractor(CachedIE())
+            return ydl.extract_info(url, download=False)
+
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, TEST_DIR, ignore_errors=True)
+        self.assertEqual(extract('cached:a')['url'], TEST_URL)
+        self.assertEqual(extract('cached:a')['url'], TEST_URL)
+        self.assertEqual(calls, ['cached:a'])
+        extract('cached:b')
+        extract('cached:a', extraction_cache=None)
+        self.assertEqual(calls, ['cached:a', 'cached:b', 'cached:a'])
+
+        # The information is not reused when downloading
+        ydl = FakeYDL({'cachedir': TEST_DIR, 'extraction_cache': 24 * 60 * 60, 'simulate': False})
+        ydl.add_info_extractor(CachedIE())
+        ydl.extract_info('cached:a', process=False)
+        self.assertEqual(len(calls), 4)
+        extract('cached:a', simulate=True)
+        self.assertEqual(len(calls), 4)
+
+        # Nor after the format URLs expire
+        key = ydl._extraction_cache_key(CachedIE, 'a')
+        cached = ydl.cache.load('extraction-results', key)
+        cached['info']['formats'][0]['url'] = f'{TEST_URL}?expire={int(time.time()) + 60}'
+        ydl.cache.store('extraction-results', key, cached)
+        extract('cached:a')
+        self.assertEqual(len(calls), 4)
+        cached['info']['formats'][0]['url'] = f'{TEST_URL}?expire={int(time.time()) - 60}'
+        ydl.cache.store('extraction-results', key, cached)
+        extract('cached:a')
+        self.assertEqual(len(calls), 5)
+
+        # The params that change the result of the extractor are part of the key
+        extract('cached:a', getcomments=True)
+        self.assertEqual(len(calls), 6)
+        ydl_with_args = FakeYDL({'extractor_args': {'cached': {'client': ['tv']}}})
+        self.assertNotEqual(
+            ydl._extraction_cache_key(CachedIE, 'a'), ydl_with_args._extraction_cache_key(CachedIE, 'a'))
+        # The results are not kept in memory
+        self.assertFalse([key for key in ydl.cache._memory if key[0] == 'extraction-results'])
+
     def test_add_headers_cookie(self):
         def check_for_cookie_header(result):
             return traverse_obj(result, ((None, ('formats', 0)), 'http_headers', 'Cookie'), casesense=False, get_all=False)
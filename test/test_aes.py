@@ -25,6 +25,7 @@
     aes_gcm_decrypt_and_verify_bytes,
     key_expansion,
     pad_block,
+    xor,
 )
 from yt_dlp.dependencies import Cryptodome
 from yt_dlp.utils import bytes_to_intlist, intlist_to_bytes
@@ -83,6 +84,41 @@ def test_gcm_decrypt(self):
                 data, intlist_to_bytes(self.key), authentication_tag, intlist_to_bytes(self.iv[:12]))
             self.assertEqual(decrypted.rstrip(b'\x08'), self.secret_msg)
 
+    def test_gcm_decrypt_aligned(self):
+        # Test Case 3 of "The Galois/Counter Mode of Operation (GCM)" by McGrew and Viega
+        key = bytes.fromhex('feffe9928665731c6d6a8f9467308308')
+        nonce = bytes.fromhex('cafebabefacedbaddecaf888')
+        data = bytes.fromhex(
+            '42831ec2217774244b7221b784d0d49ce3aa212f2c02a4e035c17e2329aca12e'
+            '21d514b25466931c7d8f6a5aac84aa051ba30b396a0aac973d58e091473f5985')
+        authentication_tag = bytes.fromhex('4d5c2af327cd64a62cf35abd2ba6fab4')
+        secret_msg = bytes.fromhex(
+            'd9313225f88406e5a55909c5aff5269a86a7a9531534f7da2e4c303d8a318a72'
+            '1c3c0c95956809532fcf0e2449a6b525b16aedf5aa0de657ba637b391aafd255')
+
+        decrypted = intlist_to_bytes(aes_gcm_decrypt_and_verify(*map(
+            bytes_to_intlist, (data, key, authentication_tag, nonce))))
+        self.assertEqual(decrypted, secret_msg)
+        self.assertEqual(aes_gcm_decrypt_and_verify_bytes(data, key, authentication_tag, nonce), secret_msg)
+        with self.assertRaises(ValueError):
+            aes_gcm_decrypt_and_verify_bytes(data, key, bytes(16), nonce)
+
+    def test_key_sizes(self):
+        data = bytes_to_intlist(self.secret_msg[:16] * 3)
+        for key_size in (16, 24, 32):
+            key = list(range(key_size))
+            expanded_key = key_expansion(key)
+            encrypted = aes_cbc_encrypt(data, key, self.iv)
+            self.assertEqual(encrypted[:16], aes_encrypt(xor(data[:16], self.iv), expanded_key), key_size)
+            self.assertEqual(aes_cbc_decrypt(encrypted, key, self.iv), data, key_size)
+            self.assertEqual(
+                aes_cbc_decrypt_bytes(intlist_to_bytes(encrypted), intlist_to_bytes(key), intlist_to_bytes(self.iv)),
+                intlist_to_bytes(data), key_size)
+
+            encrypted = aes_ctr_encrypt(data, key, self.iv)
+            self.assertEqual(encrypted[:16], xor(data[:16], aes_encrypt(self.iv, expanded_key)), key_size)
+            self.assertEqual(aes_ctr_decrypt(encrypted, key, self.iv), data, key_size)
+
     def test_decrypt_text(self):
         password = intlist_to_bytes(self.key).decode()
         encrypted = base64.b64encode(
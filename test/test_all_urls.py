@@ -11,7 +11,12 @@
 import collections
 
 from test.helper import gettestcases
-from yt_dlp.extractor import FacebookIE, YoutubeIE, gen_extractors
+from yt_dlp.extractor import (
+    FacebookIE,
+    YoutubeIE,
+    gen_extractors,
+    get_info_extractor,
+)
 
 
 class TestAllURLsMatching(unittest.TestCase):
@@ -82,6 +87,18 @@ def test_no_duplicates(self):
                         ie.suitable(url),
                         f'{type(ie).__name__} should not match URL {url!r} . That URL belongs to {tc["name"]}.')
 
+    def test_host_labels(self):
+        for tc in gettestcases(include_onlymatching=True):
+            url = tc['url']
+            if not url.startswith(('http://', 'https://')):
+                continue
+            labels = get_info_extractor(tc['name'])._get_host_labels()
+            if labels is not None:
+                host_labels = url.split('://', 1)[1].split('/', 1)[0].lower().split('.')
+                self.assertTrue(
+                    set(labels) & set(host_labels),
+                    f'{tc["name"]}IE host labels {labels} do not match URL {url!r}')
+
     def test_keywords(self):
         self.assertMatch(':ytsubs', ['youtube:subscriptions'])
         self.assertMatch(':ytsubscriptions', ['youtube:subscriptions'])
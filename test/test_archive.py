@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import shutil
+
+from yt_dlp.archive import (
+    SQLiteArchive,
+    TextArchive,
+    is_sqlite_archive,
+    open_download_archive,
+)
+from yt_dlp.dependencies import sqlite3
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'archive_test')
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.tearDown()
+        os.makedirs(TEST_DIR)
+
+    def tearDown(self):
+        if os.path.exists(TEST_DIR):
+            shutil.rmtree(TEST_DIR)
+
+    def _check_archive(self, archive_class, filename):
+        filename = os.path.join(TEST_DIR, filename)
+        with archive_class(filename) as archive:
+            self.assertNotIn('youtube abc', archive)
+            archive.add('youtube abc')
+            archive.update(['vimeo 123', 'youtube abc', 'vimeo 456'])
+            self.assertIn('youtube abc', archive)
+            self.assertIn('vimeo 456', archive)
+            self.assertNotIn('vimeo 789', archive)
+        with archive_class(filename) as archive:
+            self.assertIn('vimeo 123', archive)
+            self.assertEqual(set(archive), {'youtube abc', 'vimeo 123', 'vimeo 456'})
+
+            text_file = os.path.join(TEST_DIR, 'export.txt')
+            archive.export_text(text_file)
+        with TextArchive(os.path.join(TEST_DIR, 'import.txt')) as archive:
+            archive.import_text(text_file)
+            self.assertEqual(set(archive), {'youtube abc', 'vimeo 123', 'vimeo 456'})
+
+    def test_text_archive(self):
+        self._check_archive(TextArchive, 'archive.txt')
+        with open(os.path.join(TEST_DIR, 'archive.txt'), encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['youtube abc', 'vimeo 123', 'youtube abc', 'vimeo 456'])
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_sqlite_archive(self):
+        self._check_archive(SQLiteArchive, 'archive.sqlite')
+        with SQLiteArchive(os.path.join(TEST_DIR, 'archive.sqlite')) as archive:
+            self.assertEqual(list(archive), ['youtube abc', 'vimeo 123', 'vimeo 456'])
+
+    @unittest.skipUnless(sqlite3, 'sqlite3 is not available')
+    def test_open_download_archive(self):
+        def path(filename):
+            return os.path.join(TEST_DIR, filename)
+
+        self.assertFalse(is_sqlite_archive(path('archive.txt')))
+        self.assertTrue(is_sqlite_archive(path('archive.sqlite3')))
+        self.assertTrue(is_sqlite_archive(path('archive.DB')))
+
+        with open_download_archive(path('archive.db')) as archive:
+            self.assertIsInstance(archive, SQLiteArchive)
+            archive.add('youtube abc')
+        # An existing database is detected regardless of the extension
+        os.rename(path('archive.db'), path('archive.txt'))
+        self.assertTrue(is_sqlite_archive(path('archive.txt')))
+        with open_download_archive(path('archive.txt')) as archive:
+            self.assertIsInstance(archive, SQLiteArchive)
+            self.assertIn('youtube abc', archive)
+
+        with open(path('archive.sqlite'), 'w', encoding='utf-8') as f:
+            f.write('youtube abc\n')
+        with open_download_archive(path('archive.sqlite')) as archive:
+            self.assertIsInstance(archive, TextArchive)
+            self.assertIn('youtube abc', archive)
+
+
+if __name__ == '__main__':
+    unittest.main()
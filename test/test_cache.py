@@ -9,6 +9,8 @@
 
 
 import shutil
+import threading
+import time
 
 from test.helper import FakeYDL
 from yt_dlp.cache import Cache
@@ -52,6 +54,113 @@ def test_cache(self):
         self.assertFalse(os.path.exists(self.test_dir))
         self.assertEqual(c.load('test_cache', 'k.'), None)
 
+    def test_file_cache(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+            'compat_opts': ['file-cache'],
+        })
+        c = Cache(ydl)
+        c.store('test_cache', 'k.', [1])
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'test_cache', 'k..json')))
+        self.assertEqual(c.load('test_cache', 'k.'), [1])
+        self.assertEqual((c.hits, c.misses), (1, 0))
+
+    def test_file_cache_import(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        Cache(FakeYDL({'cachedir': self.test_dir, 'compat_opts': ['file-cache']})).store('test_cache', 'k.', [1])
+        fn = os.path.join(self.test_dir, 'test_cache', 'k..json')
+        # The entries of the old layout are moved into the database
+        c = Cache(ydl)
+        self.assertEqual(c.load('test_cache', 'k.'), [1])
+        self.assertFalse(os.path.exists(fn))
+        c.close()
+        self.assertEqual(Cache(ydl).load('test_cache', 'k.'), [1])
+
+        # Including those written before the version was stored
+        _mkdir(os.path.dirname(fn))
+        with open(os.path.join(self.test_dir, 'test_cache', 'k2.json'), 'w') as f:
+            f.write('[2]')
+        self.assertEqual(Cache(ydl).load('test_cache', 'k2', min_ver='2022.01.01'), [2])
+        self.assertEqual(Cache(ydl).load('test_cache', 'k2', min_ver='2023.01.01'), None)
+        self.assertTrue(_is_empty(os.path.dirname(fn)))
+
+    def test_cache_memory(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        c = Cache(ydl)
+        c.store('test_cache', 'k', [1])
+        self.assertIn('cache.sqlite3', os.listdir(self.test_dir))
+        self.assertNotIn('test_cache', os.listdir(self.test_dir))
+        # Loaded values can be modified without affecting the cache
+        c.load('test_cache', 'k').append(2)
+        self.assertEqual(c.load('test_cache', 'k'), [1])
+        c.close()
+        self.assertEqual(Cache(ydl).load('test_cache', 'k'), [1])
+        self.assertEqual(c.load('test_cache', 'k2', default=0), 0)
+        self.assertEqual((c.hits, c.misses), (2, 1))
+
+    def test_cache_eviction(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        c = Cache(ydl)
+        c._MAX_SIZE = 700  # 4 entries
+        for i in range(4):
+            c.store('test_cache', f'k{i}', 'x' * 100)
+        c._db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (time.time() + 1, 'k0'))
+        for i in range(4, 7):
+            c.store('test_cache', f'k{i}', 'x' * 100)
+        c._memory.clear()
+        self.assertEqual([c.load('test_cache', f'k{i}') is not None for i in range(7)],
+                         [True, False, False, False, True, True, True])
+
+        c._db.execute('UPDATE cache SET accessed = ? WHERE key = ?', (time.time() - c._MAX_AGE - 1, 'k4'))
+        c.store('test_cache', 'k7', 1)
+        c._memory.clear()
+        self.assertIsNone(c.load('test_cache', 'k4'))
+        self.assertEqual(c.load('test_cache', 'k7'), 1)
+
+    def test_cache_section_max_size(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+        c = Cache(ydl)
+        c._MAX_SIZE = 700  # 4 entries
+        c._SECTION_MAX_SIZE = {'large': 350}  # 2 entries
+        for i in range(4):
+            c.store('test_cache', f'k{i}', 'x' * 100)
+        for i in range(4):
+            c.store('large', f'k{i}', 'x' * 100)
+            time.sleep(0.01)
+        # The entries of the section are not kept in memory
+        self.assertEqual(list(c._memory), [('test_cache', f'k{i}') for i in range(4)])
+        c._memory.clear()
+        self.assertEqual([c.load('test_cache', f'k{i}') is not None for i in range(4)], [True] * 4)
+        self.assertEqual([c.load('large', f'k{i}') is not None for i in range(4)], [False, False, True, True])
+
+    def test_cache_concurrent(self):
+        ydl = FakeYDL({
+            'cachedir': self.test_dir,
+        })
+
+        def store(n):
+            c = Cache(ydl)
+            for i in range(20):
+                c.store('test_cache', f'{n}.{i}', [n, i])
+            c.close()
+
+        threads = [threading.Thread(target=store, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        c = Cache(ydl)
+        self.assertEqual([c.load('test_cache', f'{n}.{i}') for n in range(4) for i in range(20)],
+                         [[n, i] for n in range(4) for i in range(20)])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import concurrent.futures
+import glob
+import http.server
+import re
+import threading
+import time
+
+from test.helper import http_server_port, try_rm
+from yt_dlp import YoutubeDL
+from yt_dlp.aes import BLOCK_SIZE_BYTES, aes_cbc_encrypt_bytes
+from yt_dlp.dependencies import Cryptodome
+from yt_dlp.downloader.external import FFmpegFD
+from yt_dlp.downloader.fragment import _FragmentScheduler
+from yt_dlp.downloader.hls import HlsFD
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_FILE = os.path.join(TEST_DIR, 'testfile_fragment.mp4')
+
+FRAGMENT_COUNT = 20
+FRAGMENTS = [bytes([ord('A') + i]) * (1000 + i) for i in range(FRAGMENT_COUNT)]
+KEY = b'0123456789abcdef'
+IV = b'\x00' * 16
+
+
+def pkcs7_pad(data):
+    padding = BLOCK_SIZE_BYTES - len(data) % BLOCK_SIZE_BYTES
+    return data + bytes([padding]) * padding
+
+
+class DebugLogger:
+    def __init__(self):
+        self.messages = []
+
+    def debug(self, msg):
+        self.messages.append(msg)
+
+    info = warning = error = debug
+
+
+class HTTPTestRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Number of fragment requests that are being served at the same time
+    lock = threading.Lock()
+    active = max_active = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        encrypted = self.path.startswith('/encrypted/')
+        path = self.path[len('/encrypted'):] if encrypted else self.path
+        if path == '/index.m3u8':
+            content = ''.join((
+                '#EXTM3U\n#EXT-X-TARGETDURATION:4\n#EXT-X-MEDIA-SEQUENCE:0\n',
+                f'#EXT-X-KEY:METHOD=AES-128,URI="key",IV=0x{IV.hex()}\n' if encrypted else '',
+                *(f'#EXTINF:4.0,\n{i}.ts\n' for i in range(FRAGMENT_COUNT)),
+                '#EXT-X-ENDLIST\n')).encode()
+        elif path == '/key':
+            content = KEY
+        else:
+            index = int(path[1:-len('.ts')])
+            with self.lock:
+                HTTPTestRequestHandler.active += 1
+                HTTPTestRequestHandler.max_active = max(self.max_active, self.active)
+            # The first fragment is the slowest
+            time.sleep(0.5 if index == 0 else 0.01)
+            with self.lock:
+                HTTPTestRequestHandler.active -= 1
+            content = FRAGMENTS[index]
+            if encrypted:
+                content = aes_cbc_encrypt_bytes(pkcs7_pad(content), KEY, IV)
+        self.send_response(200)
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestFragmentFD(unittest.TestCase):
+    def setUp(self):
+        HTTPTestRequestHandler.max_active = 0
+        self.httpd = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), HTTPTestRequestHandler)
+        self.port = http_server_port(self.httpd)
+        self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        for filename in glob.glob(f'{glob.escape(TEST_FILE)}*'):
+            try_rm(filename)
+
+    def download(self, params, path='/index.m3u8'):
+        params.setdefault('logger', FakeLogger())
+        ydl = YoutubeDL(params)
+        downloader = HlsFD(ydl, params)
+        statuses = []
+        downloader.add_progress_hook(statuses.append)
+        self.assertTrue(downloader.real_download(TEST_FILE, {
+            'url': f'http://127.0.0.1:{self.port}{path}',
+            'protocol': 'm3u8_native',
+            'ext': 'mp4',
+        }))
+        with open(TEST_FILE, 'rb') as f:
+            self.assertEqual(f.read(), b''.join(FRAGMENTS))
+        return statuses
+
+    def test_sequential(self):
+        self.download({})
+        self.assertEqual(glob.glob(f'{glob.escape(TEST_FILE)}*'), [TEST_FILE])
+
+    def test_keep_fragments(self):
+        self.download({'keep_fragments': True})
+        self.assertEqual(len(glob.glob(f'{glob.escape(TEST_FILE)}.part-Frag*')), FRAGMENT_COUNT)
+
+    def test_concurrent(self):
+        logger = DebugLogger()
+        statuses = self.download({'concurrent_fragment_downloads': 4, 'verbose': True, 'logger': logger})
+        self.assertEqual(glob.glob(f'{glob.escape(TEST_FILE)}*'), [TEST_FILE])
+        # The other fragments are downloaded while waiting for the first one
+        max_depth = int(next(
+            mobj.group(1) for mobj in map(re.compile(r'Maximum fragment reorder buffer depth: (\d+)').search,
+                                          logger.messages) if mobj))
+        self.assertGreater(max_depth, 0)
+        self.assertLessEqual(max_depth, 4 * HlsFD._REORDER_WINDOW)
+        depths = [s['fragment_reorder_buffer_depth'] for s in statuses if 'fragment_reorder_buffer_depth' in s]
+        self.assertLessEqual(max(depths, default=0), 4 * HlsFD._REORDER_WINDOW)
+        self.assertGreater(HTTPTestRequestHandler.max_active, 1)
+
+    def test_deprecated_tpe(self):
+        class TpeHlsFD(HlsFD):
+            def download_and_append_fragments(self, *args, **kwargs):
+                with concurrent.futures.ThreadPoolExecutor(1) as tpe:
+                    return super().download_and_append_fragments(*args, **kwargs, tpe=tpe)
+
+        params = {'concurrent_fragment_downloads': 4, 'logger': FakeLogger()}
+        self.assertTrue(TpeHlsFD(YoutubeDL(params), params).real_download(TEST_FILE, {
+            'url': f'http://127.0.0.1:{self.port}/index.m3u8',
+            'protocol': 'm3u8_native',
+            'ext': 'mp4',
+        }))
+        with open(TEST_FILE, 'rb') as f:
+            self.assertEqual(f.read(), b''.join(FRAGMENTS))
+
+    def test_fragment_host_connections(self):
+        self.download({'concurrent_fragment_downloads': 4, 'fragment_host_connections': 1})
+        self.assertEqual(HTTPTestRequestHandler.max_active, 1)
+
+    @unittest.skipIf(not Cryptodome.AES and FFmpegFD.available(), 'ffmpeg would be used to decrypt the stream')
+    def test_concurrent_encrypted(self):
+        self.download({'concurrent_fragment_downloads': 4}, '/encrypted/index.m3u8')
+        self.assertEqual(glob.glob(f'{glob.escape(TEST_FILE)}*'), [TEST_FILE])
+
+
+class TestFragmentScheduler(unittest.TestCase):
+    def test_fair_queuing(self):
+        scheduler = _FragmentScheduler()
+        first, second = scheduler.open(1), scheduler.open(1)
+        started, release, order = threading.Event(), threading.Event(), []
+
+        def block():
+            started.set()
+            release.wait()
+
+        futures = [first.submit(block)]
+        self.assertTrue(started.wait(5))
+        # Only one thread, which is busy until all of these are queued
+        futures.extend(first.submit(order.append, 'first') for _ in range(3))
+        futures.extend(second.submit(order.append, 'second') for _ in range(3))
+        release.set()
+        for future in futures:
+            future.result(5)
+        self.assertEqual(order, ['second', 'first'] * 3)
+        first.close()
+        second.close()
+
+    def test_work_stealing(self):
+        scheduler = _FragmentScheduler()
+        first, second = scheduler.open(4), scheduler.open(4)
+        barrier = threading.Barrier(4, timeout=5)
+        # All the threads of the pool help the only download that has fragments left
+        futures = [second.submit(barrier.wait) for _ in range(4)]
+        for future in futures:
+            future.result(5)
+        self.assertEqual(scheduler._workers, 4)
+        first.close()
+        second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,25 +9,47 @@
 
 
 import http.server
+import io
+import json
 import re
 import threading
 
 from test.helper import http_server_port, try_rm
 from yt_dlp import YoutubeDL
 from yt_dlp.downloader.http import HttpFD
-from yt_dlp.utils import encodeFilename
+from yt_dlp.utils import DownloadError, encodeFilename
 from yt_dlp.utils._utils import _YDLLogger as FakeLogger
 
 TEST_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 TEST_SIZE = 10 * 1024
+TEST_DATA = bytes(i % 251 for i in range(TEST_SIZE))
 
 
 class HTTPTestRequestHandler(http.server.BaseHTTPRequestHandler):
+    ranges = []
+    fail_once = set()
+
     def log_message(self, format, *args):
         pass
 
+    def serve_partial(self):
+        start, end = map(int, re.fullmatch(r'bytes=(\d+)-(\d+)', self.headers['Range']).groups())
+        type(self).ranges.append((start, end))
+        if start in self.fail_once:
+            self.fail_once.discard(start)
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(206)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Range', f'bytes {start}-{end}/{TEST_SIZE}')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(TEST_DATA[start:end + 1])
+
     def send_content_range(self, total=None):
         range_header = self.headers.get('Range')
         start = end = None
@@ -64,6 +86,8 @@ def do_GET(self):
             self.serve(range=False)
         elif self.path == '/no-range-no-content-length':
             self.serve(range=False, content_length=False)
+        elif self.path == '/partial':
+            self.serve_partial()
         else:
             assert False
 
@@ -89,9 +113,21 @@ def download(self, params, ep):
         self.assertEqual(os.path.getsize(encodeFilename(filename)), TEST_SIZE, ep)
         try_rm(encodeFilename(filename))
 
+    def download_to_stream(self, params, ep):
+        params['logger'] = FakeLogger()
+        ydl = YoutubeDL(params)
+        downloader = HttpFD(ydl, params)
+        stream = io.BytesIO()
+        self.assertTrue(downloader.download(stream, {
+            'url': 'http://127.0.0.1:%d/%s' % (self.port, ep),
+        })[0], ep)
+        self.assertEqual(stream.getvalue(), b'#' * TEST_SIZE, ep)
+        self.assertFalse(stream.closed, ep)
+
     def download_all(self, params):
         for ep in ('regular', 'no-content-length', 'no-range', 'no-range-no-content-length'):
             self.download(params, ep)
+            self.download_to_stream(params, ep)
 
     def test_regular(self):
         self.download_all({})
@@ -101,6 +137,95 @@ def test_chunked(self):
             'http_chunk_size': 1000,
         })
 
+    def test_progress_hooks_interval(self):
+        def run(interval):
+            statuses = []
+            params = {
+                'logger': FakeLogger(),
+                'noresizebuffer': True,
+                'buffersize': 1024,
+                'progress_hooks_interval': interval,
+            }
+            downloader = HttpFD(YoutubeDL(params), params)
+            downloader.add_progress_hook(lambda d: statuses.append((d['status'], d.get('downloaded_bytes'))))
+            self.assertTrue(downloader.real_download('testfile.mp4', {'url': f'http://127.0.0.1:{self.port}/regular'}))
+            try_rm('testfile.mp4')
+            return statuses
+
+        self.assertEqual(run(0), [('downloading', i * 1024) for i in range(1, 11)] + [('finished', TEST_SIZE)])
+        # Only the first update is passed before the final one
+        self.assertEqual(run(1000), [('downloading', 1024), ('finished', TEST_SIZE)])
+
+    def test_connections(self):
+        # Servers that do not respond with 206 are downloaded over a single connection
+        self.download_all({
+            'http_connections': 4,
+        })
+
+    def download_segmented(self, params):
+        params = {'logger': FakeLogger(), 'http_connections': 4, 'retries': 1, **params}
+        downloader = HttpFD(YoutubeDL(params), params)
+        downloader._MIN_SEGMENT_SIZE = 1000
+        HTTPTestRequestHandler.ranges = []
+        self.assertTrue(downloader.real_download('testfile.mp4', {'url': f'http://127.0.0.1:{self.port}/partial'}))
+        with open('testfile.mp4', 'rb') as f:
+            self.assertEqual(f.read(), TEST_DATA)
+        self.assertFalse(os.path.exists('testfile.mp4.part'))
+        self.assertFalse(os.path.exists('testfile.mp4.ytdl'))
+        return sorted(HTTPTestRequestHandler.ranges)[1:]
+
+    def test_segmented(self):
+        self.addCleanup(try_rm, 'testfile.mp4')
+        try_rm('testfile.mp4')
+        self.assertEqual(self.download_segmented({}), [(0, 2559), (2560, 5119), (5120, 7679), (7680, 10239)])
+
+        try_rm('testfile.mp4')
+        self.assertEqual(
+            self.download_segmented({'http_chunk_size': 2000}),
+            [(0, 1999), (2000, 2559), (2560, 4559), (4560, 5119), (5120, 7119), (7120, 7679), (7680, 9679), (9680, 10239)])
+
+        try_rm('testfile.mp4')
+        HTTPTestRequestHandler.fail_once = {2560}
+        self.assertEqual(
+            self.download_segmented({}), [(0, 2559), (2560, 5119), (2560, 5119), (5120, 7679), (7680, 10239)])
+
+    def test_segmented_resume(self):
+        self.addCleanup(try_rm, 'testfile.mp4')
+        try_rm('testfile.mp4')
+        with open('testfile.mp4.part', 'wb') as f:
+            f.write(TEST_DATA[:1000] + bytes(4000) + TEST_DATA[5000:6000] + bytes(TEST_SIZE - 6000))
+        with open('testfile.mp4.ytdl', 'w') as f:
+            json.dump({'downloader': {'content_len': TEST_SIZE, 'segments': [[1000, 4999], [6000, 10239]]}}, f)
+        # The state of the segments is used even when downloading over a single connection
+        self.assertEqual(self.download_segmented({'http_connections': 1}), [(1000, 4999), (6000, 10239)])
+
+    def test_segmented_resume_failure(self):
+        self.addCleanup(try_rm, 'testfile.mp4')
+        self.addCleanup(try_rm, 'testfile.mp4.part')
+        self.addCleanup(try_rm, 'testfile.mp4.ytdl')
+        try_rm('testfile.mp4')
+        with open('testfile.mp4.part', 'wb') as f:
+            f.write(TEST_DATA[:1000] + bytes(TEST_SIZE - 1000))
+        with open('testfile.mp4.ytdl', 'w') as f:
+            json.dump({'downloader': {'content_len': TEST_SIZE, 'segments': [[1000, 10239]]}}, f)
+        # A failed probe of the server does not discard the progress
+        HTTPTestRequestHandler.fail_once = {0}
+        params = {'logger': FakeLogger(), 'retries': 0}
+        with self.assertRaises(DownloadError):
+            HttpFD(YoutubeDL(params), params).real_download(
+                'testfile.mp4', {'url': f'http://127.0.0.1:{self.port}/partial'})
+        self.assertTrue(os.path.exists('testfile.mp4.part'))
+        self.assertTrue(os.path.exists('testfile.mp4.ytdl'))
+        self.assertEqual(self.download_segmented({'http_connections': 1}), [(1000, 10239)])
+
+    def test_fragment_state(self):
+        self.addCleanup(try_rm, 'testfile.mp4.ytdl')
+        # The .ytdl file of a fragmented download is neither used nor removed by a single connection
+        with open('testfile.mp4.ytdl', 'w') as f:
+            json.dump({'downloader': {'current_fragment': {'index': 3}}}, f)
+        self.download({}, 'regular')
+        self.assertTrue(os.path.exists('testfile.mp4.ytdl'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import http.cookiejar
+import http.server
+import io
+import shutil
+import threading
+
+from test.helper import FakeYDL, http_server_port
+from yt_dlp.cookies import YoutubeDLCookieJar
+from yt_dlp.networking import Request
+from yt_dlp.networking._cache import HTTPCache
+from yt_dlp.networking.common import Response
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.utils._utils import _YDLLogger as FakeLogger
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'http_cache_test')
+TEST_URL = 'http://127.0.0.1/resource'
+
+
+class FakeServer:
+    def __init__(self, headers, body=b'body'):
+        self.headers, self.body = headers, body
+        self.requests = []
+
+    def send(self, request):
+        self.requests.append(request)
+        if self.headers.get('ETag') and request.headers.get('If-None-Match') == self.headers['ETag']:
+            raise HTTPError(Response(io.BytesIO(b''), request.url, {'Cache-Control': 'max-age=60'}, status=304))
+        return Response(io.BytesIO(self.body), request.url, self.headers)
+
+
+class HTTPCacheTestRequestHandler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(200)
+        self.send_header('Content-Length', '4')
+        self.send_header('Cache-Control', 'max-age=60')
+        self.end_headers()
+        self.wfile.write(b'body')
+
+
+class TestHTTPCache(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        self.cache = HTTPCache(os.path.join(TEST_DIR, 'http-cache.sqlite3'), FakeLogger())
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    def fetch(self, server, ttl=True):
+        return self.cache.send(Request(TEST_URL), server.send, ttl=ttl).read()
+
+    def test_fresh(self):
+        server = FakeServer({'Cache-Control': 'public, max-age=60'})
+        self.assertEqual([self.fetch(server) for _ in range(3)], [b'body'] * 3)
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_not_stored(self):
+        for headers in ({'Cache-Control': 'no-store, max-age=60'}, {}, {'Cache-Control': 'max-age=60', 'Vary': '*'},
+                        {'Cache-Control': 'private, max-age=60'}):
+            with self.subTest(headers=headers):
+                server = FakeServer(headers)
+                self.assertEqual([self.fetch(server) for _ in range(2)], [b'body'] * 2)
+                self.assertEqual(len(server.requests), 2)
+
+    def test_ttl(self):
+        server = FakeServer({'Cache-Control': 'no-cache'})
+        self.fetch(server, ttl=60)
+        self.fetch(server, ttl=60)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_revalidation(self):
+        server = FakeServer({'Cache-Control': 'no-cache', 'ETag': '"v1"'})
+        self.assertEqual(self.fetch(server), b'body')
+        self.assertEqual(self.fetch(server), b'body')
+        self.assertEqual(server.requests[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(self.cache.revalidations, 1)
+        # The updated Cache-Control of the 304 response makes it fresh
+        self.assertEqual(self.fetch(server), b'body')
+        self.assertEqual(len(server.requests), 2)
+
+        server.headers['ETag'] = '"v2"'
+        self.cache.close()
+        self.cache._connect().execute('UPDATE responses SET expires = 0')
+        server.body = b'new body'
+        self.assertEqual(self.fetch(server), b'new body')
+
+    def test_vary(self):
+        server = FakeServer({'Cache-Control': 'max-age=60', 'Vary': 'Accept-Language'})
+        for language, requests in (('en', 1), ('en', 1), ('de', 2), ('de', 2)):
+            self.cache.send(Request(TEST_URL, headers={'Accept-Language': language}), server.send).read()
+            self.assertEqual(len(server.requests), requests)
+
+    def test_context(self):
+        server = FakeServer({'Cache-Control': 'max-age=60'})
+        for proxy, requests in ((None, 1), (None, 1), ('http://127.0.0.1:3128', 2), ('http://127.0.0.1:3128', 2)):
+            self.cache.send(Request(TEST_URL), server.send, context={'proxy': proxy}).read()
+            self.assertEqual(len(server.requests), requests)
+
+    def test_is_cacheable(self):
+        self.assertTrue(HTTPCache.is_cacheable(Request(TEST_URL)))
+        self.assertFalse(HTTPCache.is_cacheable(Request(TEST_URL, headers={'Authorization': 'Basic dXNlcjpwYXNz'})))
+        self.assertFalse(HTTPCache.is_cacheable(Request(TEST_URL, headers={'Cookie': 'a=b'})))
+        self.assertFalse(HTTPCache.is_cacheable(Request(TEST_URL, data=b'')))
+
+        cookiejar = YoutubeDLCookieJar()
+        self.assertTrue(HTTPCache.is_cacheable(Request(TEST_URL), cookiejar))
+        cookiejar.set_cookie(http.cookiejar.Cookie(
+            0, 'session', 'secret', None, False, '127.0.0.1', True, False, '/', True, False, None, False,
+            None, None, {}))
+        self.assertFalse(HTTPCache.is_cacheable(Request(TEST_URL), cookiejar))
+
+    def test_eviction(self):
+        self.cache.max_size = 10
+        server = FakeServer({'Cache-Control': 'max-age=60'})
+        for path in ('a', 'b', 'c'):
+            self.cache.send(Request(f'{TEST_URL}/{path}'), server.send, ttl=True)
+        self.assertEqual(
+            [key for key, in self.cache._connect().execute('SELECT key FROM responses ORDER BY key')],
+            [f'{TEST_URL}/b', f'{TEST_URL}/c'])
+
+    def test_urlopen(self):
+        httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), HTTPCacheTestRequestHandler)
+        self.addCleanup(httpd.shutdown)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{http_server_port(httpd)}/resource'
+
+        for http_cache, extensions, requests in ((False, {'cache': True}, 2), (True, {}, 2), (True, {'cache': True}, 1)):
+            with self.subTest(http_cache=http_cache, extensions=extensions):
+                HTTPCacheTestRequestHandler.requests = 0
+                shutil.rmtree(TEST_DIR, ignore_errors=True)
+                with FakeYDL({'cachedir': TEST_DIR, 'http_cache': http_cache}) as ydl:
+                    for _ in range(2):
+                        with ydl.urlopen(Request(url, extensions=extensions.copy())) as response:
+                            self.assertEqual(response.read(), b'body')
+                self.assertEqual(HTTPCacheTestRequestHandler.requests, requests)
+
+        # The responses to requests with cookies are not cached
+        HTTPCacheTestRequestHandler.requests = 0
+        with FakeYDL({'cachedir': TEST_DIR, 'http_cache': True}) as ydl:
+            ydl.cookiejar.set_cookie(http.cookiejar.Cookie(
+                0, 'session', 'secret', None, False, '127.0.0.1', True, False, '/', True, False, None, False,
+                None, None, {}))
+            for _ in range(2):
+                with ydl.urlopen(Request(url, extensions={'cache': True})) as response:
+                    self.assertEqual(response.read(), b'body')
+        self.assertEqual(HTTPCacheTestRequestHandler.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -108,7 +108,6 @@ def test_assignments(self):
         self._test('function f(){var x = 20; x += 30 + 1; return x;}', 51)
         self._test('function f(){var x = 20; x -= 30 + 1; return x;}', -11)
 
-    @unittest.skip('Not implemented')
     def test_comments(self):
         self._test('''
             function f() {
@@ -136,6 +135,9 @@ def test_precedence(self):
                 return a;
             }
         ''', [20, 20, 30, 40, 50])
+        self._test('function f() { return !0 ? 1 : 2 }', 1)
+        self._test('function f() { return 5 >>> 1 | 3 & 7 ^ 2 }', 3)
+        self._test('function f() { return 2 ** 3 ** 2 }', 512)
 
     def test_builtins(self):
         self._test('function f() { return NaN }', NaN)
@@ -226,6 +228,7 @@ def test_try(self):
 
     def test_catch(self):
         self._test('function f() { try{throw 10} catch(e){return 5} }', 5)
+        self._test('function f() { try{throw 10} catch(e){return e + 1} }', 11)
 
     def test_finally(self):
         self._test('function f() { try{throw 10} finally {return 42} }', 42)
@@ -259,6 +262,14 @@ def test_comma(self):
         self._test('function f() { a=5; return (a -= 1, a+=3, a); }', 7)
         self._test('function f() { return (l=[0,1,2,3], function(a, b){return a+b})((l[1], l[2]), l[3]) }', 5)
 
+    def test_typeof(self):
+        self._test('function f() { return typeof x + typeof 1 + typeof "a" }', 'undefinednumberstring')
+
+    def test_repeated_calls(self):
+        jsi = JSInterpreter('function f(a) { var b = [], c; b.push(a); c = b.length; return c + a }')
+        func = jsi.extract_function('f')
+        self.assertEqual([func([i]) for i in range(3)], [1, 2, 3])
+
     def test_void(self):
         self._test('function f() { return void 42; }', None)
 
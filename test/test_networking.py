@@ -642,6 +642,17 @@ def test_read(self, handler):
             assert res.read().decode().endswith('\n\n')
             assert res.read() == b''
 
+    @pytest.mark.parametrize('handler', ['Urllib', 'Requests', 'CurlCFFI'], indirect=True)
+    def test_readinto(self, handler):
+        with handler() as rh:
+            for headers in ({}, {'ytdl-encoding': 'gzip'}):
+                res = validate_and_send(
+                    rh, Request(f'http://127.0.0.1:{self.http_port}/content-encoding', headers=headers))
+                buffer, data = bytearray(8), b''
+                while size := res.readinto(memoryview(buffer)[:5]):
+                    data += buffer[:size]
+                assert data == b'<html><video src="/vid.mp4" /></html>'
+
 
 class TestHTTPProxy(TestRequestHandlerBase):
     # Note: this only tests http urls over non-CONNECT proxy
@@ -1129,6 +1140,19 @@ def close(self):
         assert res4.closed
         assert res4._buffer == b''
 
+        res5 = CurlCFFIResponseReader(FakeResponse())
+        buffer = bytearray(5)
+        assert res5.readinto(buffer) == 3
+        assert buffer[:3] == b'foo'
+        assert res5.readinto(memoryview(buffer)[:2]) == 2
+        assert buffer[:2] == b'ba'
+        assert res5._buffer == b'r'
+        assert res5.readinto(buffer) == 1
+        assert buffer[:1] == b'r'
+        assert res5.readinto(buffer) == 1
+        assert res5.readinto(buffer) == 0
+        assert res5.closed
+
 
 def run_validation(handler, error, req, **handler_kwargs):
     with handler(**handler_kwargs) as rh:
@@ -1931,6 +1955,15 @@ def test_get_header(self):
         assert res.get_header('set-Cookie') == 'cookie1'
         assert res.get_header('notexist', 'default') == 'default'
 
+    def test_readinto(self):
+        res = Response(io.BytesIO(b'abcdef'), url='test://', headers={})
+        buffer = bytearray(4)
+        assert res.readinto(buffer) == 4
+        assert buffer == b'abcd'
+        assert res.readinto(buffer) == 2
+        assert buffer == b'efcd'
+        assert res.readinto(buffer) == 0
+
     def test_compat(self):
         res = Response(io.BytesIO(b''), url='test://', status=404, headers={'test': 'test'})
         with warnings.catch_warnings():
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# Allow direct execution
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+from test.helper import FakeYDL, try_rm
+from yt_dlp.server import JobServer, _WarmState
+
+INFO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'server_test.info.json')
+TEST_INFO = {
+    'id': 'testid',
+    'title': 'Test video',
+    'url': 'http://127.0.0.1/video.mp4',
+    'ext': 'mp4',
+    'extractor': 'generic',
+    'extractor_key': 'Generic',
+    'webpage_url': 'http://127.0.0.1/video',
+}
+
+
+class TestJobServer(unittest.TestCase):
+    def setUp(self):
+        with open(INFO_FILE, 'w') as f:
+            json.dump(TEST_INFO, f)
+        self.server = JobServer('127.0.0.1:0')
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://%s:%d' % self.server.address
+
+    def tearDown(self):
+        self.server.shutdown()
+        try_rm(INFO_FILE)
+
+    def request(self, path, job=None, headers={}):
+        return urllib.request.Request(
+            f'{self.url}{path}', data=None if job is None else json.dumps(job).encode(), headers={
+                'Authorization': f'Bearer {self.server.token}',
+                'Content-Type': 'application/json',
+                **headers,
+            })
+
+    def run_job(self, job):
+        with urllib.request.urlopen(self.request('/jobs', job)) as response:
+            self.assertEqual(response.headers['Content-Type'], 'application/x-ndjson')
+            return [json.loads(line) for line in response]
+
+    def test_info(self):
+        with urllib.request.urlopen(self.request('/')) as response:
+            self.assertEqual(json.load(response)['workers'], 1)
+
+    def test_rejected(self):
+        job = {'args': ['--load-info-json', INFO_FILE, '--exec', 'echo']}
+        for headers, status in (
+            ({'Authorization': ''}, 401),
+            ({'Authorization': 'Bearer invalid'}, 401),
+            ({'Content-Type': 'text/plain'}, 415),
+            ({'Origin': 'https://example.com'}, 403),
+            ({'Host': f'attacker.example.com:{self.server.address[1]}'}, 403),
+            ({'Host': '127.0.0.1:1'}, 403),
+        ):
+            with self.subTest(headers=headers):
+                with self.assertRaises(urllib.error.HTTPError) as cm:
+                    urllib.request.urlopen(self.request('/jobs', job, headers))
+                self.assertEqual(cm.exception.code, status)
+                cm.exception.close()
+
+    def test_allowed_host(self):
+        port = self.server.address[1]
+        for host in (f'127.0.0.1:{port}', f'localhost:{port}'):
+            self.assertTrue(self.server.is_allowed_host(host), host)
+        for host in (None, '', '127.0.0.1', f'127.0.0.2:{port}', f'example.com:{port}', f'127.0.0.1:{port}x'):
+            self.assertFalse(self.server.is_allowed_host(host), host)
+
+    def test_job(self):
+        job = {'args': ['--load-info-json', INFO_FILE, '--print', 'title'], 'params': {'simulate': True}}
+        for _ in range(2):
+            events = self.run_job(job)
+            self.assertIn({'type': 'output', 'message': 'Test video'}, events)
+            self.assertEqual(events[-1], {'type': 'finished', 'retcode': 0})
+
+    def test_invalid_job(self):
+        events = self.run_job({'args': ['--no-such-option']})
+        self.assertEqual(events[-1]['retcode'], 2)
+        events = self.run_job({'args': []})
+        self.assertEqual(events, [{'type': 'finished', 'retcode': 2, 'error': 'No URLs were given'}])
+        events = self.run_job({'args': ['--version']})
+        self.assertEqual(events[-1]['retcode'], 2)
+
+
+class TestWarmState(unittest.TestCase):
+    def test_reuse(self):
+        state = _WarmState()
+        with FakeYDL() as ydl:
+            state.attach(ydl)
+            director = ydl._request_director
+            ydl.cache._memory['key'] = 'value'
+            state.detach(ydl)
+
+        with FakeYDL() as ydl:
+            state.attach(ydl)
+            self.assertIs(ydl._request_director, director)
+            self.assertEqual(ydl.cache._memory, {'key': 'value'})
+            state.detach(ydl)
+
+        with FakeYDL({'proxy': 'http://127.0.0.1:3128'}) as ydl:
+            state.attach(ydl)
+            self.assertIsNot(ydl._request_director, director)
+            state.detach(ydl)
+        state.reset()
+
+
+if __name__ == '__main__':
+    unittest.main()
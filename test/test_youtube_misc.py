@@ -8,7 +8,18 @@
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-from yt_dlp.extractor import YoutubeIE
+import itertools
+import shutil
+import time
+
+from test.helper import FakeYDL
+from yt_dlp.extractor import YoutubeIE, YoutubeTabIE
+from yt_dlp.extractor.youtube import STREAMING_DATA_CLIENT_NAME
+from yt_dlp.jsinterp import JSInterpreter
+from yt_dlp.utils import int_or_none
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testdata', 'youtube_cache_test')
+PLAYER_URL = 'https://www.youtube.com/s/player/{}/player_ias.vflset/en_US/base.js'
 
 
 class TestYoutubeMisc(unittest.TestCase):
@@ -21,6 +32,181 @@ def test_youtube_extract(self):
         assertExtractId('http://www.youtube.com/watch?v=BaW_jenozKcsharePLED17F32AD9753930', 'BaW_jenozKc')
         assertExtractId('BaW_jenozKc', 'BaW_jenozKc')
 
+    def test_js_function_fallback(self):
+        warnings = []
+        ydl = FakeYDL()
+        ydl.report_warning = lambda msg, *args, **kwargs: warnings.append(msg)
+        ie = YoutubeIE(ydl)
+        jscode = 'function f(a){a=a.split("");a.reverse();return a.join("")}'
+
+        def build(broken=None):
+            def build(interpreter):
+                func = interpreter(jscode).extract_function('f')
+                if interpreter is broken:
+                    return lambda args: func(args).upper()
+                return func
+            return build
+
+        # The results are checked against the legacy interpreter
+        func = ie._js_function_with_fallback('test', build())
+        self.assertEqual([func(['abc']), func(['xyz'])], ['cba', 'zyx'])
+        self.assertEqual(warnings, [])
+        func = ie._js_function_with_fallback('test', build(JSInterpreter))
+        self.assertEqual([func(['abc']), func(['xyz'])], ['cba', 'zyx'])
+        self.assertEqual(len(warnings), 1)
+
+        # The calls that fail are retried with the legacy interpreter
+        def build_failing(interpreter):
+            if interpreter is JSInterpreter:
+                return lambda args: interpreter(jscode).call_function('g', *args)
+            return build()(interpreter)
+
+        func = ie._js_function_with_fallback('test', build_failing)
+        self.assertEqual([func(['abc']), func(['xyz'])], ['cba', 'zyx'])
+        with self.assertRaises(JSInterpreter.Exception):
+            ie._js_function_with_fallback('test', lambda interpreter: interpreter(jscode).extract_function('g'))(['a'])
+
+    def test_player_result_cache(self):
+        calls = []
+
+        def func(s):
+            calls.append(s)
+            return s[::-1]
+
+        def cached(player_id, s):
+            return ie._cached_player_result('nsig', PLAYER_URL.format(player_id), s, func)
+
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, TEST_DIR, ignore_errors=True)
+        ie = YoutubeIE(FakeYDL({'cachedir': TEST_DIR}))
+        ie._PLAYER_RESULTS_CACHE_SIZE = 2
+        self.assertEqual([cached('11111111', s) for s in ('abc', 'def', 'abc')], ['cba', 'fed', 'cba'])
+        self.assertEqual(calls, ['abc', 'def'])
+        # A different player does not reuse the results
+        self.assertEqual(cached('22222222', 'abc'), 'cba')
+        self.assertEqual(calls, ['abc', 'def', 'abc'])
+        # The least recently used result is evicted
+        cached('11111111', 'ghi')
+        self.assertEqual(list(ie._player_results[('nsig', '11111111')]), ['abc', 'ghi'])
+        # The results are written to the filesystem cache in one batch
+        self.assertIsNone(ie.cache.load('youtube-nsig-results', '11111111'))
+        ie._save_player_results()
+        self.assertEqual(ie._unsaved_player_results, set())
+
+        calls.clear()
+        ie = YoutubeIE(FakeYDL({'cachedir': TEST_DIR}))
+        self.assertEqual([cached('11111111', s) for s in ('abc', 'ghi', 'def')], ['cba', 'ihg', 'fed'])
+        self.assertEqual(calls, ['def'])
+
+    def test_player_responses_order(self):
+        delays = {'ios': 0.3, 'android': 0.2, 'tv_embedded': 0.1, 'web': 0}
+
+        class FakeYoutubeIE(YoutubeIE):
+            def _download_player_url(self, video_id, fatal=False):
+                return PLAYER_URL.format('11111111')
+
+            def _extract_player_response(self, client, video_id, *args):
+                time.sleep(delays[client])
+                return {
+                    'videoDetails': {'videoId': video_id},
+                    'playabilityStatus': {'reason': 'Sign in to confirm your age'} if client == 'android' else {},
+                    'streamingData': {'formats': []},
+                }
+
+        ie = FakeYoutubeIE(FakeYDL())
+        start = time.monotonic()
+        prs, player_url = ie._extract_player_responses(['ios', 'android', 'web'], 'BaW_jenozKc', None, {}, {})
+        self.assertLess(time.monotonic() - start, sum(delays.values()))
+        # The fallback client of android is used right after it, as if the clients were requested one by one
+        self.assertEqual(
+            [pr['streamingData'][STREAMING_DATA_CLIENT_NAME] for pr in prs], ['IOS', 'ANDR', 'TV-E', 'WEB'])
+        self.assertEqual(player_url, PLAYER_URL.format('11111111'))
+
+    def test_tab_entries_prefetch(self):
+        def page(num):
+            continuation = {'continuationEndpoint': {'continuationCommand': {'token': str(num + 1)}}}
+            return [
+                *({'richItemRenderer': {'content': {'videoRenderer': {'videoId': f'video{num}{i}xxxx'}}}}
+                  for i in range(2)),
+                {'continuationItemRenderer': continuation},
+            ]
+
+        requests = []
+
+        class FakeYoutubeTabIE(YoutubeTabIE):
+            def _extract_response(self, item_id, query, *args, **kwargs):
+                requests.append(query['continuation'])
+                return {'onResponseReceivedActions': [
+                    {'appendContinuationItemsAction': {'continuationItems': page(int(query['continuation']))}}]}
+
+        ie = FakeYoutubeTabIE(FakeYDL())
+        entries = ie._entries({'content': {'richGridRenderer': {'contents': page(0)}}}, 'UC', None, None, None)
+        self.assertEqual([next(entries)['id'] for _ in range(5)], [f'video{i // 2}{i % 2}xxxx' for i in range(5)])
+        time.sleep(0.1)
+        # Only the page after the one being consumed is requested in advance
+        self.assertEqual(requests, ['1', '2', '3'])
+        entries.close()
+        time.sleep(0.1)
+        self.assertEqual(requests, ['1', '2', '3'])
+
+    def test_comment_replies_concurrent(self):
+        def continuation(token):
+            return {'continuationItemRenderer': {'continuationEndpoint': {'continuationCommand': {'token': token}}}}
+
+        def comment(comment_id):
+            return {'commentRenderer': {'commentId': comment_id, 'contentText': {'simpleText': comment_id}}}
+
+        def items(*items, action='appendContinuationItemsAction'):
+            return {'onResponseReceivedEndpoints': [{action: {'continuationItems': list(items)}}]}
+
+        responses = {
+            'root': items({'commentsHeaderRenderer': {'sortMenu': {'sortFilterSubMenuRenderer': {'subMenuItems': [
+                {}, {'serviceEndpoint': {'continuationCommand': {'token': 'page'}}}]}}}},
+                action='reloadContinuationItemsCommand'),
+            'page': items(*({'commentThreadRenderer': {
+                'comment': comment(f'c{i}'),
+                'replies': {'commentRepliesRenderer': {'contents': [continuation(f'replies{i}')]}},
+            }} for i in range(3))),
+            **{f'replies{i}': items(comment(f'c{i}.0'), comment(f'c{i}.1')) for i in range(3)},
+        }
+
+        class FakeYoutubeIE(YoutubeIE):
+            @classmethod
+            def ie_key(cls):
+                return YoutubeIE.ie_key()
+
+            def _extract_response(self, item_id, query, *args, **kwargs):
+                if query['continuation'].startswith('replies'):
+                    requested.append(query['continuation'])
+                    time.sleep(0.2)
+                return responses[query['continuation']]
+
+        requested = []
+
+        expected = [f'c{i}{suffix}' for i in range(3) for suffix in ('', '.0', '.1')]
+        for workers, max_comments in (('1', 'all'), ('3', 'all'), ('3', 'all,all,3,1')):
+            ie = FakeYoutubeIE(FakeYDL({'extractor_args': {'youtube': {
+                'comment_workers': [workers], 'max_comments': max_comments.split(',')}}}))
+            start = time.monotonic()
+            comments = [c['id'] for c in ie._comment_entries({'contents': [continuation('root')]}, None, 'id')]
+            if max_comments == 'all':
+                self.assertEqual(comments, expected)
+            else:
+                self.assertEqual(comments, ['c0', 'c0.0', 'c1', 'c1.0', 'c2', 'c2.0'])
+            if workers == '3':
+                self.assertLess(time.monotonic() - start, 0.4)
+
+        # Only the replies of the comments that are extracted are prefetched
+        for max_comments, replies in (('all,2', ['replies0', 'replies1']), ('all,all,1', ['replies0']), ('2', ['replies0'])):
+            requested.clear()
+            ie = FakeYoutubeIE(FakeYDL({'extractor_args': {'youtube': {
+                'comment_workers': ['3'], 'max_comments': max_comments.split(',')}}}))
+            entries = ie._comment_entries({'contents': [continuation('root')]}, None, 'id')
+            # The total number of comments is limited by the caller
+            list(itertools.islice(entries, int_or_none(max_comments.split(',')[0])))
+            entries.close()
+            self.assertEqual(sorted(requested), replies, max_comments)
+
 
 if __name__ == '__main__':
     unittest.main()
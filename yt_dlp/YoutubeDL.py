@@ -1,9 +1,12 @@
 import collections
+import concurrent.futures
 import contextlib
 import copy
 import datetime as dt
 import errno
 import fileinput
+import hashlib
+import heapq
 import http.cookiejar
 import io
 import itertools
@@ -18,22 +21,26 @@
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import tokenize
 import traceback
 import unicodedata
 
+from .archive import DownloadArchive, open_download_archive
 from .cache import Cache
 from .compat import functools, urllib  # isort: split
 from .compat import compat_os_name, urllib_req_to_req
 from .cookies import LenientSimpleCookie, load_cookies
-from .downloader import FFmpegFD, get_suitable_downloader, shorten_protocol_name
+from .downloader import FFmpegFD, FileDownloader, get_suitable_downloader, shorten_protocol_name
+from .downloader.external import ExternalFD
 from .downloader.rtmp import rtmpdump_version
 from .extractor import gen_extractor_classes, get_info_extractor
 from .extractor.common import UnsupportedURLIE
 from .extractor.openload import PhantomJSwrapper
 from .minicurses import format_text
 from .networking import HEADRequest, Request, RequestDirector
+from .networking._cache import HTTPCache
 from .networking.common import _REQUEST_HANDLERS, _RH_PREFERENCES
 from .networking.exceptions import (
     HTTPError,
@@ -88,6 +95,7 @@
     FormatSorter,
     GeoRestrictedError,
     ISO3166Utils,
+    JSONLinesList,
     LazyList,
     MaxDownloadsReached,
     Namespace,
@@ -125,7 +133,6 @@
     iri_to_uri,
     is_path_like,
     join_nonempty,
-    locked_file,
     make_archive_id,
     make_dir,
     number_of_digits,
@@ -277,6 +284,8 @@ class YoutubeDL:
     clean_infojson:    Remove internal metadata from the infojson
     getcomments:       Extract video comments. This will not be written to disk
                        unless writeinfojson is also given
+    stream_comments:   Keep the extracted comments in a temporary file instead of
+                       in memory. info_dict['comments'] is then a JSONLinesList
     writeannotations:  Write the video annotations to a .annotations.xml file
     writethumbnail:    Write the thumbnail image to a file
     allow_playlist_files: Whether to write playlists' description, infojson etc
@@ -300,6 +309,13 @@ class YoutubeDL:
     skip_download:     Skip the actual download of the video file
     cachedir:          Location of the cache files in the filesystem.
                        False to disable filesystem cache.
+    extraction_cache:  Number of seconds to reuse the extracted information of a
+                       video for, from the cachedir. It is not reused when
+                       downloading, since the format URLs may be signed for the
+                       session of the extraction, nor after the URLs expire
+    http_cache:        Store the HTTP responses of the requests that allow it
+                       (see InfoExtractor._HTTP_CACHE) in the cachedir and reuse
+                       them while they are fresh
     noplaylist:        Download single video instead of a playlist if in doubt.
     age_limit:         An integer representing the user's age in years.
                        Unsuitable videos for the given age are skipped.
@@ -312,12 +328,33 @@ class YoutubeDL:
                        downloaded.
                        Videos without view count information are always
                        downloaded. None for no limit.
-    download_archive:  A set, or the name of a file where all downloads are recorded.
-                       Videos already present in the file are not downloaded again.
+    download_archive:  A set, a yt_dlp.archive.DownloadArchive, or the name of a file
+                       where all downloads are recorded. Videos already present
+                       in the file are not downloaded again. See
+                       yt_dlp.archive.open_download_archive for the file formats
     break_on_existing: Stop the download process after attempting to download a
                        file that is in the archive.
     break_per_url:     Whether break_on_reject and break_on_existing
                        should act on each input URL as opposed to for the entire queue
+    concurrent_downloads: Number of input URLs to extract and download concurrently
+                       (default 1). max_downloads is then counted across all the URLs,
+                       and the progress is printed as with progress_with_newline
+    concurrent_playlist_entries: Number of playlist entries to extract and download
+                       concurrently (default 1). The entries of nested playlists
+                       are processed sequentially
+    concurrent_formats: Whether to download the formats that are to be merged at
+                       the same time (default True). Not done with an external
+                       downloader or a ratelimit
+    postprocessor_workers: Number of threads that post-process the downloaded videos
+                       in the background while the next ones are downloaded.
+                       The post hooks, "after_video" postprocessors and archive
+                       are still run in the order of the downloads.
+                       The returned info_dict is updated only once its
+                       post-processing has finished. Default is 0, i.e. the
+                       videos are post-processed before downloading the next one
+    postprocessor_queue_size: Number of downloaded videos that can wait for a
+                       post-processing worker before the downloads are paused.
+                       Default is postprocessor_workers
     cookiefile:        File name or text stream from where cookies should be read and dumped to
     cookiesfrombrowser:  A tuple containing the name of the browser, the profile
                        name/path from where cookies are loaded, the name of the keyring,
@@ -383,9 +420,17 @@ class YoutubeDL:
                                          downloaded video fragment.
                        * fragment_count: The number of fragments (= individual
                                          files that will be merged)
+                       * fragment_reorder_buffer_depth: The number of downloaded
+                                         fragments waiting for an earlier one to be
+                                         written (concurrent fragment downloads only)
 
                        Progress hooks are guaranteed to be called at least once
                        (with status "finished") if the download is successful.
+                       The "downloading" updates are coalesced, so that the hooks
+                       get the latest of them at most once every progress_hooks_interval
+    progress_hooks_interval: The minimum time between the "downloading" progress
+                       updates passed to the progress hooks (including the
+                       progress output), in seconds. Default is 0.1
     postprocessor_hooks:  A list of functions that get called on postprocessing
                        progress, with a dictionary with the entries
                        * status: One of "started", "processing", or "finished".
@@ -480,8 +525,9 @@ class YoutubeDL:
     the downloader (see yt_dlp/downloader/common.py):
     nopart, updatetime, buffersize, ratelimit, throttledratelimit, min_filesize,
     max_filesize, test, noresizebuffer, retries, file_access_retries, fragment_retries,
-    continuedl, xattr_set_filesize, hls_use_mpegts, http_chunk_size,
-    external_downloader_args, concurrent_fragment_downloads, progress_delta.
+    continuedl, xattr_set_filesize, hls_use_mpegts, http_chunk_size, http_connections,
+    external_downloader_args, concurrent_fragment_downloads, fragment_host_connections,
+    progress_delta.
 
     The following options are used by the post processors:
     ffmpeg_location:   Location of the ffmpeg/avconv binary; either the path
@@ -608,6 +654,7 @@ def __init__(self, params=None, auto_init=True):
         self.params = params
         self._ies = {}
         self._ies_instances = {}
+        self._ies_host_index = self._ies_embed_index = None
         self._pps = {k: [] for k in POSTPROCESS_WHEN}
         self._printed_messages = set()
         self._first_webpage_request = True
@@ -615,10 +662,13 @@ def __init__(self, params=None, auto_init=True):
         self._progress_hooks = []
         self._postprocessor_hooks = []
         self._download_retcode = 0
+        self._thread_state = threading.local()
         self._num_downloads = 0
         self._num_videos = 0
-        self._playlist_level = 0
-        self._playlist_urls = set()
+        self._download_lock = threading.RLock()
+        self._output_lock = threading.RLock()
+        self._download_cancelled = threading.Event()
+        self._pp_pool, self._pp_queue, self._pp_futures = None, None, collections.deque()
         self.cache = Cache(self)
         self.__header_cookies = []
 
@@ -789,25 +839,17 @@ def check_deprecated(param, option, suggestion):
                 get_postprocessor(pp_def.pop('key'))(self, **pp_def),
                 when=when)
 
-        def preload_download_archive(fn):
-            """Preload the archive, if any is specified"""
-            archive = set()
+        def load_download_archive(fn):
+            """Load the archive, if any is specified"""
             if fn is None:
-                return archive
+                return set()
             elif not is_path_like(fn):
                 return fn
 
             self.write_debug(f'Loading archive file {fn!r}')
-            try:
-                with locked_file(fn, 'r', encoding='utf-8') as archive_file:
-                    for line in archive_file:
-                        archive.add(line.strip())
-            except OSError as ioe:
-                if ioe.errno != errno.ENOENT:
-                    raise
-            return archive
+            return open_download_archive(fn)
 
-        self.archive = preload_download_archive(self.params.get('download_archive'))
+        self.archive = load_download_archive(self.params.get('download_archive'))
 
     def warn_if_short_id(self, argv):
         # short YouTube ID starting with dash?
@@ -829,6 +871,7 @@ def add_info_extractor(self, ie):
         """Add an InfoExtractor object to the end of the list."""
         ie_key = ie.ie_key()
         self._ies[ie_key] = ie
+        self._ies_host_index = self._ies_embed_index = None
         if not isinstance(ie, type):
             self._ies_instances[ie_key] = ie
             ie.set_downloader(self)
@@ -845,6 +888,47 @@ def get_info_extractor(self, ie_key):
             self.add_info_extractor(ie)
         return ie
 
+    def _iter_candidate_ies(self, url):
+        """
+        Yield (ie_key, ie) of the extractors that may be suitable for the URL, in the order they were added.
+        For http(s) URLs, this uses an index of the host labels of the extractors
+        so that suitable() need not be checked for every extractor
+        """
+        scheme, sep, rest = url.partition('://')
+        if not sep or scheme.lower() not in ('http', 'https'):
+            yield from self._ies.items()
+            return
+
+        if self._ies_host_index is None:
+            index = collections.defaultdict(list)
+            for idx, ie in enumerate(self._ies.values()):
+                for label in variadic(ie._get_host_labels()):
+                    index[label].append(idx)  # None = May be suitable for any host
+            self._ies_host_index = dict(index), list(self._ies.items())
+
+        index, ies = self._ies_host_index
+        labels = {None, *rest.partition('/')[0].lower().split('.')}
+        last_idx = None
+        for idx in heapq.merge(*filter(None, map(index.get, labels))):
+            if idx != last_idx:
+                yield ies[idx]
+            last_idx = idx
+
+    def _iter_embed_ies(self, webpage):
+        """
+        Yield (ie_key, ie) of the extractors that may find embeds in the webpage, in the order they were added.
+        Extractors that only use _EMBED_REGEX are skipped unless the webpage has a literal required by them
+        """
+        if self._ies_embed_index is None:
+            self._ies_embed_index = [
+                (ie_key, ie, literals) for ie_key, ie in self._ies.items()
+                for literals in [ie._get_embed_literals()] if literals != ()]
+
+        has_literal = functools.cache(webpage.__contains__)
+        for ie_key, ie, literals in self._ies_embed_index:
+            if literals is None or any(map(has_literal, literals)):
+                yield ie_key, ie
+
     def add_default_info_extractors(self):
         """
         Add the InfoExtractors returned by gen_extractors to the end of the list
@@ -884,6 +968,58 @@ def add_postprocessor_hook(self, ph):
             for pp in pps:
                 pp.add_progress_hook(ph)
 
+    # The playlist recursion state is kept per thread since the URLs can be processed concurrently
+    @property
+    def _playlist_level(self):
+        return getattr(self._thread_state, 'playlist_level', 0)
+
+    @_playlist_level.setter
+    def _playlist_level(self, value):
+        self._thread_state.playlist_level = value
+
+    @property
+    def _playlist_urls(self):
+        if not hasattr(self._thread_state, 'playlist_urls'):
+            self._thread_state.playlist_urls = set()
+        return self._thread_state.playlist_urls
+
+    # With break_per_url, the URLs that are downloaded concurrently are counted separately
+    @property
+    def _num_downloads(self):
+        url_downloads = getattr(self._thread_state, 'url_downloads', None)
+        return self.__num_downloads if url_downloads is None else url_downloads[0]
+
+    @_num_downloads.setter
+    def _num_downloads(self, value):
+        url_downloads = getattr(self._thread_state, 'url_downloads', None)
+        if url_downloads is None:
+            self.__num_downloads = value
+        else:
+            url_downloads[0] = value
+
+    def _check_download_cancelled(self):
+        """Raise DownloadCancelled if the concurrent downloads have been cancelled"""
+        self._download_cancelled_checker()()
+
+    def _download_cancelled_checker(self):
+        """
+        Return a function that does _check_download_cancelled for the downloads of this thread.
+        It can be called from other threads, e.g. by the progress hooks of the fragment workers
+        """
+        cancelled = [getattr(self._thread_state, name, None) for name in ('playlist_cancelled', 'formats_cancelled')]
+
+        def check():
+            if self._download_cancelled.is_set() or any(fn() for fn in cancelled if fn):
+                raise DownloadCancelled()
+        return check
+
+    def _progress_params(self):
+        """The params of the downloaders of this thread"""
+        if getattr(self._thread_state, 'concurrent_url', False):
+            # The progress bars of the URLs that are downloaded at the same time would overwrite each other
+            return {**self.params, 'progress_with_newline': True}
+        return self.params
+
     def _bidi_workaround(self, message):
         if not hasattr(self, '_output_channel'):
             return message
@@ -891,18 +1027,20 @@ def _bidi_workaround(self, message):
         assert hasattr(self, '_output_process')
         assert isinstance(message, str)
         line_count = message.count('\n') + 1
-        self._output_process.stdin.write((message + '\n').encode())
-        self._output_process.stdin.flush()
-        res = ''.join(self._output_channel.readline().decode()
-                      for _ in range(line_count))
+        with self._output_lock:
+            self._output_process.stdin.write((message + '\n').encode())
+            self._output_process.stdin.flush()
+            res = ''.join(self._output_channel.readline().decode()
+                          for _ in range(line_count))
         return res[:-len('\n')]
 
     def _write_string(self, message, out=None, only_once=False):
-        if only_once:
-            if message in self._printed_messages:
-                return
-            self._printed_messages.add(message)
-        write_string(message, out=out, encoding=self.params.get('encoding'))
+        with self._output_lock:
+            if only_once:
+                if message in self._printed_messages:
+                    return
+                self._printed_messages.add(message)
+            write_string(message, out=out, encoding=self.params.get('encoding'))
 
     def to_stdout(self, message, skip_eol=False, quiet=None):
         """Print message to stdout"""
@@ -973,7 +1111,17 @@ def __exit__(self, *args):
         self.close()
 
     def close(self):
+        if self._pp_pool is not None:
+            self._pp_pool.shutdown()
         self.save_cookies()
+        self.cache.close()
+        if self.__dict__.get('_http_cache'):
+            http_cache = self._http_cache
+            self.write_debug(
+                f'HTTP cache: {http_cache.hits} hits, {http_cache.revalidations} revalidated, {http_cache.misses} misses')
+            http_cache.close()
+        if isinstance(getattr(self, 'archive', None), DownloadArchive):
+            self.archive.close()
         if '_request_director' in self.__dict__:
             self._request_director.close()
             del self._request_director
@@ -1186,7 +1334,8 @@ def prepare_outtmpl(self, outtmpl, info_dict, sanitize=False):
             formatSeconds(info_dict['duration'], '-' if sanitize else ':')
             if info_dict.get('duration', None) is not None
             else None)
-        info_dict['autonumber'] = int(self.params.get('autonumber_start', 1) - 1 + self._num_downloads)
+        info_dict['autonumber'] = int(
+            self.params.get('autonumber_start', 1) - 1 + info_dict.get('__num_downloads', self._num_downloads))
         info_dict['video_autonumber'] = self._num_videos
         if info_dict.get('resolution') is None:
             info_dict['resolution'] = self.format_resolution(info_dict, default=None)
@@ -1302,7 +1451,7 @@ def filename_sanitizer(key, value, restricted=self.params.get('restrictfilenames
         sanitize = bool(sanitize)
 
         def _dumpjson_default(obj):
-            if isinstance(obj, (set, LazyList)):
+            if isinstance(obj, (set, LazyList, JSONLinesList)):
                 return list(obj)
             return repr(obj)
 
@@ -1573,11 +1722,11 @@ def extract_info(self, url, download=True, ie_key=None, extra_info=None,
             ie_key = 'Generic'
 
         if ie_key:
-            ies = {ie_key: self._ies[ie_key]} if ie_key in self._ies else {}
+            ies = {ie_key: self._ies[ie_key]}.items() if ie_key in self._ies else ()
         else:
-            ies = self._ies
+            ies = self._iter_candidate_ies(url)
 
-        for key, ie in ies.items():
+        for key, ie in ies:
             if not ie.suitable(url):
                 continue
 
@@ -1733,18 +1882,74 @@ def _apply_header_cookies(self, url, cookies=None):
             cookie.domain = f'.{parsed.hostname}'
             self.cookiejar.set_cookie(cookie)
 
+    # The params that change what the extractors return. Secrets are left out, the username identifies the account
+    _EXTRACTION_CACHE_PARAMS = (
+        'getcomments', 'extractor_args', 'http_headers', 'cookiefile', 'cookiesfrombrowser', 'username', 'usenetrc',
+        'netrc_location', 'netrc_cmd', 'ap_mso', 'ap_username', 'geo_bypass', 'geo_bypass_country',
+        'geo_bypass_ip_block', 'geo_verification_proxy', 'proxy', 'impersonate', 'compat_opts',
+    )
+
+    def _extraction_cache_key(self, ie, temp_id):
+        params = json.dumps(
+            [self.params.get(k) for k in self._EXTRACTION_CACHE_PARAMS], sort_keys=True,
+            default=lambda x: sorted(map(repr, x)) if isinstance(x, (set, frozenset)) else repr(x))
+        return f'{ie.ie_key()}_{temp_id}_{hashlib.sha256(params.encode()).hexdigest()[:16]}'
+
+    def _load_extraction_cache(self, ie, url, download):
+        ttl, temp_id = self.params.get('extraction_cache'), ie.get_temp_id(url)
+        if not ttl or temp_id is None:
+            return None
+        # The format URLs can depend on the cookies of the extraction, so they are only reused without downloading
+        if download and not self.params.get('simulate'):
+            return None
+        cached = self.cache.load('extraction-results', self._extraction_cache_key(ie, temp_id), min_ver=__version__)
+        if not cached or time.time() - cached['timestamp'] > ttl or self._extraction_cache_expired(cached['info']):
+            return None
+        self.to_screen(f'[{ie.IE_NAME}] {temp_id}: Using cached information')
+        return cached['info']
+
+    @staticmethod
+    def _extraction_cache_expired(info):
+        """Whether any of the URLs of the result has expired, according to its expire query parameter"""
+        now = time.time()
+        for fmt in [info, *(info.get('formats') or [])]:
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(fmt.get('url') or '').query)
+            expire = int_or_none(traverse_obj(query, ('expire', 0), ('expires', 0), ('Expires', 0)))
+            if expire and expire <= now:
+                return True
+        return False
+
+    def _store_extraction_cache(self, ie, url, ie_result):
+        temp_id = ie.get_temp_id(url)
+        if (not self.params.get('extraction_cache') or temp_id is None
+                or ie_result.get('_type', 'video') != 'video' or ie_result.get('id') != temp_id):
+            return
+        try:
+            # Results with unserializable values (e.g. lazily extracted comments) are not cached
+            json.dumps(ie_result)
+        except (TypeError, ValueError):
+            return
+        self.cache.store('extraction-results', self._extraction_cache_key(ie, temp_id), {
+            'timestamp': time.time(),
+            'info': ie_result,
+        })
+
     @_handle_extraction_exceptions
     def __extract_info(self, url, ie, download, extra_info, process):
         self._apply_header_cookies(url)
 
-        try:
-            ie_result = ie.extract(url)
-        except UserNotLive as e:
-            if process:
-                if self.params.get('wait_for_video'):
-                    self.report_warning(e)
-                self._wait_for_video()
-            raise
+        ie_result = self._load_extraction_cache(ie, url, download)
+        if ie_result is None:
+            try:
+                ie_result = ie.extract(url)
+            except UserNotLive as e:
+                if process:
+                    if self.params.get('wait_for_video'):
+                        self.report_warning(e)
+                    self._wait_for_video()
+                raise
+            if isinstance(ie_result, dict):
+                self._store_extraction_cache(ie, url, ie_result)
         if ie_result is None:  # Finished already (backwards compatibility; listformats and friends should be moved here)
             self.report_warning(f'Extractor {ie.IE_NAME} returned nothing{bug_reports_message()}')
             return
@@ -2005,45 +2210,50 @@ def __process_playlist(self, ie_result, download):
         if keep_resolved_entries:
             self.write_debug('The information of all playlist entries will be held in memory')
 
-        failures = 0
-        max_failures = self.params.get('skip_playlist_after_errors') or float('inf')
-        for i, (playlist_index, entry) in enumerate(entries):
-            if lazy:
-                resolved_entries.append((playlist_index, entry))
-            if not entry:
-                continue
+        def entry_jobs():
+            for i, (playlist_index, entry) in enumerate(entries):
+                if lazy:
+                    resolved_entries.append((playlist_index, entry))
+                if not entry:
+                    continue
 
-            entry['__x_forwarded_for_ip'] = ie_result.get('__x_forwarded_for_ip')
-            if not lazy and 'playlist-index' in self.params['compat_opts']:
-                playlist_index = ie_result['requested_entries'][i]
+                entry['__x_forwarded_for_ip'] = ie_result.get('__x_forwarded_for_ip')
+                if not lazy and 'playlist-index' in self.params['compat_opts']:
+                    playlist_index = ie_result['requested_entries'][i]
 
-            entry_copy = collections.ChainMap(entry, {
-                **common_info,
-                'n_entries': int_or_none(n_entries),
-                'playlist_index': playlist_index,
-                'playlist_autonumber': i + 1,
-            })
+                entry_copy = collections.ChainMap(entry, {
+                    **common_info,
+                    'n_entries': int_or_none(n_entries),
+                    'playlist_index': playlist_index,
+                    'playlist_autonumber': i + 1,
+                })
 
-            if self._match_entry(entry_copy, incomplete=True) is not None:
-                # For compatabilty with youtube-dl. See https://github.com/yt-dlp/yt-dlp/issues/4369
-                resolved_entries[i] = (playlist_index, NO_DEFAULT)
-                continue
+                if self._match_entry(entry_copy, incomplete=True) is not None:
+                    # For compatabilty with youtube-dl. See https://github.com/yt-dlp/yt-dlp/issues/4369
+                    resolved_entries[i] = (playlist_index, NO_DEFAULT)
+                    continue
 
-            self.to_screen('[download] Downloading item %s of %s' % (
-                self._format_screen(i + 1, self.Styles.ID), self._format_screen(n_entries, self.Styles.EMPHASIS)))
-
-            entry_result = self.__process_iterable_entry(entry, download, collections.ChainMap({
-                'playlist_index': playlist_index,
-                'playlist_autonumber': i + 1,
-            }, extra))
-            if not entry_result:
-                failures += 1
-            if failures >= max_failures:
-                self.report_error(
-                    f'Skipping the remaining entries in playlist "{title}" since {failures} items failed extraction')
-                break
-            if keep_resolved_entries:
-                resolved_entries[i] = (playlist_index, entry_result)
+                self.to_screen('[download] Downloading item %s of %s' % (
+                    self._format_screen(i + 1, self.Styles.ID), self._format_screen(n_entries, self.Styles.EMPHASIS)))
+
+                yield i, playlist_index, functools.partial(
+                    self.__process_iterable_entry, entry, download, collections.ChainMap({
+                        'playlist_index': playlist_index,
+                        'playlist_autonumber': i + 1,
+                    }, extra))
+
+        failures = 0
+        max_failures = self.params.get('skip_playlist_after_errors') or float('inf')
+        with contextlib.closing(self.__run_playlist_jobs(entry_jobs())) as entry_results:
+            for i, playlist_index, entry_result in entry_results:
+                if not entry_result:
+                    failures += 1
+                if failures >= max_failures:
+                    self.report_error(
+                        f'Skipping the remaining entries in playlist "{title}" since {failures} items failed extraction')
+                    break
+                if keep_resolved_entries:
+                    resolved_entries[i] = (playlist_index, entry_result)
 
         # Update with processed data
         ie_result['entries'] = [e for _, e in resolved_entries if e is not NO_DEFAULT]
@@ -2052,6 +2262,9 @@ def __process_playlist(self, ie_result, download):
             # Do not set for full playlist
             ie_result.pop('requested_entries')
 
+        # The entries are completed by their post-processing, which may be running in the background
+        self._wait_for_submitted_post_processing()
+
         # Write the updated info to json
         if _infojson_written is True and self._write_info_json(
                 'updated playlist', ie_result,
@@ -2062,6 +2275,63 @@ def __process_playlist(self, ie_result, download):
         self.to_screen(f'[download] Finished downloading playlist: {title}')
         return ie_result
 
+    def __run_playlist_jobs(self, jobs):
+        """
+        Run the jobs yielded by __process_playlist and yield their results in order.
+        With concurrent_playlist_entries, the jobs are run in a thread pool
+        """
+        max_workers = self.params.get('concurrent_playlist_entries') or 1
+        # The entries of nested playlists are processed in the worker thread of the outer entry
+        if max_workers <= 1 or getattr(self._thread_state, 'playlist_cancelled', None):
+            for i, playlist_index, job in jobs:
+                yield i, playlist_index, job()
+            return
+
+        playlist_level, playlist_urls = self._playlist_level, self._playlist_urls
+        url_downloads = getattr(self._thread_state, 'url_downloads', None)
+        # Like when processing sequentially, a failed entry cancels only the entries after it
+        failed_at = float('inf')
+
+        def run_job(i, job):
+            nonlocal failed_at
+            state = self._thread_state
+            state.playlist_level, state.playlist_urls = playlist_level, playlist_urls
+            state.url_downloads = url_downloads
+            state.playlist_cancelled = lambda: failed_at < i
+            try:
+                self._check_download_cancelled()
+                return job()
+            except BaseException:
+                with self._download_lock:
+                    failed_at = min(failed_at, i)
+                raise
+            finally:
+                del state.playlist_level, state.playlist_urls, state.url_downloads, state.playlist_cancelled
+
+        pending = collections.deque()
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='yt-dlp-playlist')
+        try:
+            while True:
+                job = len(pending) < max_workers and next(jobs, None)
+                if job:
+                    i, playlist_index, job = job
+                    pending.append((i, playlist_index, pool.submit(run_job, i, job)))
+                    continue
+                elif not pending:
+                    break
+                i, playlist_index, future = pending.popleft()
+                # Wait with a timeout so that KeyboardInterrupt is not blocked on Windows
+                while not concurrent.futures.wait([future], timeout=0.1).done:
+                    pass
+                yield i, playlist_index, future.result()
+        except BaseException as e:  # Including GeneratorExit, when the remaining entries are skipped
+            failed_at = -1
+            for *_, future in pending:
+                future.cancel()
+            pool.shutdown(wait=not isinstance(e, KeyboardInterrupt))
+            raise
+        pool.shutdown()
+
     @_handle_extraction_exceptions
     def __process_iterable_entry(self, entry, download, extra_info):
         return self.process_ie_result(
@@ -2961,6 +3231,7 @@ def to_screen(*msg):
                     to_screen(f'Downloading {len(requested_ranges)} time ranges:',
                               (f'{c["start_time"]:.1f}-{c["end_time"]:.1f}' for c in requested_ranges))
             max_downloads_reached = False
+            defer_post_process = self._post_processing_workers() > 0
 
             for fmt, chapter in itertools.product(formats_to_download, requested_ranges):
                 new_info = self._copy_infodict(info_dict)
@@ -2977,26 +3248,53 @@ def to_screen(*msg):
                         'section_title': chapter.get('title'),
                         'section_number': chapter.get('index'),
                     })
+                if defer_post_process:
+                    new_info['__defer_post_process'] = True
                 downloaded_formats.append(new_info)
                 try:
                     self.process_info(new_info)
                 except MaxDownloadsReached:
                     max_downloads_reached = True
                 self._raise_pending_errors(new_info)
-                # Remove copied info
-                for key, val in tuple(new_info.items()):
-                    if info_dict.get(key) == val:
-                        new_info.pop(key)
                 if max_downloads_reached:
                     break
 
-            write_archive = {f.get('__write_download_archive', False) for f in downloaded_formats}
-            assert write_archive.issubset({True, False, 'ignore'})
-            if True in write_archive and False not in write_archive:
-                self.record_download_archive(info_dict)
+            copied_info = dict(info_dict)
+
+            def post_process_video():
+                for new_info in downloaded_formats:
+                    post_process = new_info.pop('__defer_post_process', None)
+                    if callable(post_process):
+                        post_process()
+                    # Remove copied info
+                    for key, val in tuple(new_info.items()):
+                        if copied_info.get(key) == val:
+                            new_info.pop(key)
+
+                self._wait_for_previous_post_processing()
+                write_archive = {f.get('__write_download_archive', False) for f in downloaded_formats}
+                assert write_archive.issubset({True, False, 'ignore'})
+                if True in write_archive and False not in write_archive:
+                    self.record_download_archive(info_dict)
+
+                info_dict['requested_downloads'] = downloaded_formats
+                return self.run_all_pps('after_video', info_dict)
+
+            if defer_post_process:
+                def deferred_post_process_video():
+                    # info_dict has already been returned to the caller, so it is completed in place
+                    new_info = post_process_video()
+                    new_info.update(best_format)
+                    if new_info is not info_dict:
+                        info_dict.clear()
+                        info_dict.update(new_info)
+
+                self._submit_post_processing(deferred_post_process_video)
+                if max_downloads_reached:
+                    raise MaxDownloadsReached()
+                return info_dict
 
-            info_dict['requested_downloads'] = downloaded_formats
-            info_dict = self.run_all_pps('after_video', info_dict)
+            info_dict = post_process_video()
             if max_downloads_reached:
                 raise MaxDownloadsReached()
 
@@ -3131,9 +3429,9 @@ def print_field(field, actual_field=None, optional=False):
         print_field('format')
 
         if self.params.get('forcejson'):
-            self.to_stdout(json.dumps(self.sanitize_info(info_dict)))
+            self.to_stdout(json.dumps(self.sanitize_info(info_dict), default=list))
 
-    def dl(self, name, info, subtitle=False, test=False):
+    def dl(self, name, info, subtitle=False, test=False, *, progress_line=None):
         if not info.get('url'):
             self.raise_no_formats(info, True)
 
@@ -3151,11 +3449,15 @@ def dl(self, name, info, subtitle=False, test=False):
                 '_no_ytdl_file': True,
             }
         else:
-            params = self.params
+            params = self._progress_params()
         fd = get_suitable_downloader(info, params, to_stdout=(name == '-'))(self, params)
+        if progress_line is not None:
+            fd.share_multiline_status(*progress_line)
         if not test:
             for ph in self._progress_hooks:
                 fd.add_progress_hook(ph)
+            check_cancelled = self._download_cancelled_checker()
+            fd.add_progress_hook(lambda _: check_cancelled())
             urls = '", "'.join(
                 (f['url'].split(',')[0] + ',<data>' if f['url'].startswith('data:') else f['url'])
                 for f in info.get('requested_formats', []) or [info])
@@ -3168,6 +3470,54 @@ def dl(self, name, info, subtitle=False, test=False):
             new_info['http_headers'] = self._calc_headers(new_info)
         return fd.download(name, new_info, subtitle)
 
+    def _dl_formats(self, downloads):
+        """
+        Download the formats [(filename, info_dict), ...] that are to be merged.
+        The formats are downloaded at the same time unless concurrent_formats is disabled.
+        Returns the (success, real_download) of each format
+        """
+        if (len(downloads) < 2 or not self.params.get('concurrent_formats', True)
+                or downloads[0][0] == '-' or self.params.get('ratelimit')
+                # External downloaders write their own progress to the console
+                or any(issubclass(get_suitable_downloader(info, self.params), ExternalFD) for _, info in downloads)):
+            return [self.dl(filename, info) for filename, info in downloads]
+
+        parent_state = dict(vars(self._thread_state))
+        # The first failure of a format cancels the others. None means that it did not raise an exception
+        failures = []
+        status = FileDownloader(self, self._progress_params())
+        status._prepare_multiline_status(len(downloads))
+
+        def download(idx, filename, info):
+            vars(self._thread_state).update(parent_state, formats_cancelled=lambda: bool(failures))
+            try:
+                result = self.dl(filename, info, progress_line=(status, idx))
+            except BaseException as e:
+                with self._download_lock:
+                    failures.append(e)
+                raise
+            if not result[0]:
+                with self._download_lock:
+                    failures.append(None)
+            return result
+
+        pool = concurrent.futures.ThreadPoolExecutor(len(downloads), thread_name_prefix='yt-dlp-format')
+        futures = [pool.submit(download, idx, *args) for idx, args in enumerate(downloads)]
+        try:
+            # Wait with a timeout so that KeyboardInterrupt is not blocked on Windows
+            while concurrent.futures.wait(futures, timeout=0.1).not_done:
+                pass
+        except BaseException:
+            failures.append(None)
+            raise
+        finally:
+            pool.shutdown(wait=False)
+            status._finish_multiline_status()
+        if failures and failures[0] is not None:
+            raise failures[0]
+        # The other formats raised DownloadCancelled since a format failed
+        return [(False, False) if future.exception() else future.result() for future in futures]
+
     def existing_file(self, filepaths, *, default_overwrite=True):
         existing_files = list(filter(os.path.exists, orderedSet(filepaths)))
         if existing_files and not self.params.get('overwrites', default_overwrite):
@@ -3203,7 +3553,17 @@ def replace_info_dict(new_info):
 
         new_info, _ = self.pre_process(info_dict, 'video')
         replace_info_dict(new_info)
-        self._num_downloads += 1
+
+        def check_max_downloads():
+            if self._num_downloads >= float(self.params.get('max_downloads') or 'inf'):
+                raise MaxDownloadsReached()
+
+        with self._download_lock:
+            self._check_download_cancelled()
+            # When downloading concurrently, other threads may have reached the limit in the meantime
+            check_max_downloads()
+            self._num_downloads += 1
+            info_dict['__num_downloads'] = self._num_downloads
 
         # info_dict['_filename'] needs to be set for backward compatibility
         info_dict['_filename'] = full_filename = self.prepare_filename(info_dict, warn=True)
@@ -3213,10 +3573,6 @@ def replace_info_dict(new_info):
         # Forced printings
         self.__forced_printings(info_dict, full_filename, incomplete=('format' not in info_dict))
 
-        def check_max_downloads():
-            if self._num_downloads >= float(self.params.get('max_downloads') or 'inf'):
-                raise MaxDownloadsReached()
-
         if self.params.get('simulate'):
             info_dict['__write_download_archive'] = self.params.get('force_write_download_archive')
             check_max_downloads()
@@ -3415,6 +3771,7 @@ def correct_ext(filename, ext=new_ext):
                                 f'You have requested downloading multiple formats to stdout {reason}. '
                                 'The formats will be streamed one after the other')
                             fname = temp_filename
+                        downloads = []
                         for f in info_dict['requested_formats']:
                             new_info = dict(info_dict)
                             del new_info['requested_formats']
@@ -3427,7 +3784,8 @@ def correct_ext(filename, ext=new_ext):
                                     return
                                 f['filepath'] = fname
                                 downloaded.append(fname)
-                            partial_success, real_download = self.dl(fname, new_info)
+                            downloads.append((fname, new_info))
+                        for partial_success, real_download in self._dl_formats(downloads):
                             info_dict['__real_download'] = info_dict['__real_download'] or real_download
                             success = success and partial_success
 
@@ -3522,18 +3880,26 @@ def ffmpeg_fixup(cndn, msg, cls):
                     ffmpeg_fixup(downloader == 'web_socket_fragment', 'Malformed duration detected', FFmpegFixupDurationPP)
 
                 fixup()
-                try:
-                    replace_info_dict(self.post_process(dl_filename, info_dict, files_to_move))
-                except PostProcessingError as err:
-                    self.report_error('Postprocessing: %s' % str(err))
-                    return
-                try:
-                    for ph in self._post_hooks:
-                        ph(info_dict['filepath'])
-                except Exception as err:
-                    self.report_error('post hooks: %s' % str(err))
-                    return
-                info_dict['__write_download_archive'] = True
+
+                def post_process():
+                    try:
+                        replace_info_dict(self.post_process(dl_filename, info_dict, files_to_move))
+                    except PostProcessingError as err:
+                        self.report_error('Postprocessing: %s' % str(err))
+                        return
+                    self._wait_for_previous_post_processing()
+                    try:
+                        for ph in self._post_hooks:
+                            ph(info_dict['filepath'])
+                    except Exception as err:
+                        self.report_error('post hooks: %s' % str(err))
+                        return
+                    info_dict['__write_download_archive'] = True
+
+                if info_dict.get('__defer_post_process'):
+                    info_dict['__defer_post_process'] = post_process
+                else:
+                    post_process()
 
         assert info_dict is original_infodict  # Make sure the info_dict was modified in-place
         if self.params.get('force_write_download_archive'):
@@ -3554,8 +3920,10 @@ def wrapper(*args, **kwargs):
                 self._num_downloads = 0
             else:
                 if self.params.get('dump_single_json', False):
+                    # The post-processing completes the info
+                    self._wait_for_submitted_post_processing()
                     self.post_extract(res)
-                    self.to_stdout(json.dumps(self.sanitize_info(res)))
+                    self.to_stdout(json.dumps(self.sanitize_info(res), default=list))
         return wrapper
 
     def download(self, url_list):
@@ -3568,12 +3936,57 @@ def download(self, url_list):
                 and self.params.get('max_downloads') != 1):
             raise SameFileError(outtmpl)
 
-        for url in url_list:
-            self.__download_wrapper(self.extract_info)(
-                url, force_generic_extractor=self.params.get('force_generic_extractor', False))
+        download_url = functools.partial(
+            self.__download_wrapper(self.extract_info),
+            force_generic_extractor=self.params.get('force_generic_extractor', False))
+        max_workers = min(self.params.get('concurrent_downloads') or 1, len(url_list))
+        if max_workers > 1:
+            self.__download_concurrently(download_url, url_list, max_workers)
+        else:
+            for url in url_list:
+                download_url(url)
 
+        self._wait_for_post_processing()
         return self._download_retcode
 
+    def __download_concurrently(self, download_url, url_list, max_workers):
+        error = None
+
+        def download_worker(url):
+            nonlocal error
+            if error is not None:
+                return
+            self._thread_state.concurrent_url = True
+            if self.params.get('break_per_url'):
+                self._thread_state.url_downloads = [0]
+            try:
+                download_url(url)
+            except BaseException as e:
+                with self._download_lock:
+                    error = error or e
+                # The running downloads are within the limit and are allowed to finish
+                if not isinstance(e, MaxDownloadsReached):
+                    self._download_cancelled.set()
+
+        self._download_cancelled.clear()
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='yt-dlp-download')
+        futures = [pool.submit(download_worker, url) for url in url_list]
+        try:
+            # Wait with a timeout so that KeyboardInterrupt is not blocked on Windows
+            while concurrent.futures.wait(futures, timeout=0.1).not_done:
+                pass
+        except BaseException:
+            # The running downloads are aborted by _check_download_cancelled
+            self._download_cancelled.set()
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=False)
+        self._download_cancelled.clear()
+        if error is not None:
+            raise error
+
     def download_with_info_file(self, info_filename):
         with contextlib.closing(fileinput.FileInput(
                 [info_filename], mode='r',
@@ -3594,6 +4007,7 @@ def download_with_info_file(self, info_filename):
                 self.download([webpage_url])
             except ExtractorError as e:
                 self.report_error(e)
+        self._wait_for_post_processing()
         return self._download_retcode
 
     @staticmethod
@@ -3622,6 +4036,8 @@ def sanitize_info(info_dict, remove_private_keys=False):
         def filter_fn(obj):
             if isinstance(obj, dict):
                 return {k: filter_fn(v) for k, v in obj.items() if not reject(k, v)}
+            elif isinstance(obj, JSONLinesList):
+                return JSONLinesList(map(filter_fn, obj))
             elif isinstance(obj, (list, tuple, set, LazyList)):
                 return list(map(filter_fn, obj))
             elif obj is None or isinstance(obj, (str, int, float, bool)):
@@ -3710,6 +4126,75 @@ def post_process(self, filename, info, files_to_move=None):
         del info['__files_to_move']
         return self.run_all_pps('after_move', info)
 
+    def _post_processing_workers(self):
+        # The post-processing of the entries of a video is done in the worker of the video itself
+        if hasattr(self._thread_state, 'pp_previous'):
+            return 0
+        return self.params.get('postprocessor_workers') or 0
+
+    def _submit_post_processing(self, func):
+        """
+        Run func in the background post-processing workers.
+        The downloads are paused while postprocessor_queue_size videos are waiting
+        """
+        with self._download_lock:
+            if self._pp_pool is None:
+                max_workers = self._post_processing_workers()
+                self._pp_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers, thread_name_prefix='yt-dlp-postprocess')
+                self._pp_queue = threading.BoundedSemaphore(
+                    max_workers + (self.params.get('postprocessor_queue_size') or max_workers))
+        self._raise_post_processing_error()
+        # Acquire with a timeout so that KeyboardInterrupt is not blocked on Windows
+        while not self._pp_queue.acquire(timeout=0.1):
+            pass
+
+        def run(previous):
+            self._thread_state.pp_previous = previous
+            try:
+                return func()
+            finally:
+                del self._thread_state.pp_previous
+                self._pp_queue.release()
+
+        with self._download_lock:
+            previous = self._pp_futures[-1] if self._pp_futures else None
+            self._pp_futures.append(self._pp_pool.submit(run, previous))
+
+    def _wait_for_previous_post_processing(self):
+        """Wait until the videos submitted before the current one have been post-processed"""
+        previous = getattr(self._thread_state, 'pp_previous', None)
+        if previous is not None:
+            concurrent.futures.wait([previous])
+
+    def _wait_for_submitted_post_processing(self):
+        """Wait until the videos submitted so far have been post-processed. Their errors are raised later"""
+        # The videos of a post-processing worker are not deferred, and waiting there would deadlock
+        if hasattr(self._thread_state, 'pp_previous'):
+            return
+        with self._download_lock:
+            futures = list(self._pp_futures)
+        # Wait with a timeout so that KeyboardInterrupt is not blocked on Windows
+        while concurrent.futures.wait(futures, timeout=0.1).not_done:
+            pass
+
+    def _raise_post_processing_error(self):
+        """Forget the finished post-processing jobs, raising the error of the first failed one"""
+        with self._download_lock:
+            while self._pp_futures and self._pp_futures[0].done():
+                error = self._pp_futures.popleft().exception()
+                if error is not None:
+                    raise error
+
+    def _wait_for_post_processing(self):
+        """Wait for the background post-processing to finish, raising the first error"""
+        while self._pp_futures:
+            with self._download_lock:
+                futures = list(self._pp_futures)
+            # Wait with a timeout so that KeyboardInterrupt is not blocked on Windows
+            concurrent.futures.wait(futures, timeout=0.1)
+            self._raise_post_processing_error()
+
     def _make_archive_id(self, info_dict):
         video_id = info_dict.get('id')
         if not video_id:
@@ -3722,7 +4207,7 @@ def _make_archive_id(self, info_dict):
             if not url:
                 return
             # Try to find matching extractor for the URL and take its ie_key
-            for ie_key, ie in self._ies.items():
+            for ie_key, ie in self._iter_candidate_ies(url):
                 if ie.suitable(url):
                     extractor = ie_key
                     break
@@ -3746,10 +4231,8 @@ def record_download_archive(self, info_dict):
         assert vid_id
 
         self.write_debug(f'Adding to archive: {vid_id}')
-        if is_path_like(fn):
-            with locked_file(fn, 'a', encoding='utf-8') as archive_file:
-                archive_file.write(vid_id + '\n')
-        self.archive.add(vid_id)
+        with self._download_lock:
+            self.archive.add(vid_id)
 
     @staticmethod
     def format_resolution(format, default='unknown'):
@@ -4126,8 +4609,20 @@ def urlopen(self, req):
 
         clean_proxies(proxies=req.proxies, headers=req.headers)
         clean_headers(req.headers)
+        cache = req.extensions.pop('cache', None)
 
         try:
+            if cache and self._http_cache and HTTPCache.is_cacheable(
+                    req, req.extensions.get('cookiejar') or self.cookiejar):
+                impersonate = req.extensions.get('impersonate') or self.params.get('impersonate')
+                return self._http_cache.send(
+                    req, self._request_director.send, ttl=cache,
+                    headers=HTTPHeaderDict(self.params['http_headers'], req.headers), context={
+                        'proxies': req.proxies or self.proxies,
+                        'impersonate': impersonate and str(impersonate),
+                        # Set by the extractors for geo bypass
+                        'x_forwarded_for': req.headers.get('X-Forwarded-For'),
+                    })
             return self._request_director.send(req)
         except NoSupportingHandlers as e:
             for ue in e.unsupported_errors:
@@ -4210,6 +4705,15 @@ def build_request_director(self, handlers, preferences=None):
     def _request_director(self):
         return self.build_request_director(_REQUEST_HANDLERS.values(), _RH_PREFERENCES)
 
+    @functools.cached_property
+    def _http_cache(self):
+        if not self.params.get('http_cache') or not self.cache.enabled:
+            return None
+        elif not HTTPCache.available():
+            self.report_warning('Cannot use the HTTP cache since sqlite3 is not available')
+            return None
+        return HTTPCache(os.path.join(self.cache._get_root_dir(), 'http-cache.sqlite3'), _YDLLogger(self))
+
     def encode(self, s):
         if isinstance(s, bytes):
             return s  # Already encoded
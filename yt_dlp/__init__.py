@@ -203,6 +203,11 @@ def validate_minmax(min_val, max_val, min_name, max_name=None):
     validate_positive('autonumber start', opts.autonumber_start)
     validate_positive('autonumber size', opts.autonumber_size, True)
     validate_positive('concurrent fragments', opts.concurrent_fragment_downloads, True)
+    validate_positive('HTTP connections', opts.http_connections, True)
+    validate_positive('fragment host connections', opts.fragment_host_connections, True)
+    validate_positive('concurrent downloads', opts.concurrent_downloads, True)
+    validate_positive('concurrent playlist entries', opts.concurrent_playlist_entries, True)
+    validate_positive('postprocessor workers', opts.postprocessor_workers)
     validate_positive('playlist start', opts.playliststart, True)
     if opts.playlistend != -1:
         validate_minmax(opts.playliststart, opts.playlistend, 'playlist start', 'playlist end')
@@ -829,9 +834,14 @@ def parse_options(argv=None):
         'skip_unavailable_fragments': opts.skip_unavailable_fragments,
         'keep_fragments': opts.keep_fragments,
         'concurrent_fragment_downloads': opts.concurrent_fragment_downloads,
+        'concurrent_downloads': opts.concurrent_downloads,
+        'concurrent_playlist_entries': opts.concurrent_playlist_entries,
+        'concurrent_formats': opts.concurrent_formats,
         'buffersize': opts.buffersize,
         'noresizebuffer': opts.noresizebuffer,
         'http_chunk_size': opts.http_chunk_size,
+        'http_connections': opts.http_connections,
+        'fragment_host_connections': opts.fragment_host_connections,
         'continuedl': opts.continue_dl,
         'noprogress': opts.quiet if opts.noprogress is None else opts.noprogress,
         'progress_with_newline': opts.progress_with_newline,
@@ -853,6 +863,7 @@ def parse_options(argv=None):
         'allow_playlist_files': opts.allow_playlist_files,
         'clean_infojson': opts.clean_infojson,
         'getcomments': opts.getcomments,
+        'stream_comments': opts.stream_comments,
         'writethumbnail': opts.writethumbnail is True,
         'write_all_thumbnails': opts.writethumbnail == 'all',
         'writelink': opts.writelink,
@@ -882,6 +893,8 @@ def parse_options(argv=None):
         'max_views': opts.max_views,
         'daterange': opts.date,
         'cachedir': opts.cachedir,
+        'http_cache': opts.http_cache,
+        'extraction_cache': opts.extraction_cache,
         'youtube_print_sig_code': opts.youtube_print_sig_code,
         'age_limit': opts.age_limit,
         'download_archive': opts.download_archive,
@@ -915,6 +928,7 @@ def parse_options(argv=None):
         'merge_output_format': opts.merge_output_format,
         'final_ext': final_ext,
         'postprocessors': postprocessors,
+        'postprocessor_workers': opts.postprocessor_workers,
         'fixup': opts.fixup,
         'source_address': opts.source_address,
         'impersonate': opts.impersonate,
@@ -962,6 +976,12 @@ def _real_main(argv=None):
     if print_extractor_information(opts, all_urls):
         return
 
+    if opts.serve:
+        if all_urls:
+            parser.error('URLs cannot be given with --serve')
+        from .server import serve
+        return serve(opts.serve, opts.serve_workers)
+
     # We may need ffmpeg_location without having access to the YoutubeDL instance
     # See https://github.com/yt-dlp/yt-dlp/issues/2191
     if opts.ffmpeg_location:
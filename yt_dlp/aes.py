@@ -1,4 +1,6 @@
 import base64
+import functools
+import struct
 from math import ceil
 
 from .compat import compat_ord
@@ -17,11 +19,11 @@ def aes_gcm_decrypt_and_verify_bytes(data, key, tag, nonce):
 else:
     def aes_cbc_decrypt_bytes(data, key, iv):
         """ Decrypt bytes with AES-CBC using native implementation since pycryptodome is unavailable """
-        return intlist_to_bytes(aes_cbc_decrypt(*map(bytes_to_intlist, (data, key, iv))))
+        return _cbc_decrypt(data, key, iv)
 
     def aes_gcm_decrypt_and_verify_bytes(data, key, tag, nonce):
         """ Decrypt bytes with AES-GCM using native implementation since pycryptodome is unavailable """
-        return intlist_to_bytes(aes_gcm_decrypt_and_verify(*map(bytes_to_intlist, (data, key, tag, nonce))))
+        return _gcm_decrypt_and_verify(data, key, tag, nonce)
 
 
 def aes_cbc_encrypt_bytes(data, key, iv, **kwargs):
@@ -136,21 +138,7 @@ def aes_ctr_encrypt(data, key, iv):
     @param {int[]} iv          16-Byte initialization vector
     @returns {int[]}           encrypted data
     """
-    expanded_key = key_expansion(key)
-    block_count = int(ceil(float(len(data)) / BLOCK_SIZE_BYTES))
-    counter = iter_vector(iv)
-
-    encrypted_data = []
-    for i in range(block_count):
-        counter_block = next(counter)
-        block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
-        block += [0] * (BLOCK_SIZE_BYTES - len(block))
-
-        cipher_counter_block = aes_encrypt(counter_block, expanded_key)
-        encrypted_data += xor(block, cipher_counter_block)
-    encrypted_data = encrypted_data[:len(data)]
-
-    return encrypted_data
+    return bytes_to_intlist(_ctr_crypt(*map(intlist_to_bytes, (data, key, iv))))
 
 
 def aes_cbc_decrypt(data, key, iv):
@@ -162,21 +150,7 @@ def aes_cbc_decrypt(data, key, iv):
     @param {int[]} iv          16-Byte IV
     @returns {int[]}           decrypted data
     """
-    expanded_key = key_expansion(key)
-    block_count = int(ceil(float(len(data)) / BLOCK_SIZE_BYTES))
-
-    decrypted_data = []
-    previous_cipher_block = iv
-    for i in range(block_count):
-        block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
-        block += [0] * (BLOCK_SIZE_BYTES - len(block))
-
-        decrypted_block = aes_decrypt(block, expanded_key)
-        decrypted_data += xor(decrypted_block, previous_cipher_block)
-        previous_cipher_block = block
-    decrypted_data = decrypted_data[:len(data)]
-
-    return decrypted_data
+    return bytes_to_intlist(_cbc_decrypt(*map(intlist_to_bytes, (data, key, iv))))
 
 
 def aes_cbc_encrypt(data, key, iv, *, padding_mode='pkcs7'):
@@ -218,37 +192,7 @@ def aes_gcm_decrypt_and_verify(data, key, tag, nonce):
     @param {int[]} nonce       IV (recommended 12-Byte)
     @returns {int[]}           decrypted data
     """
-
-    # XXX: check aes, gcm param
-
-    hash_subkey = aes_encrypt([0] * BLOCK_SIZE_BYTES, key_expansion(key))
-
-    if len(nonce) == 12:
-        j0 = nonce + [0, 0, 0, 1]
-    else:
-        fill = (BLOCK_SIZE_BYTES - (len(nonce) % BLOCK_SIZE_BYTES)) % BLOCK_SIZE_BYTES + 8
-        ghash_in = nonce + [0] * fill + bytes_to_intlist((8 * len(nonce)).to_bytes(8, 'big'))
-        j0 = ghash(hash_subkey, ghash_in)
-
-    # TODO: add nonce support to aes_ctr_decrypt
-
-    # nonce_ctr = j0[:12]
-    iv_ctr = inc(j0)
-
-    decrypted_data = aes_ctr_decrypt(data, key, iv_ctr + [0] * (BLOCK_SIZE_BYTES - len(iv_ctr)))
-    pad_len = len(data) // 16 * 16
-    s_tag = ghash(
-        hash_subkey,
-        data
-        + [0] * (BLOCK_SIZE_BYTES - len(data) + pad_len)        # pad
-        + bytes_to_intlist((0 * 8).to_bytes(8, 'big')           # length of associated data
-                           + ((len(data) * 8).to_bytes(8, 'big')))  # length of data
-    )
-
-    if tag != aes_ctr_encrypt(s_tag, key, j0):
-        raise ValueError("Mismatching authentication tag")
-
-    return decrypted_data
+    return bytes_to_intlist(_gcm_decrypt_and_verify(*map(intlist_to_bytes, (data, key, tag, nonce))))
 
 
 def aes_encrypt(data, expanded_key):
@@ -433,12 +377,6 @@ def key_expansion(data):
     return data
 
 
-def iter_vector(iv):
-    while True:
-        yield iv
-        iv = inc(iv)
-
-
 def sub_bytes(data):
     return [SBOX[x] for x in data]
 
@@ -482,66 +420,177 @@ def shift_rows_inv(data):
     return [data[((column - row) & 0b11) * 4 + row] for column in range(4) for row in range(4)]
 
 
-def shift_block(data):
-    data_shifted = []
-
-    bit = 0
-    for n in data:
-        if bit:
-            n |= 0x100
-        bit = n & 1
-        n >>= 1
-        data_shifted.append(n)
-
-    return data_shifted
-
-
-def inc(data):
-    data = data[:]  # copy
-    for i in range(len(data) - 1, -1, -1):
-        if data[i] == 255:
-            data[i] = 0
-        else:
-            data[i] = data[i] + 1
-            break
-    return data
-
-
-def block_product(block_x, block_y):
-    # NIST SP 800-38D, Algorithm 1
-
-    if len(block_x) != BLOCK_SIZE_BYTES or len(block_y) != BLOCK_SIZE_BYTES:
-        raise ValueError("Length of blocks need to be %d bytes" % BLOCK_SIZE_BYTES)
-
-    block_r = [0xE1] + [0] * (BLOCK_SIZE_BYTES - 1)
-    block_v = block_y[:]
-    block_z = [0] * BLOCK_SIZE_BYTES
-
-    for i in block_x:
-        for bit in range(7, -1, -1):
-            if i & (1 << bit):
-                block_z = xor(block_z, block_v)
+# The T-table implementation below works on 32-bit big-endian words instead of lists of bytes.
+# Each table combines SubBytes and MixColumns for one row of the state, so that a round is
+# 16 table lookups. The equivalent inverse cipher (FIPS-197 5.3.5) is used for decryption
+
+
+def _gf_mul(a, b):
+    return 0 if a == 0 or b == 0 else RIJNDAEL_EXP_TABLE[(RIJNDAEL_LOG_TABLE[a] + RIJNDAEL_LOG_TABLE[b]) % 0xFF]
+
+
+def _make_t_tables(sbox, matrix):
+    c0, c1, c2, c3 = (row[0] for row in matrix)
+    table = tuple(
+        _gf_mul(x, c0) << 24 | _gf_mul(x, c1) << 16 | _gf_mul(x, c2) << 8 | _gf_mul(x, c3) for x in sbox)
+    return tuple(tuple((word >> shift | word << (32 - shift)) & 0xFFFFFFFF for word in table) for shift in (0, 8, 16, 24))
+
+
+_ENCRYPTION_TABLES = _make_t_tables(SBOX, MIX_COLUMN_MATRIX)
+_DECRYPTION_TABLES = _make_t_tables(SBOX_INV, MIX_COLUMN_MATRIX_INV)
+
+
+@functools.lru_cache(maxsize=16)
+def _encryption_key_words(key):
+    expanded_key = key_expansion(bytes_to_intlist(key))
+    return struct.unpack(f'>{len(expanded_key) // 4}I', bytes(expanded_key))
+
+
+@functools.lru_cache(maxsize=16)
+def _decryption_key_words(key):
+    td0, td1, td2, td3 = _DECRYPTION_TABLES
+    words = _encryption_key_words(key)
+    last = len(words) // 4 - 1
+    decryption_words = []
+    for i in range(last, -1, -1):
+        round_key = words[i * 4: i * 4 + 4]
+        if 0 < i < last:
+            # InvMixColumns. The S-box lookup cancels the inverse S-box in the tables
+            round_key = (td0[SBOX[w >> 24]] ^ td1[SBOX[w >> 16 & 0xFF]] ^ td2[SBOX[w >> 8 & 0xFF]] ^ td3[SBOX[w & 0xFF]]
+                         for w in round_key)
+        decryption_words.extend(round_key)
+    return tuple(decryption_words)
+
+
+def _encrypt_block(s0, s1, s2, s3, rk):
+    te0, te1, te2, te3 = _ENCRYPTION_TABLES
+    s0, s1, s2, s3 = s0 ^ rk[0], s1 ^ rk[1], s2 ^ rk[2], s3 ^ rk[3]
+    for i in range(4, len(rk) - 4, 4):
+        s0, s1, s2, s3 = (
+            te0[s0 >> 24] ^ te1[s1 >> 16 & 0xFF] ^ te2[s2 >> 8 & 0xFF] ^ te3[s3 & 0xFF] ^ rk[i],
+            te0[s1 >> 24] ^ te1[s2 >> 16 & 0xFF] ^ te2[s3 >> 8 & 0xFF] ^ te3[s0 & 0xFF] ^ rk[i + 1],
+            te0[s2 >> 24] ^ te1[s3 >> 16 & 0xFF] ^ te2[s0 >> 8 & 0xFF] ^ te3[s1 & 0xFF] ^ rk[i + 2],
+            te0[s3 >> 24] ^ te1[s0 >> 16 & 0xFF] ^ te2[s1 >> 8 & 0xFF] ^ te3[s2 & 0xFF] ^ rk[i + 3])
+    sbox, i = SBOX, len(rk) - 4
+    return (
+        (sbox[s0 >> 24] << 24 | sbox[s1 >> 16 & 0xFF] << 16 | sbox[s2 >> 8 & 0xFF] << 8 | sbox[s3 & 0xFF]) ^ rk[i],
+        (sbox[s1 >> 24] << 24 | sbox[s2 >> 16 & 0xFF] << 16 | sbox[s3 >> 8 & 0xFF] << 8 | sbox[s0 & 0xFF]) ^ rk[i + 1],
+        (sbox[s2 >> 24] << 24 | sbox[s3 >> 16 & 0xFF] << 16 | sbox[s0 >> 8 & 0xFF] << 8 | sbox[s1 & 0xFF]) ^ rk[i + 2],
+        (sbox[s3 >> 24] << 24 | sbox[s0 >> 16 & 0xFF] << 16 | sbox[s1 >> 8 & 0xFF] << 8 | sbox[s2 & 0xFF]) ^ rk[i + 3])
+
+
+def _decrypt_block(s0, s1, s2, s3, rk):
+    td0, td1, td2, td3 = _DECRYPTION_TABLES
+    s0, s1, s2, s3 = s0 ^ rk[0], s1 ^ rk[1], s2 ^ rk[2], s3 ^ rk[3]
+    for i in range(4, len(rk) - 4, 4):
+        s0, s1, s2, s3 = (
+            td0[s0 >> 24] ^ td1[s3 >> 16 & 0xFF] ^ td2[s2 >> 8 & 0xFF] ^ td3[s1 & 0xFF] ^ rk[i],
+            td0[s1 >> 24] ^ td1[s0 >> 16 & 0xFF] ^ td2[s3 >> 8 & 0xFF] ^ td3[s2 & 0xFF] ^ rk[i + 1],
+            td0[s2 >> 24] ^ td1[s1 >> 16 & 0xFF] ^ td2[s0 >> 8 & 0xFF] ^ td3[s3 & 0xFF] ^ rk[i + 2],
+            td0[s3 >> 24] ^ td1[s2 >> 16 & 0xFF] ^ td2[s1 >> 8 & 0xFF] ^ td3[s0 & 0xFF] ^ rk[i + 3])
+    sbox, i = SBOX_INV, len(rk) - 4
+    return (
+        (sbox[s0 >> 24] << 24 | sbox[s3 >> 16 & 0xFF] << 16 | sbox[s2 >> 8 & 0xFF] << 8 | sbox[s1 & 0xFF]) ^ rk[i],
+        (sbox[s1 >> 24] << 24 | sbox[s0 >> 16 & 0xFF] << 16 | sbox[s3 >> 8 & 0xFF] << 8 | sbox[s2 & 0xFF]) ^ rk[i + 1],
+        (sbox[s2 >> 24] << 24 | sbox[s1 >> 16 & 0xFF] << 16 | sbox[s0 >> 8 & 0xFF] << 8 | sbox[s3 & 0xFF]) ^ rk[i + 2],
+        (sbox[s3 >> 24] << 24 | sbox[s2 >> 16 & 0xFF] << 16 | sbox[s1 >> 8 & 0xFF] << 8 | sbox[s0 & 0xFF]) ^ rk[i + 3])
+
+
+def _to_words(data):
+    """Split the data into words, padding the last block with zeros"""
+    data = bytes(data) + bytes(-len(data) % BLOCK_SIZE_BYTES)
+    return struct.unpack(f'>{len(data) // 4}I', data)
+
+
+def _from_words(words, length):
+    return struct.pack(f'>{len(words)}I', *words)[:length]
+
+
+def _cbc_decrypt(data, key, iv):
+    rk = _decryption_key_words(bytes(key))
+    words = _to_words(data)
+    p0, p1, p2, p3 = _to_words(iv)[:4]
+    decrypted = []
+    for i in range(0, len(words), 4):
+        c0, c1, c2, c3 = words[i: i + 4]
+        d0, d1, d2, d3 = _decrypt_block(c0, c1, c2, c3, rk)
+        decrypted += (d0 ^ p0, d1 ^ p1, d2 ^ p2, d3 ^ p3)
+        p0, p1, p2, p3 = c0, c1, c2, c3
+    return _from_words(decrypted, len(data))
+
+
+def _ctr_crypt(data, key, iv, counter_bits=128):
+    rk = _encryption_key_words(bytes(key))
+    words = _to_words(data)
+    counter = int.from_bytes(bytes(iv).ljust(BLOCK_SIZE_BYTES, b'\x00'), 'big')
+    counter_mask = (1 << counter_bits) - 1
+    result = []
+    for i in range(0, len(words), 4):
+        k0, k1, k2, k3 = _encrypt_block(
+            counter >> 96, counter >> 64 & 0xFFFFFFFF, counter >> 32 & 0xFFFFFFFF, counter & 0xFFFFFFFF, rk)
+        result += (words[i] ^ k0, words[i + 1] ^ k1, words[i + 2] ^ k2, words[i + 3] ^ k3)
+        counter = counter & ~counter_mask | (counter + 1) & counter_mask
+    return _from_words(result, len(data))
+
+
+def _ghash_tables(subkey):
+    """
+    Tables for multiplying by the subkey in GF(2^128) one byte at a time
 
-            do_xor = block_v[-1] & 1
-            block_v = shift_block(block_v)
-            if do_xor:
-                block_v = xor(block_v, block_r)
+    tables[i][b] is the product of the subkey and a block whose i-th byte is b and whose other bytes are 0
+    """
+    # NIST SP 800-38D, Algorithm 1. Multiplying by x is a right shift in the bit-reflected representation
+    powers = []
+    for _ in range(128):
+        powers.append(subkey)
+        subkey = subkey >> 1 ^ (0xE1 << 120 if subkey & 1 else 0)
+
+    tables = []
+    for i in range(BLOCK_SIZE_BYTES):
+        table = [0] * 256
+        for bit in range(8):
+            table[1 << bit] = powers[i * 8 + 7 - bit]
+        for byte in range(1, 256):
+            lowest_bit = byte & -byte
+            table[byte] = table[byte ^ lowest_bit] ^ table[lowest_bit]
+        tables.append((120 - i * 8, table))
+    return tables
+
+
+def _ghash(tables, data):
+    # NIST SP 800-38D, Algorithm 2
+    data = bytes(data) + bytes(-len(data) % BLOCK_SIZE_BYTES)
+    last_y = 0
+    for i in range(0, len(data), BLOCK_SIZE_BYTES):
+        y = last_y ^ int.from_bytes(data[i: i + BLOCK_SIZE_BYTES], 'big')
+        last_y = 0
+        for shift, table in tables:
+            last_y ^= table[y >> shift & 0xFF]
+    return last_y
 
-    return block_z
 
+def _gcm_decrypt_and_verify(data, key, tag, nonce):
+    data, key, nonce = bytes(data), bytes(key), bytes(nonce)
+    k0, k1, k2, k3 = _encrypt_block(0, 0, 0, 0, _encryption_key_words(key))
+    tables = _ghash_tables(k0 << 96 | k1 << 64 | k2 << 32 | k3)
 
-def ghash(subkey, data):
-    # NIST SP 800-38D, Algorithm 2
+    if len(nonce) == 12:
+        j0 = nonce + b'\x00\x00\x00\x01'
+    else:
+        j0 = _ghash(tables, nonce + bytes(-len(nonce) % BLOCK_SIZE_BYTES + 8)
+                    + (8 * len(nonce)).to_bytes(8, 'big')).to_bytes(BLOCK_SIZE_BYTES, 'big')
 
-    if len(data) % BLOCK_SIZE_BYTES:
-        raise ValueError("Length of data should be %d bytes" % BLOCK_SIZE_BYTES)
+    # The counter is incremented modulo 2^32 (inc32)
+    counter = j0[:12] + ((int.from_bytes(j0[12:], 'big') + 1) & 0xFFFFFFFF).to_bytes(4, 'big')
+    decrypted_data = _ctr_crypt(data, key, counter, counter_bits=32)
 
-    last_y = [0] * BLOCK_SIZE_BYTES
-    for i in range(0, len(data), BLOCK_SIZE_BYTES):
-        block = data[i: i + BLOCK_SIZE_BYTES]
-        last_y = block_product(xor(last_y, block), subkey)
+    s_tag = _ghash(tables, data + bytes(-len(data) % BLOCK_SIZE_BYTES)
+                   + (0 * 8).to_bytes(8, 'big')  # length of associated data
+                   + (len(data) * 8).to_bytes(8, 'big'))  # length of data
+    if bytes(tag) != _ctr_crypt(s_tag.to_bytes(BLOCK_SIZE_BYTES, 'big'), key, j0):
+        raise ValueError('Mismatching authentication tag')
 
-    return last_y
+    return decrypted_data
 
 
 __all__ = [
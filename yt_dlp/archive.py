@@ -0,0 +1,168 @@
+import errno
+import os
+import threading
+
+from .dependencies import sqlite3
+from .utils import locked_file
+
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+SQLITE_MAGIC = b'SQLite format 3\x00'
+
+
+class DownloadArchive:
+    """
+    Base class for download archives, which record the IDs of downloaded videos
+
+    Subclasses must define __contains__, __iter__ and add.
+    The IDs can be imported from and exported to the text format, where each line is an ID
+    """
+
+    def __contains__(self, vid_id):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def __iter__(self):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def add(self, vid_id):
+        raise NotImplementedError('This method must be implemented by subclasses')
+
+    def update(self, vid_ids):
+        for vid_id in vid_ids:
+            self.add(vid_id)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def _read_text(filename):
+        try:
+            with locked_file(filename, 'r', encoding='utf-8') as archive_file:
+                yield from filter(None, (line.strip() for line in archive_file))
+        except OSError as ioe:
+            if ioe.errno != errno.ENOENT:
+                raise
+
+    def import_text(self, filename):
+        """Add the IDs from an archive file in the text format"""
+        self.update(self._read_text(filename))
+
+    def export_text(self, filename):
+        """Write all the IDs to a file in the text format"""
+        with locked_file(filename, 'w', encoding='utf-8') as archive_file:
+            for vid_id in self:
+                archive_file.write(vid_id + '\n')
+
+
+class TextArchive(DownloadArchive):
+    """An archive file in the text format. The whole file is loaded into memory"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._ids = set(self._read_text(filename))
+
+    def __contains__(self, vid_id):
+        return vid_id in self._ids
+
+    def __iter__(self):
+        return iter(self._read_text(self.filename))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, vid_id):
+        self.update([vid_id])
+
+    def update(self, vid_ids):
+        vid_ids = list(vid_ids)
+        if not vid_ids:
+            return
+        with locked_file(self.filename, 'a', encoding='utf-8') as archive_file:
+            archive_file.write(''.join(f'{vid_id}\n' for vid_id in vid_ids))
+        self._ids.update(vid_ids)
+
+
+class SQLiteArchive(DownloadArchive):
+    """
+    An archive in an SQLite database
+
+    IDs are looked up in the database instead of being loaded into memory.
+    The database can be safely written to by multiple processes at once
+    """
+    _TIMEOUT = 60
+
+    def __init__(self, filename):
+        if not sqlite3:
+            raise ImportError('sqlite3 is required to use an SQLite download archive. '
+                              'Please use a Python interpreter compiled with sqlite3 support')
+        self.filename = filename
+        self._lock = threading.Lock()
+        # isolation_level=None to manage the transactions manually
+        self._conn = sqlite3.connect(filename, timeout=self._TIMEOUT, isolation_level=None, check_same_thread=False)
+        try:
+            # WAL allows reading while another process is writing,
+            # but may not be supported for all file systems
+            self._conn.execute('PRAGMA journal_mode = WAL')
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.execute('CREATE TABLE IF NOT EXISTS archive (id TEXT NOT NULL PRIMARY KEY)')
+
+    def __contains__(self, vid_id):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM archive WHERE id = ?', (vid_id,)).fetchone() is not None
+
+    def __iter__(self):
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT rowid, id FROM archive WHERE rowid > ? ORDER BY rowid LIMIT 1000', (last_rowid,)).fetchall()
+            if not rows:
+                return
+            yield from (vid_id for _, vid_id in rows)
+            last_rowid = rows[-1][0]
+
+    def add(self, vid_id):
+        self.update([vid_id])
+
+    def update(self, vid_ids):
+        """Add the IDs in a single transaction"""
+        with self._lock:
+            # IMMEDIATE acquires the write lock at once, waiting for other writers up to the timeout
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany('INSERT OR IGNORE INTO archive (id) VALUES (?)', ((vid_id,) for vid_id in vid_ids))
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_sqlite_archive(filename):
+    """Whether the file is an SQLite database, or should be created as one"""
+    try:
+        with open(filename, 'rb') as f:
+            header = f.read(len(SQLITE_MAGIC))
+    except OSError:
+        header = None
+    if header:
+        return header == SQLITE_MAGIC
+    return os.path.splitext(filename)[1].lower() in SQLITE_EXTENSIONS
+
+
+def open_download_archive(filename):
+    """
+    Open the download archive at the given path.
+    Existing SQLite databases and new files with an extension in SQLITE_EXTENSIONS
+    use SQLiteArchive. Otherwise, the text format is used
+    """
+    return (SQLiteArchive if is_sqlite_archive(filename) else TextArchive)(filename)
@@ -3,16 +3,43 @@
 import os
 import re
 import shutil
+import threading
+import time
 import traceback
 import urllib.parse
 
+from .dependencies import sqlite3
 from .utils import expand_path, traverse_obj, version_tuple, write_json_file
 from .version import __version__
 
 
 class Cache:
+    """
+    The entries are stored in a single SQLite database, and those unused for _MAX_AGE seconds
+    or least recently used beyond _MAX_SIZE bytes (or the _SECTION_MAX_SIZE of their section)
+    are evicted. This includes the login state that some extractors keep in the cache.
+    Entries of the old layout of one JSON file per entry are moved into the database when
+    they are first loaded. The "file-cache" compat option (or a missing sqlite3) keeps
+    using the old layout, without eviction
+    """
+
+    _DB_FILENAME = 'cache.sqlite3'
+    _MAX_SIZE = 64 * 1024 * 1024
+    # Sections of large entries that have their own size limit, so that they do not evict the
+    # small entries of the other sections. They are also not kept in memory after being stored or loaded
+    _SECTION_MAX_SIZE = {
+        'extraction-results': 256 * 1024 * 1024,
+    }
+    _MAX_AGE = 30 * 24 * 60 * 60
+    # The access time is only updated if it is older than this, to avoid a write for every lookup
+    _ACCESS_RESOLUTION = 24 * 60 * 60
+
     def __init__(self, ydl):
         self._ydl = ydl
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = self.misses = 0
 
     def _get_root_dir(self):
         res = self._ydl.params.get('cachedir')
@@ -30,6 +57,74 @@ def _get_cache_fn(self, section, key, dtype):
     def enabled(self):
         return self._ydl.params.get('cachedir') is not False
 
+    @property
+    def _use_db(self):
+        return sqlite3 is not None and 'file-cache' not in self._ydl.params.get('compat_opts', ())
+
+    def _connect(self, create=True):
+        if self._db is None:
+            root_dir = self._get_root_dir()
+            if not create and not os.path.exists(os.path.join(root_dir, self._DB_FILENAME)):
+                return None
+            os.makedirs(root_dir, exist_ok=True)
+            # Autocommit mode; writes are grouped into explicit transactions
+            self._db = sqlite3.connect(
+                os.path.join(root_dir, self._DB_FILENAME), timeout=30, isolation_level=None, check_same_thread=False)
+            with contextlib.suppress(sqlite3.Error):  # WAL is not supported on some filesystems
+                self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS cache (
+                section TEXT NOT NULL, key TEXT NOT NULL, data TEXT NOT NULL,
+                size INTEGER NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (section, key))''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        return self._db
+
+    def _evict(self, db, section):
+        db.execute('DELETE FROM cache WHERE accessed < ?', (time.time() - self._MAX_AGE,))
+        if section in self._SECTION_MAX_SIZE:
+            where, args, max_size = 'section = ?', (section,), self._SECTION_MAX_SIZE[section]
+        else:
+            where = f'section NOT IN ({", ".join("?" * len(self._SECTION_MAX_SIZE))})'
+            args, max_size = tuple(self._SECTION_MAX_SIZE), self._MAX_SIZE
+        excess = db.execute(f'SELECT TOTAL(size) FROM cache WHERE {where}', args).fetchone()[0] - max_size
+        if excess <= 0:
+            return
+        evicted, size = [], 0
+        for section, key, entry_size in db.execute(
+                f'SELECT section, key, size FROM cache WHERE {where} ORDER BY accessed', args):
+            evicted.append((section, key))
+            size += entry_size
+            if size >= excess:
+                break
+        db.executemany('DELETE FROM cache WHERE section = ? AND key = ?', evicted)
+        self._ydl.write_debug(f'Evicted {len(evicted)} entries ({size} bytes) from cache')
+
+    def _store_db(self, section, key, serialized):
+        with self._lock:
+            db = self._connect()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                           (section, key, serialized, len(serialized), time.time()))
+                self._evict(db, section)
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def _load_db(self, section, key):
+        with self._lock:
+            db = self._connect(create=False)
+            if db is None:
+                return None
+            row = db.execute(
+                'SELECT data, accessed FROM cache WHERE section = ? AND key = ?', (section, key)).fetchone()
+            if not row:
+                return None
+            now = time.time()
+            if now - row[1] > self._ACCESS_RESOLUTION:
+                db.execute('UPDATE cache SET accessed = ? WHERE section = ? AND key = ?', (now, section, key))
+            return row[0]
+
     def store(self, section, key, data, dtype='json'):
         assert dtype in ('json',)
 
@@ -37,13 +132,21 @@ def store(self, section, key, data, dtype='json'):
             return
 
         fn = self._get_cache_fn(section, key, dtype)
+        obj = {'yt-dlp_version': __version__, 'data': data}
         try:
-            os.makedirs(os.path.dirname(fn), exist_ok=True)
             self._ydl.write_debug(f'Saving {section}.{key} to cache')
-            write_json_file({'yt-dlp_version': __version__, 'data': data}, fn)
+            if self._use_db:
+                serialized = json.dumps(obj, ensure_ascii=False)
+                self._store_db(section, key, serialized)
+                if section not in self._SECTION_MAX_SIZE:
+                    self._memory[section, key] = serialized
+            else:
+                os.makedirs(os.path.dirname(fn), exist_ok=True)
+                write_json_file(obj, fn)
         except Exception:
             tb = traceback.format_exc()
-            self._ydl.report_warning(f'Writing cache to {fn!r} failed: {tb}')
+            location = os.path.join(self._get_root_dir(), self._DB_FILENAME) if self._use_db else fn
+            self._ydl.report_warning(f'Writing cache to {location!r} failed: {tb}')
 
     def _validate(self, data, min_ver):
         version = traverse_obj(data, 'yt-dlp_version')
@@ -53,27 +156,96 @@ def _validate(self, data, min_ver):
             return data['data']
         self._ydl.write_debug(f'Discarding old cache from version {version} (needs {min_ver})')
 
-    def load(self, section, key, dtype='json', default=None, *, min_ver=None):
-        assert dtype in ('json',)
-
-        if not self.enabled:
-            return default
-
+    def _read_file(self, section, key, dtype):
         cache_fn = self._get_cache_fn(section, key, dtype)
         with contextlib.suppress(OSError):
             try:
                 with open(cache_fn, encoding='utf-8') as cachef:
                     self._ydl.write_debug(f'Loading {section}.{key} from cache')
-                    return self._validate(json.load(cachef), min_ver)
-            except (ValueError, KeyError):
+                    return json.load(cachef)
+            except ValueError:
                 try:
                     file_size = os.path.getsize(cache_fn)
                 except OSError as oe:
                     file_size = str(oe)
                 self._ydl.report_warning(f'Cache retrieval from {cache_fn} failed ({file_size})')
 
+    def _load_file(self, section, key, dtype, min_ver):
+        data = self._read_file(section, key, dtype)
+        if data is None:
+            return None
+        try:
+            return self._validate(data, min_ver)
+        except KeyError:
+            self._ydl.report_warning(f'Cache retrieval of {section}.{key} failed')
+
+    def _import_file(self, section, key, dtype, min_ver):
+        """Move an entry of the old layout into the database"""
+        data = self._read_file(section, key, dtype)
+        if data is None:
+            return None
+        if not traverse_obj(data, 'yt-dlp_version'):  # Backward compatibility
+            data = {'yt-dlp_version': '2022.08.19', 'data': data}
+        try:
+            self._store_db(section, key, json.dumps(data, ensure_ascii=False))
+        except (OSError, sqlite3.Error) as e:
+            self._ydl.report_warning(f'Moving {section}.{key} into the cache database failed: {e}')
+        else:
+            self._ydl.write_debug(f'Moved {section}.{key} into the cache database')
+            with contextlib.suppress(OSError):
+                os.remove(self._get_cache_fn(section, key, dtype))
+        try:
+            return self._validate(data, min_ver)
+        except KeyError:
+            self._ydl.report_warning(f'Cache retrieval of {section}.{key} failed')
+
+    def _load_cached(self, section, key, min_ver):
+        serialized = self._memory.get((section, key))
+        if serialized is None:
+            try:
+                serialized = self._load_db(section, key)
+            except (OSError, sqlite3.Error) as e:
+                self._ydl.report_warning(f'Cache retrieval of {section}.{key} failed: {e}')
+                return None
+            if serialized is None:
+                return None
+            if section not in self._SECTION_MAX_SIZE:
+                self._memory[section, key] = serialized
+            self._ydl.write_debug(f'Loading {section}.{key} from cache')
+        try:
+            return self._validate(json.loads(serialized), min_ver)
+        except (ValueError, KeyError):
+            self._ydl.report_warning(f'Cache retrieval of {section}.{key} failed ({len(serialized)})')
+            return None
+
+    def load(self, section, key, dtype='json', default=None, *, min_ver=None):
+        assert dtype in ('json',)
+
+        if not self.enabled:
+            return default
+
+        if self._use_db:
+            assert re.match(r'^[\w.-]+$', section), f'invalid section {section!r}'
+            data = self._load_cached(section, key, min_ver)
+            if data is None:
+                data = self._import_file(section, key, dtype, min_ver)
+        else:
+            data = self._load_file(section, key, dtype, min_ver)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
         return default
 
+    def close(self):
+        if self.hits or self.misses:
+            self._ydl.write_debug(f'Cache: {self.hits} hits, {self.misses} misses')
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        self._memory.clear()
+
     def remove(self):
         if not self.enabled:
             self._ydl.to_screen('Cache is disabled (Did you combine --no-cache-dir and --rm-cache-dir?)')
@@ -83,6 +255,7 @@ def remove(self):
         if not any((term in cachedir) for term in ('cache', 'tmp')):
             raise Exception('Not removing directory %s - this does not look like a cache dir' % cachedir)
 
+        self.close()
         self._ydl.to_screen(
             'Removing cache dir %s .' % cachedir, skip_eol=True)
         if os.path.exists(cachedir):
@@ -65,6 +65,7 @@ class FileDownloader:
     max_filesize:       Skip files larger than this size
     xattr_set_filesize: Set ytdl.filesize user xattribute with expected size.
     progress_delta:     The minimum time between progress output, in seconds
+    progress_hooks_interval: The minimum time between "downloading" progress updates, in seconds
     external_downloader_args:  A dictionary of downloader keys (in lower case)
                         and a list of additional command-line arguments for the
                         executable. Use 'default' as the name for arguments to be
@@ -74,6 +75,9 @@ class FileDownloader:
     http_chunk_size:    Size of a chunk for chunk-based HTTP downloading. May be
                         useful for bypassing bandwidth throttling imposed by
                         a webserver (experimental)
+    http_connections:   Number of connections used to download a file of known
+                        size over HTTP in parallel segments. The segments are
+                        written into their position in the .part file
     progress_template:  See YoutubeDL.py
     retry_sleep_functions: See YoutubeDL.py
 
@@ -82,6 +86,8 @@ class FileDownloader:
 
     _TEST_FILE_SIZE = 10241
     params = None
+    # Line of the status shared with other downloaders, see share_multiline_status
+    _progress_idx = None
 
     def __init__(self, ydl, params):
         """Create a FileDownloader object with the given options."""
@@ -90,6 +96,8 @@ def __init__(self, ydl, params):
         self.params = params
         self._prepare_multiline_status()
         self.add_progress_hook(self.report_progress)
+        self._progress_hooks_interval = self.params.get('progress_hooks_interval', 0.1)
+        self._next_progress_time = 0
         if self.params.get('progress_delta'):
             self._progress_delta_lock = threading.Lock()
             self._progress_delta_time = time.monotonic()
@@ -273,7 +281,8 @@ def try_utime(self, filename, last_modified_hdr):
         """Try to set the last-modified time of the given file."""
         if last_modified_hdr is None:
             return
-        if not os.path.isfile(encodeFilename(filename)):
+        to_file = not hasattr(filename, 'write')
+        if to_file and not os.path.isfile(encodeFilename(filename)):
             return
         timestr = last_modified_hdr
         if timestr is None:
@@ -284,15 +293,26 @@ def try_utime(self, filename, last_modified_hdr):
         # Ignore obviously invalid dates
         if filetime == 0:
             return
-        with contextlib.suppress(Exception):
-            os.utime(filename, (time.time(), filetime))
+        if to_file:
+            with contextlib.suppress(Exception):
+                os.utime(filename, (time.time(), filetime))
         return filetime
 
     def report_destination(self, filename):
         """Report destination filename."""
         self.to_screen('[download] Destination: ' + filename)
 
+    def share_multiline_status(self, owner, idx):
+        """
+        Report the progress at line idx of the multi-line status of owner,
+        so that downloads running at the same time can show their progress together.
+        The status is ended by owner
+        """
+        self._multiline, self._progress_idx = owner._multiline, idx
+
     def _prepare_multiline_status(self, lines=1):
+        if self._progress_idx is not None:
+            return
         if self.params.get('noprogress'):
             self._multiline = QuietMultilinePrinter()
         elif self.ydl.params.get('logger'):
@@ -305,7 +325,8 @@ def _prepare_multiline_status(self, lines=1):
         self._multiline._HAVE_FULLCAP = self.ydl._allow_colors.out
 
     def _finish_multiline_status(self):
-        self._multiline.end()
+        if self._progress_idx is None:
+            self._multiline.end()
 
     ProgressStyles = Namespace(
         downloaded_bytes='light blue',
@@ -332,7 +353,7 @@ def _report_progress_status(self, s, default_template):
         progress_template = self.params.get('progress_template', {})
         self._multiline.print_at_line(self.ydl.evaluate_outtmpl(
             progress_template.get('download') or '[download] %(progress._default_template)s',
-            progress_dict), s.get('progress_idx') or 0)
+            progress_dict), self._progress_idx if self._progress_idx is not None else s.get('progress_idx') or 0)
         self.to_console_title(self.ydl.evaluate_outtmpl(
             progress_template.get('download-title') or 'yt-dlp %(progress._default_template)s',
             progress_dict))
@@ -430,12 +451,11 @@ def download(self, filename, info_dict, subtitle=False):
         """Download to a filename using the info from info_dict
         Return True on success and False otherwise
         """
-        nooverwrites_and_exists = (
-            not self.params.get('overwrites', True)
-            and os.path.exists(encodeFilename(filename))
-        )
-
         if not hasattr(filename, 'write'):
+            nooverwrites_and_exists = (
+                not self.params.get('overwrites', True)
+                and os.path.exists(encodeFilename(filename))
+            )
             continuedl_and_exists = (
                 self.params.get('continuedl', True)
                 and os.path.isfile(encodeFilename(filename))
@@ -471,7 +491,21 @@ def real_download(self, filename, info_dict):
         """Real download process. Redefine in subclasses."""
         raise NotImplementedError('This method must be implemented by subclasses')
 
+    def _progress_due(self):
+        """
+        Whether a "downloading" status would be passed to the progress hooks now.
+        Use this to skip preparing the status when it would be discarded
+        """
+        return time.monotonic() >= self._next_progress_time
+
     def _hook_progress(self, status, info_dict):
+        if status.get('status') == 'downloading':
+            # The updates in between are coalesced into the next one. This is racy when the
+            # downloader is shared by threads, but at worst an extra update is passed on
+            now = time.monotonic()
+            if now < self._next_progress_time:
+                return
+            self._next_progress_time = now + self._progress_hooks_interval
         # Ideally we want to make a copy of the dict, but that is too slow
         status['info_dict'] = info_dict
         # youtube-dl passes the same status object to all the hooks.
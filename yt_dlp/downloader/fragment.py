@@ -1,10 +1,14 @@
+import collections
 import concurrent.futures
 import contextlib
+import io
+import itertools
 import json
-import math
 import os
 import struct
+import threading
 import time
+import urllib.parse
 
 from .common import FileDownloader
 from .http import HttpFD
@@ -24,6 +28,130 @@ def to_screen(self, *args, **kargs):
     to_console_title = to_screen
 
 
+class _FragmentQueue:
+    """The fragments of one download that are waiting for a thread of the _FragmentScheduler"""
+
+    def __init__(self, scheduler, max_workers, max_host_connections):
+        self._scheduler = scheduler
+        self.max_workers = max_workers
+        self.max_host_connections = max_host_connections
+        self._tasks = collections.deque()
+        self._futures = set()
+        self._running = 0
+
+    def submit(self, fn, *args, host=None):
+        future = concurrent.futures.Future()
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        self._scheduler._submit(self, (future, host, fn, args))
+        return future
+
+    def close(self, wait=True):
+        """Cancel the fragments that have not started, and optionally wait for the others"""
+        for future in self._scheduler._close(self):
+            future.cancel()
+        if wait:
+            concurrent.futures.wait(list(self._futures))
+
+
+class _FragmentScheduler:
+    """
+    Process-wide pool of threads that download the fragments of all the active downloads
+
+    Every download has its own queue. The threads take the fragments from the queues in turn,
+    so that the downloads share the pool fairly, and threads that are not needed by one download
+    keep helping the others until their last fragment. The threads are kept between downloads
+    and exit after being idle for _IDLE_TIMEOUT seconds
+    """
+
+    _IDLE_TIMEOUT = 60
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._queues = collections.deque()
+        self._host_connections = collections.Counter()
+        self._size = self._workers = self._busy = self._queued = 0
+
+    def open(self, max_workers, pool_size=None, max_host_connections=None):
+        """
+        Start a queue for a download
+
+        @param max_workers              Maximum number of fragments of the download that are downloaded at a time
+        @param pool_size                The pool is grown to this number of threads (default: max_workers)
+        @param max_host_connections     Maximum number of fragments that are downloaded from
+                                        the same host at a time, counting all the downloads
+        """
+        queue = _FragmentQueue(self, max_workers, max_host_connections)
+        with self._cond:
+            self._size = max(self._size, pool_size or max_workers)
+            self._queues.append(queue)
+        return queue
+
+    def _submit(self, queue, task):
+        with self._cond:
+            queue._tasks.append(task)
+            self._queued += 1
+            if self._workers < self._size and self._workers - self._busy < self._queued:
+                self._workers += 1
+                threading.Thread(target=self._work, daemon=True).start()
+            self._cond.notify()
+
+    def _close(self, queue):
+        with self._cond:
+            with contextlib.suppress(ValueError):
+                self._queues.remove(queue)
+            self._queued -= len(queue._tasks)
+            tasks, queue._tasks = queue._tasks, collections.deque()
+        return [future for future, *_ in tasks]
+
+    def _next_task(self):
+        for _ in range(len(self._queues)):
+            queue = self._queues[0]
+            self._queues.rotate(-1)
+            if not queue._tasks or queue._running >= queue.max_workers:
+                continue
+            host = queue._tasks[0][1]
+            if queue.max_host_connections and self._host_connections[host] >= queue.max_host_connections:
+                continue
+            queue._running += 1
+            self._busy += 1
+            self._queued -= 1
+            self._host_connections[host] += 1
+            return queue, queue._tasks.popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                timed_out = False
+                while not (job := self._next_task()):
+                    if timed_out:
+                        self._workers -= 1
+                        return
+                    timed_out = not self._cond.wait(self._IDLE_TIMEOUT)
+
+            queue, (future, host, fn, args) = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+            with self._cond:
+                queue._running -= 1
+                self._busy -= 1
+                self._host_connections[host] -= 1
+                if not self._host_connections[host]:
+                    del self._host_connections[host]
+                # A queue or host may have dropped below its limit
+                self._cond.notify_all()
+
+
+_fragment_scheduler = _FragmentScheduler()
+
+
 class FragmentFD(FileDownloader):
     """
     A base file downloader class for fragmented media (e.g. f4m/m3u8 manifests).
@@ -35,8 +163,16 @@ class FragmentFD(FileDownloader):
     skip_unavailable_fragments:
                         Skip unavailable fragments (DASH and hlsnative only)
     keep_fragments:     Keep downloaded fragments on disk after downloading is
-                        finished
-    concurrent_fragment_downloads:  The number of threads to use for native hls and dash downloads
+                        finished. Otherwise, the fragments are downloaded into memory
+                        unless a partially downloaded fragment is being resumed
+    concurrent_fragment_downloads:  The number of threads to use for native hls and dash downloads.
+                        The fragments can finish downloading in any order. Up to
+                        _REORDER_WINDOW fragments per thread are downloaded or buffered
+                        in memory at a time while waiting for an earlier fragment.
+                        The threads are shared with the other fragmented downloads
+                        that run at the same time (see _FragmentScheduler)
+    fragment_host_connections:  Maximum number of fragments that are downloaded
+                        from the same host at a time, across all the downloads
     _no_ytdl_file:      Don't use .ytdl file
 
     For each incomplete fragment download yt-dlp keeps on disk a special
@@ -60,6 +196,8 @@ class FragmentFD(FileDownloader):
     This feature is experimental and file format may change in future.
     """
 
+    _REORDER_WINDOW = 4
+
     def report_retry_fragment(self, err, frag_index, count, retries):
         self.deprecation_warning('yt_dlp.downloader.FragmentFD.report_retry_fragment is deprecated. '
                                  'Use yt_dlp.downloader.FileDownloader.report_retry instead')
@@ -117,22 +255,30 @@ def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_dat
             'request_data': request_data,
             'ctx_id': ctx.get('ctx_id'),
         }
+        ctx.pop('fragment_content', None)
         frag_resume_len = 0
         if ctx['dl'].params.get('continuedl', True):
             frag_resume_len = self.filesize_or_none(self.temp_name(fragment_filename))
         fragment_info_dict['frag_resume_len'] = ctx['frag_resume_len'] = frag_resume_len
 
-        success, _ = ctx['dl'].download(fragment_filename, fragment_info_dict)
+        # The fragment files are only needed to keep them or to resume them
+        in_memory = not frag_resume_len and not self.params.get('keep_fragments', False)
+        frag_stream = io.BytesIO() if in_memory else None
+        success, _ = ctx['dl'].download(frag_stream or fragment_filename, fragment_info_dict)
         if not success:
             return False
         if fragment_info_dict.get('filetime'):
             ctx['fragment_filetime'] = fragment_info_dict.get('filetime')
         ctx['fragment_filename_sanitized'] = fragment_filename
+        if frag_stream:
+            ctx['fragment_content'] = frag_stream.getvalue()
         return True
 
     def _read_fragment(self, ctx):
         if not ctx.get('fragment_filename_sanitized'):
             return None
+        if ctx.get('fragment_content') is not None:
+            return ctx['fragment_content']
         try:
             down, frag_sanitized = self.sanitize_open(ctx['fragment_filename_sanitized'], 'rb')
         except FileNotFoundError:
@@ -151,7 +297,9 @@ def _append_fragment(self, ctx, frag_content):
         finally:
             if self.__do_ytdl_file(ctx):
                 self._write_ytdl_file(ctx)
-            if not self.params.get('keep_fragments', False):
+            if ctx.pop('fragment_content', None) is not None:
+                pass
+            elif not self.params.get('keep_fragments', False):
                 self.try_remove(encodeFilename(ctx['fragment_filename_sanitized']))
             del ctx['fragment_filename_sanitized']
 
@@ -172,6 +320,8 @@ def _prepare_frag_download(self, ctx):
             'sleep_interval': 0,
             'max_sleep_interval': 0,
             'sleep_interval_subtitles': 0,
+            # The fragments are already downloaded concurrently
+            'http_connections': 1,
         })
         tmpfilename = self.temp_name(ctx['filename'])
         open_mode = 'wb'
@@ -252,6 +402,8 @@ def frag_progress_hook(s):
 
             state['max_progress'] = ctx.get('max_progress')
             state['progress_idx'] = ctx.get('progress_idx')
+            if 'reorder_buffer_depth' in ctx:
+                state['fragment_reorder_buffer_depth'] = ctx['reorder_buffer_depth']
 
             state['elapsed'] = progress.elapsed
             frag_total_bytes = s.get('total_bytes') or 0
@@ -285,6 +437,8 @@ def frag_progress_hook(s):
 
     def _finish_frag_download(self, ctx, info_dict):
         ctx['dest_stream'].close()
+        if 'max_reorder_buffer_depth' in ctx:
+            self.write_debug(f'Maximum fragment reorder buffer depth: {ctx["max_reorder_buffer_depth"]}')
         if self.__do_ytdl_file(ctx):
             self.try_remove(self.ytdl_filename(ctx['filename']))
         elapsed = time.time() - ctx['started']
@@ -341,10 +495,13 @@ def _prepare_external_frag_download(self, ctx):
 
     def decrypter(self, info_dict):
         _key_cache = {}
+        # The fragments can be decrypted concurrently. Each key is fetched only once
+        _key_lock = threading.Lock()
 
         def _get_key(url):
-            if url not in _key_cache:
-                _key_cache[url] = self.ydl.urlopen(self._prepare_url(info_dict, url)).read()
+            with _key_lock:
+                if url not in _key_cache:
+                    _key_cache[url] = self.ydl.urlopen(self._prepare_url(info_dict, url)).read()
             return _key_cache[url]
 
         def decrypt_fragment(fragment, frag_content):
@@ -374,21 +531,15 @@ def download_and_append_fragments_multiple(self, *args, **kwargs):
         max_progress = len(args)
         if max_progress == 1:
             return self.download_and_append_fragments(*args[0], **kwargs)
-        max_workers = self.params.get('concurrent_fragment_downloads', 1)
         if max_progress > 1:
             self._prepare_multiline_status(max_progress)
         is_live = any(traverse_obj(args, (..., 2, 'is_live')))
 
-        def thread_func(idx, ctx, fragments, info_dict, tpe):
+        def thread_func(idx, ctx, fragments, info_dict):
             ctx['max_progress'] = max_progress
             ctx['progress_idx'] = idx
             return self.download_and_append_fragments(
-                ctx, fragments, info_dict, **kwargs, tpe=tpe, interrupt_trigger=interrupt_trigger)
-
-        class FTPE(concurrent.futures.ThreadPoolExecutor):
-            # has to stop this or it's going to wait on the worker thread itself
-            def __exit__(self, exc_type, exc_val, exc_tb):
-                pass
+                ctx, fragments, info_dict, **kwargs, interrupt_trigger=interrupt_trigger)
 
         if compat_os_name == 'nt':
             def future_result(future):
@@ -409,20 +560,21 @@ def interrupt_trigger_iter(fg):
                     break
                 yield f
 
-        spins = []
-        for idx, (ctx, fragments, info_dict) in enumerate(args):
-            tpe = FTPE(math.ceil(max_workers / max_progress))
-            job = tpe.submit(thread_func, idx, ctx, interrupt_trigger_iter(fragments), info_dict, tpe)
-            spins.append((tpe, job))
+        # These threads only append the fragments; all the downloads share the threads of
+        # the _fragment_scheduler, so that a download can use the threads the others do not need
+        pool = concurrent.futures.ThreadPoolExecutor(max_progress)
+        jobs = [pool.submit(thread_func, idx, ctx, interrupt_trigger_iter(fragments), info_dict)
+                for idx, (ctx, fragments, info_dict) in enumerate(args)]
 
         result = True
-        for tpe, job in spins:
-            try:
-                result = result and future_result(job)
-            except KeyboardInterrupt:
-                interrupt_trigger[0] = False
-            finally:
-                tpe.shutdown(wait=True)
+        try:
+            for job in jobs:
+                try:
+                    result = result and future_result(job)
+                except KeyboardInterrupt:
+                    interrupt_trigger[0] = False
+        finally:
+            pool.shutdown(wait=True)
         if not interrupt_trigger[0] and not is_live:
             raise KeyboardInterrupt()
         # we expect the user wants to stop and DO WANT the preceding postprocessors to run;
@@ -434,6 +586,10 @@ def download_and_append_fragments(
             pack_func=(lambda content, idx: content), finish_func=None,
             tpe=None, interrupt_trigger=(True, )):
 
+        if tpe is not None:
+            self.deprecation_warning(
+                'The tpe argument of yt_dlp.downloader.FragmentFD.download_and_append_fragments is deprecated '
+                'and ignored. The fragments are downloaded by a thread pool shared by all the downloads')
         if not self.params.get('skip_unavailable_fragments', True):
             is_fatal = lambda _: True
 
@@ -483,29 +639,65 @@ def append_fragment(frag_content, frag_index, ctx):
 
         decrypt_fragment = self.decrypter(info_dict)
 
-        max_workers = math.ceil(
-            self.params.get('concurrent_fragment_downloads', 1) / ctx.get('max_progress', 1))
+        max_workers = self.params.get('concurrent_fragment_downloads', 1)
         if max_workers > 1:
-            def _download_fragment(fragment):
+            def _download_fragment(seq, fragment):
                 ctx_copy = ctx.copy()
+                # Do not read the fragment that is being appended if this one fails
+                ctx_copy.pop('fragment_filename_sanitized', None)
+                ctx_copy.pop('fragment_content', None)
                 download_fragment(fragment, ctx_copy)
-                return fragment, fragment['frag_index'], ctx_copy.get('fragment_filename_sanitized')
-
-            with tpe or concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
-                try:
-                    for fragment, frag_index, frag_filename in pool.map(_download_fragment, fragments):
+                # Decrypt in the worker threads so that it overlaps with the other downloads
+                frag_content = decrypt_fragment(fragment, self._read_fragment(ctx_copy))
+                return seq, (fragment['frag_index'], ctx_copy.get('fragment_filename_sanitized'),
+                             ctx_copy.get('fragment_content') is not None, frag_content)
+
+            # The downloads that run at the same time share the pool; it is sized so that
+            # each of them could use all of its max_workers threads
+            queue = _fragment_scheduler.open(
+                max_workers, max_host_connections=self.params.get('fragment_host_connections'),
+                pool_size=max_workers * (self.params.get('concurrent_downloads') or 1)
+                * (self.params.get('concurrent_playlist_entries') or 1))
+
+            def submit(seq, fragment):
+                return queue.submit(
+                    _download_fragment, seq, fragment, host=urllib.parse.urlparse(fragment['url']).netloc)
+
+            # The fragments are appended in order, but can finish downloading in any order.
+            # A new fragment is started only when one is appended, so that at most
+            # `window` fragments are being downloaded or are waiting in the reorder buffer
+            window = max_workers * self._REORDER_WINDOW
+            fragments = enumerate(fragments)
+            reorder_buffer, next_seq = {}, 0
+            ctx['reorder_buffer_depth'] = ctx['max_reorder_buffer_depth'] = 0
+
+            wait = True
+            try:
+                pending = {submit(*args) for args in itertools.islice(fragments, window)}
+                while pending:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    reorder_buffer.update(future.result() for future in done)
+                    ctx['max_reorder_buffer_depth'] = max(ctx['max_reorder_buffer_depth'], len(reorder_buffer))
+                    while next_seq in reorder_buffer:
+                        frag_index, frag_filename, in_memory, frag_content = reorder_buffer.pop(next_seq)
+                        next_seq += 1
                         ctx.update({
                             'fragment_filename_sanitized': frag_filename,
                             'fragment_index': frag_index,
+                            'fragment_content': frag_content if in_memory else None,
                         })
-                        if not append_fragment(decrypt_fragment(fragment, self._read_fragment(ctx)), frag_index, ctx):
+                        if not append_fragment(frag_content, frag_index, ctx):
                             return False
-                except KeyboardInterrupt:
-                    self._finish_multiline_status()
-                    self.report_error(
-                        'Interrupted by user. Waiting for all threads to shutdown...', is_error=False, tb=False)
-                    pool.shutdown(wait=False)
-                    raise
+                        pending.update(submit(*args) for args in itertools.islice(fragments, 1))
+                    ctx['reorder_buffer_depth'] = len(reorder_buffer)
+            except KeyboardInterrupt:
+                self._finish_multiline_status()
+                self.report_error(
+                    'Interrupted by user. Waiting for all threads to shutdown...', is_error=False, tb=False)
+                wait = False
+                raise
+            finally:
+                queue.close(wait=wait)
         else:
             for fragment in fragments:
                 if not interrupt_trigger[0]:
@@ -1,5 +1,8 @@
+import concurrent.futures
+import json
 import os
 import random
+import threading
 import time
 
 from .common import FileDownloader
@@ -25,6 +28,19 @@
 
 
 class HttpFD(FileDownloader):
+    # Files are not split into segments smaller than this
+    _MIN_SEGMENT_SIZE = 1024 * 1024
+    # The buffers that the data is read into, reused by all the downloads of a thread
+    _read_buffers = threading.local()
+
+    def _read_block(self, data, size):
+        """Read up to size bytes of the response into the buffer of this thread and return them as a memoryview"""
+        buffer = getattr(self._read_buffers, 'buffer', None)
+        if buffer is None or len(buffer) < size:
+            buffer = self._read_buffers.buffer = bytearray(size)
+        view = memoryview(buffer)[:size]
+        return view[:data.readinto(view)]
+
     def real_download(self, filename, info_dict):
         url = info_dict['url']
         request_data = info_dict.get('request_data', None)
@@ -35,8 +51,10 @@ class DownloadContext(dict):
             __delattr__ = dict.__delitem__
 
         ctx = DownloadContext()
+        # The data can also be written to a file-like object instead of a file. e.g. for fragments
+        ctx.to_stream = hasattr(filename, 'write')
         ctx.filename = filename
-        ctx.tmpfilename = self.temp_name(filename)
+        ctx.tmpfilename = filename if ctx.to_stream else self.temp_name(filename)
         ctx.stream = None
 
         # Disable compression
@@ -56,7 +74,13 @@ class DownloadContext(dict):
         # parse given Range
         req_start, req_end, _ = parse_http_range(headers.get('Range'))
 
-        if self.params.get('continuedl', True):
+        if not (is_test or ctx.to_stream or filename == '-' or request_data is not None or headers.get('Range')) and (
+                (self.params.get('http_connections') or 1) > 1 or self._read_segment_state(filename)):
+            success = self._download_segmented(filename, info_dict, headers, chunk_size)
+            if success is not None:
+                return success
+
+        if self.params.get('continuedl', True) and not ctx.to_stream:
             # Establish possible resume length
             if os.path.isfile(encodeFilename(ctx.tmpfilename)):
                 ctx.resume_len = os.path.getsize(
@@ -194,7 +218,7 @@ def establish_connection():
 
         def close_stream():
             if ctx.stream is not None:
-                if not ctx.tmpfilename == '-':
+                if not (ctx.tmpfilename == '-' or ctx.to_stream):
                     ctx.stream.close()
                 ctx.stream = None
 
@@ -237,7 +261,7 @@ def download():
 
             def retry(e):
                 close_stream()
-                if ctx.tmpfilename == '-':
+                if ctx.tmpfilename == '-' or ctx.to_stream:
                     ctx.resume_len = byte_counter
                 else:
                     try:
@@ -249,7 +273,8 @@ def retry(e):
             while True:
                 try:
                     # Download and write
-                    data_block = ctx.data.read(block_size if not is_test else min(block_size, data_len - byte_counter))
+                    data_block = self._read_block(
+                        ctx.data, block_size if not is_test else min(block_size, data_len - byte_counter))
                 except TransportError as err:
                     retry(err)
 
@@ -260,7 +285,12 @@ def retry(e):
                     break
 
                 # Open destination file just in time
-                if ctx.stream is None:
+                if ctx.stream is None and ctx.to_stream:
+                    ctx.stream = filename
+                    if ctx.open_mode == 'wb':
+                        ctx.stream.seek(0)
+                        ctx.stream.truncate()
+                elif ctx.stream is None:
                     try:
                         ctx.stream, ctx.tmpfilename = self.sanitize_open(
                             ctx.tmpfilename, ctx.open_mode)
@@ -299,22 +329,24 @@ def retry(e):
 
                 # Progress message
                 speed = self.calc_speed(start, now, byte_counter - ctx.resume_len)
-                if ctx.data_len is None:
-                    eta = None
-                else:
-                    eta = self.calc_eta(start, time.time(), ctx.data_len - ctx.resume_len, byte_counter - ctx.resume_len)
-
-                self._hook_progress({
-                    'status': 'downloading',
-                    'downloaded_bytes': byte_counter,
-                    'total_bytes': ctx.data_len,
-                    'tmpfilename': ctx.tmpfilename,
-                    'filename': ctx.filename,
-                    'eta': eta,
-                    'speed': speed,
-                    'elapsed': now - ctx.start_time,
-                    'ctx_id': info_dict.get('ctx_id'),
-                }, info_dict)
+                if self._progress_due():
+                    if ctx.data_len is None:
+                        eta = None
+                    else:
+                        eta = self.calc_eta(
+                            start, time.time(), ctx.data_len - ctx.resume_len, byte_counter - ctx.resume_len)
+
+                    self._hook_progress({
+                        'status': 'downloading',
+                        'downloaded_bytes': byte_counter,
+                        'total_bytes': ctx.data_len,
+                        'tmpfilename': ctx.tmpfilename,
+                        'filename': ctx.filename,
+                        'eta': eta,
+                        'speed': speed,
+                        'elapsed': now - ctx.start_time,
+                        'ctx_id': info_dict.get('ctx_id'),
+                    }, info_dict)
 
                 if data_len is not None and byte_counter == data_len:
                     break
@@ -325,7 +357,7 @@ def retry(e):
                     if ctx.throttle_start is None:
                         ctx.throttle_start = now
                     elif now - ctx.throttle_start > 3:
-                        if ctx.stream is not None and ctx.tmpfilename != '-':
+                        if ctx.stream is not None and ctx.tmpfilename != '-' and not ctx.to_stream:
                             ctx.stream.close()
                         raise ThrottledDownload()
                 elif speed:
@@ -340,7 +372,7 @@ def retry(e):
                 ctx.resume_len = byte_counter
                 raise NextFragment()
 
-            if ctx.tmpfilename != '-':
+            if ctx.tmpfilename != '-' and not ctx.to_stream:
                 ctx.stream.close()
 
             if data_len is not None and byte_counter != data_len:
@@ -381,3 +413,237 @@ def retry(e):
                 close_stream()
                 raise
         return False
+
+    def _read_segment_state(self, filename):
+        """Return the state of a segmented download, or None if the .ytdl file was not written by one"""
+        try:
+            with open(encodeFilename(self.ytdl_filename(filename))) as f:
+                state = json.load(f)['downloader']
+        except (OSError, ValueError, LookupError, TypeError):
+            return None
+        # The .ytdl files of fragmented downloads keep the fragment index instead
+        if not isinstance(state, dict) or not isinstance(state.get('segments'), list):
+            return None
+        return state
+
+    def _read_segments(self, filename, content_len):
+        state = self._read_segment_state(filename)
+        try:
+            segments = state['segments']
+            if state['content_len'] == content_len and all(
+                    0 <= start <= end + 1 and end < content_len for start, end in segments):
+                return segments
+        except (ValueError, LookupError, TypeError):
+            pass
+        return None
+
+    def _write_segments(self, filename, content_len, segments):
+        stream, _ = self.sanitize_open(self.ytdl_filename(filename), 'w')
+        with stream:
+            stream.write(json.dumps({'downloader': {'content_len': content_len, 'segments': segments}}))
+
+    def _download_segmented(self, filename, info_dict, headers, chunk_size):
+        """
+        Download the file in segments over multiple connections, writing each segment into its
+        position in the preallocated .part file. The remaining range of each segment is kept in the
+        .ytdl file so that the download can be resumed.
+        Returns None if the file cannot be downloaded in segments
+        """
+        url = info_dict['url']
+        tmpfilename = self.temp_name(filename)
+        ytdl_filename = encodeFilename(self.ytdl_filename(filename))
+        has_state = self._read_segment_state(filename) is not None
+
+        def fallback():
+            # The .part file of a segmented download cannot be resumed by a single connection
+            if has_state:
+                self.try_remove(encodeFilename(tmpfilename))
+                self.try_remove(ytdl_filename)
+
+        response = None
+        for retry in RetryManager(self.params.get('retries'), self.report_retry):
+            try:
+                response = self.ydl.urlopen(Request(url, headers={**headers, 'Range': 'bytes=0-0'}))
+            except (TransportError, HTTPError) as err:
+                if not has_state:
+                    # Leave the errors to the download over a single connection
+                    return None
+                # The state is kept, since the failure does not tell whether the server supports ranges
+                if isinstance(err, HTTPError) and not 500 <= err.status < 600:
+                    raise
+                retry.error = err
+        if not response:
+            return False
+        response.close()
+        content_len = parse_http_range(response.headers.get('Content-Range'))[2]
+        if response.status != 206 or not content_len or response.headers.get('Content-Encoding'):
+            return fallback()
+        last_modified = response.headers.get('Last-Modified')
+
+        segments = None
+        if self.params.get('continuedl', True) and os.path.isfile(encodeFilename(tmpfilename)):
+            segments = has_state and self._read_segments(filename, content_len)
+            if not segments:
+                if not has_state:
+                    # Resume the download of a single connection
+                    return None
+                self.report_unable_to_resume()
+        if not segments:
+            count = min(self.params.get('http_connections') or 1, content_len // self._MIN_SEGMENT_SIZE)
+            if count < 2:
+                return fallback()
+            size = -(-content_len // count)
+            segments = [[start, min(start + size, content_len) - 1] for start in range(0, content_len, size)]
+
+        min_data_len, max_data_len = self.params.get('min_filesize'), self.params.get('max_filesize')
+        if min_data_len is not None and content_len < min_data_len:
+            self.to_screen(
+                f'\r[download] File is smaller than min-filesize ({content_len} bytes < {min_data_len} bytes). '
+                'Aborting.')
+            return False
+        if max_data_len is not None and content_len > max_data_len:
+            self.to_screen(
+                f'\r[download] File is larger than max-filesize ({content_len} bytes > {max_data_len} bytes). '
+                'Aborting.')
+            return False
+
+        resume_len = content_len - sum(end - start + 1 for start, end in segments)
+        try:
+            if resume_len:
+                self.report_resuming_byte(resume_len)
+                stream = open(encodeFilename(tmpfilename), 'r+b')
+            else:
+                stream, tmpfilename = self.sanitize_open(tmpfilename, 'wb')
+                stream.truncate(content_len)
+        except OSError as err:
+            self.report_error(f'unable to open for writing: {err}')
+            return False
+        self.report_destination(filename)
+        self.write_debug(f'Downloading {content_len} bytes in {len(segments)} segments')
+        if self.params.get('xattr_set_filesize', False):
+            try:
+                write_xattr(tmpfilename, 'user.ytdl.filesize', str(content_len).encode())
+            except (XAttrUnavailableError, XAttrMetadataError) as err:
+                self.report_error(f'unable to set filesize xattr: {err}')
+
+        lock = threading.Lock()
+        start_time = time.time()
+        # The first failure of a segment stops the others. None means that it did not raise an exception
+        failures = []
+        progress = {'downloaded': resume_len, 'saved': start_time, 'throttle_start': None}
+
+        def save_state():
+            stream.flush()
+            self._write_segments(filename, content_len, segments)
+            progress['saved'] = time.time()
+
+        def write(segment, data_block):
+            with lock:
+                stream.seek(segment[0])
+                stream.write(data_block)
+                segment[0] += len(data_block)
+                progress['downloaded'] += len(data_block)
+                now = time.time()
+                if now - progress['saved'] > 1:
+                    save_state()
+
+                speed = self.calc_speed(start_time, now, progress['downloaded'] - resume_len)
+                if self._progress_due():
+                    self._hook_progress({
+                        'status': 'downloading',
+                        'downloaded_bytes': progress['downloaded'],
+                        'total_bytes': content_len,
+                        'tmpfilename': tmpfilename,
+                        'filename': filename,
+                        'eta': self.calc_eta(
+                            start_time, now, content_len - resume_len, progress['downloaded'] - resume_len),
+                        'speed': speed,
+                        'elapsed': now - start_time,
+                        'ctx_id': info_dict.get('ctx_id'),
+                    }, info_dict)
+
+                if speed and speed < (self.params.get('throttledratelimit') or 0):
+                    # The speed must stay below the limit for 3 seconds, like for a single connection
+                    if progress['throttle_start'] is None:
+                        progress['throttle_start'] = now
+                    elif now - progress['throttle_start'] > 3:
+                        raise ThrottledDownload()
+                elif speed:
+                    progress['throttle_start'] = None
+            self.slow_down(start_time, now, progress['downloaded'] - resume_len)
+
+        def download_segment(segment):
+            block_size = self.params.get('buffersize', 1024)
+            for retry in RetryManager(self.params.get('retries'), self.report_retry):
+                try:
+                    while segment[0] <= segment[1] and not failures:
+                        range_end = segment[1] if not chunk_size else min(segment[1], segment[0] + chunk_size - 1)
+                        request = Request(url, headers={**headers, 'Range': f'bytes={segment[0]}-{range_end}'})
+                        with self.ydl.urlopen(request) as data:
+                            if parse_http_range(data.headers.get('Content-Range'))[0] != segment[0]:
+                                raise ContentTooShortError(0, range_end - segment[0] + 1)
+                            while segment[0] <= range_end and not failures:
+                                before = time.time()
+                                data_block = self._read_block(data, min(block_size, range_end - segment[0] + 1))
+                                if not data_block:
+                                    raise ContentTooShortError(segment[0], range_end + 1)
+                                write(segment, data_block)
+                                if not self.params.get('noresizebuffer', False):
+                                    block_size = self.best_block_size(time.time() - before, len(data_block))
+                except HTTPError as err:
+                    if err.status < 500 or err.status >= 600:
+                        raise
+                    retry.error = err
+                except (CertificateVerifyError, ThrottledDownload):
+                    raise
+                except (TransportError, ContentTooShortError) as err:
+                    retry.error = err
+            return segment[0] > segment[1]
+
+        def run(segment):
+            try:
+                if download_segment(segment):
+                    return
+                failure = None
+            except BaseException as e:
+                failure = e
+            with lock:
+                failures.append(failure)
+            if failure is not None:
+                raise failure
+
+        pending = [segment for segment in segments if segment[0] <= segment[1]]
+        pool = concurrent.futures.ThreadPoolExecutor(max(len(pending), 1), thread_name_prefix='yt-dlp-http')
+        futures = [pool.submit(run, segment) for segment in pending]
+        try:
+            # Wait with a timeout so that KeyboardInterrupt is not blocked on Windows
+            while concurrent.futures.wait(futures, timeout=0.1).not_done:
+                pass
+        except BaseException:
+            failures.append(None)
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            if failures:
+                with lock:
+                    save_state()
+            stream.close()
+
+        if failures:
+            if failures[0] is not None:
+                raise failures[0]
+            return False
+
+        self.try_remove(ytdl_filename)
+        self.try_rename(tmpfilename, filename)
+        if self.params.get('updatetime', True):
+            info_dict['filetime'] = self.try_utime(filename, last_modified)
+        self._hook_progress({
+            'downloaded_bytes': content_len,
+            'total_bytes': content_len,
+            'filename': filename,
+            'status': 'finished',
+            'elapsed': time.time() - start_time,
+            'ctx_id': info_dict.get('ctx_id'),
+        }, info_dict)
+        return True
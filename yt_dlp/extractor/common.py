@@ -46,6 +46,7 @@
     FormatSorter,
     GeoRestrictedError,
     GeoUtils,
+    JSONLinesList,
     LenientJSONDecoder,
     Popen,
     RegexNotFoundError,
@@ -78,6 +79,7 @@
     parse_iso8601,
     parse_m3u8_attributes,
     parse_resolution,
+    required_literals,
     sanitize_filename,
     sanitize_url,
     smuggle_url,
@@ -92,6 +94,7 @@
     unified_strdate,
     unified_timestamp,
     url_basename,
+    url_host_labels,
     url_or_none,
     urlhandle_detect_ext,
     urljoin,
@@ -543,6 +546,12 @@ class InfoExtractor:
     will be used by geo restriction bypass mechanism similarly
     to _GEO_COUNTRIES.
 
+    _HTTP_CACHE attribute may be set to allow the responses of the extractor's
+    GET requests to be stored in the HTTP cache (with --http-cache). True uses
+    the caching headers of the responses, while a number of seconds overrides
+    them. Individual requests can instead be given a "cache" extension.
+    Requests that send cookies or credentials are never cached.
+
     The _ENABLED attribute should be set to False for IEs that
     are disabled by default and must be explicitly enabled.
 
@@ -556,6 +565,7 @@ class InfoExtractor:
     _GEO_BYPASS = True
     _GEO_COUNTRIES = None
     _GEO_IP_BLOCKS = None
+    _HTTP_CACHE = None
     _WORKING = True
     _ENABLED = True
     _NETRC_MACHINE = None
@@ -602,6 +612,37 @@ def suitable(cls, url):
         # so that lazy_extractors works correctly
         return cls._match_valid_url(url) is not None
 
+    @classmethod
+    def _get_host_labels(cls):
+        """
+        Host labels, one of which is present in every http(s) URL that this IE is suitable for.
+        None if the IE may be suitable for any URL. See url_host_labels for details
+        """
+        if '_HOST_LABELS' not in cls.__dict__:
+            if not cls._VALID_URL:
+                cls._HOST_LABELS = ()
+            elif cls.suitable.__func__.__qualname__ != 'InfoExtractor.suitable':
+                cls._HOST_LABELS = None  # Custom suitable may match URLs that _VALID_URL does not
+            else:
+                labels = [url_host_labels(regex) for regex in variadic(cls._VALID_URL)]
+                cls._HOST_LABELS = None if None in labels else tuple(sorted(set().union(*labels)))
+        return cls._HOST_LABELS
+
+    @classmethod
+    def _get_embed_literals(cls):
+        """
+        Literals, one of which is present in every webpage that this IE can find embeds in.
+        None if the IE may find embeds in any webpage. See required_literals for details
+        """
+        if '_EMBED_LITERALS' not in cls.__dict__:
+            if any(getattr(cls, name).__qualname__ != f'InfoExtractor.{name}'
+                   for name in ('extract_from_webpage', '_extract_from_webpage', '_extract_embed_urls')):
+                cls._EMBED_LITERALS = None  # Embeds may be found without using _EMBED_REGEX
+            else:
+                literals = [required_literals(regex) for regex in cls._EMBED_REGEX]
+                cls._EMBED_LITERALS = None if None in literals else tuple(sorted(set().union(*literals)))
+        return cls._EMBED_LITERALS
+
     @classmethod
     def _match_id(cls, url):
         return cls._match_valid_url(url).group('id')
@@ -864,6 +905,8 @@ def _request_webpage(self, url_or_request, video_id, note=None, errnote=None, fa
             headers.setdefault('X-Forwarded-For', self._x_forwarded_for_ip)
 
         extensions = {}
+        if self._HTTP_CACHE is not None and 'cache' not in getattr(url_or_request, 'extensions', {}):
+            extensions['cache'] = self._HTTP_CACHE
 
         if impersonate in (True, ''):
             impersonate = ImpersonateTarget()
@@ -3694,7 +3737,7 @@ def extract_comments(self, *args, **kwargs):
         generator = self._get_comments(*args, **kwargs)
 
         def extractor():
-            comments = []
+            comments = JSONLinesList() if self.get_param('stream_comments') else []
             interrupted = True
             try:
                 while True:
@@ -2528,7 +2528,7 @@ def _extract_embeds(self, url, webpage, *, urlh=None, info_dict={}):
         # webpage = urllib.parse.unquote(webpage)
 
         embeds = []
-        for ie in self._downloader._ies.values():
+        for _, ie in self._downloader._iter_embed_ies(webpage):
             if ie.ie_key() in smuggled_data.get('block_ies', []):
                 continue
             gen = ie.extract_from_webpage(self._downloader, url, webpage)
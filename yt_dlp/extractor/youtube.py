@@ -1,6 +1,7 @@
 import base64
 import calendar
 import collections
+import concurrent.futures
 import copy
 import datetime as dt
 import enum
@@ -20,8 +21,10 @@
 
 from .common import InfoExtractor, SearchInfoExtractor
 from .openload import PhantomJSwrapper
+from .._legacy_jsinterp import JSInterpreter as LegacyJSInterpreter
 from ..compat import functools
 from ..jsinterp import JSInterpreter
+from ..networking import Request
 from ..networking.exceptions import HTTPError, network_exceptions
 from ..utils import (
     NO_DEFAULT,
@@ -67,6 +70,7 @@
     urljoin,
     variadic,
 )
+from ..version import __version__
 
 STREAMING_DATA_CLIENT_NAME = '__yt_dlp_client'
 # any clients starting with _ cannot be explicitly requested by the user
@@ -1171,6 +1175,8 @@ class YoutubeIE(YoutubeBaseInfoExtractor):
         r'/(?P<id>[a-zA-Z0-9_-]{8,})/player(?:_ias\.vflset(?:/[a-zA-Z]{2,3}_[a-zA-Z]{2,3})?|-plasma-ias-(?:phone|tablet)-[a-z]{2}_[A-Z]{2}\.vflset)/base\.js$',
         r'\b(?P<id>vfl[a-zA-Z0-9_-]+)\b.*?\.js$',
     )
+    _PLAYER_RESULTS_CACHE_SIZE = 1000
+    _PLAYER_RESPONSE_WORKERS = 4
     _formats = {
         '5': {'ext': 'flv', 'width': 400, 'height': 240, 'acodec': 'mp3', 'abr': 64, 'vcodec': 'h263'},
         '6': {'ext': 'flv', 'width': 450, 'height': 270, 'acodec': 'mp3', 'abr': 64, 'vcodec': 'h263'},
@@ -2774,7 +2780,11 @@ def suitable(cls, url):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._code_cache = {}
+        self._code_cache_lock = threading.Lock()
         self._player_cache = {}
+        self._player_results = {}
+        self._player_results_lock = threading.Lock()
+        self._unsaved_player_results = set()
 
     def _prepare_live_from_start_formats(self, formats, video_id, live_start_time, url, webpage_url, smuggled_data, is_live):
         lock = threading.Lock()
@@ -2969,13 +2979,16 @@ def _extract_player_info(cls, player_url):
 
     def _load_player(self, video_id, player_url, fatal=True):
         player_id = self._extract_player_info(player_url)
-        if player_id not in self._code_cache:
-            code = self._download_webpage(
-                player_url, video_id, fatal=fatal,
-                note='Downloading player ' + player_id,
-                errnote='Download of %s failed' % player_url)
-            if code:
-                self._code_cache[player_id] = code
+        # The player responses of the clients are extracted concurrently, but the player is downloaded only once
+        with self._code_cache_lock:
+            if player_id not in self._code_cache:
+                # The player at a given URL never changes
+                code = self._download_webpage(
+                    Request(player_url, extensions={'cache': 30 * 24 * 60 * 60}), video_id, fatal=fatal,
+                    note='Downloading player ' + player_id,
+                    errnote='Download of %s failed' % player_url)
+                if code:
+                    self._code_cache[player_id] = code
         return self._code_cache.get(player_id)
 
     def _extract_signature_function(self, video_id, player_url, example_sig):
@@ -3057,10 +3070,65 @@ def _parse_sig_js(self, jscode):
              r'\bc\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\('),
             jscode, 'Initial JS player signature function name', group='sig')
 
-        jsi = JSInterpreter(jscode)
-        initial_function = jsi.extract_function(funcname)
+        initial_function = self._js_function_with_fallback(
+            'signature', lambda interpreter: interpreter(jscode).extract_function(funcname))
         return lambda s: initial_function([s])
 
+    def _js_function_with_fallback(self, name, build):
+        """
+        Build a JS function with build(interpreter_class) using JSInterpreter. The legacy interpreter
+        is used for the calls that fail, and for all the calls if the result of the first one differs
+        """
+        lock = threading.Lock()
+        func = legacy_func = None
+        checked = use_legacy = False
+
+        def call_legacy(args):
+            nonlocal legacy_func
+            try:
+                if legacy_func is None:
+                    legacy_func = build(LegacyJSInterpreter)
+                return legacy_func(args)
+            except Exception as e:
+                raise JSInterpreter.Exception(f'Legacy JS interpreter failed: {e}', cause=e)
+
+        def call(args):
+            nonlocal func, checked, use_legacy
+            if use_legacy:
+                return call_legacy(args)
+            try:
+                if func is None:
+                    try:
+                        func = build(JSInterpreter)
+                    except Exception:
+                        use_legacy = True
+                        raise
+                ret = func(args)
+            except Exception as e:
+                self.write_debug(f'Unable to run the {name} function: {e}; trying with the legacy JS interpreter')
+                try:
+                    return call_legacy(args)
+                except JSInterpreter.Exception:
+                    raise e
+            with lock:
+                if checked:
+                    return ret
+                checked = True
+                try:
+                    expected = call_legacy(args)
+                except JSInterpreter.Exception as e:
+                    self.write_debug(e)
+                    return ret
+                if expected != ret:
+                    self.report_warning(
+                        f'The {name} function returned {ret!r} for {args!r} instead of {expected!r}. '
+                        f'Using the legacy JS interpreter{bug_reports_message()}')
+                    use_legacy = True
+                    return expected
+            return ret
+
+        return call
+
     def _cached(self, func, *cache_id):
         def inner(*args, **kwargs):
             if cache_id not in self._player_cache:
@@ -3077,20 +3145,63 @@ def inner(*args, **kwargs):
             return ret
         return inner
 
+    def _cached_player_result(self, kind, player_url, s, func):
+        """
+        Memoize the results of func(s) for each player, in memory and in the filesystem cache
+
+        Only the last _PLAYER_RESULTS_CACHE_SIZE results of each player are kept.
+        The new results are written to the filesystem cache by _save_player_results
+        """
+        if self.get_param('youtube_print_sig_code'):
+            return func(s)
+
+        section, player_id = f'youtube-{kind}-results', self._extract_player_info(player_url)
+        with self._player_results_lock:
+            results = self._player_results.get((kind, player_id))
+            if results is None:
+                # Results of older versions are discarded, since they may be wrong due to a since fixed bug
+                results = self._player_results[(kind, player_id)] = collections.OrderedDict(
+                    self.cache.load(section, player_id, min_ver=__version__) or {})
+            if s in results:
+                results.move_to_end(s)
+                return results[s]
+
+        ret = func(s)
+        with self._player_results_lock:
+            results[s] = ret
+            while len(results) > self._PLAYER_RESULTS_CACHE_SIZE:
+                results.popitem(last=False)
+            self._unsaved_player_results.add((kind, player_id))
+        return ret
+
+    def _save_player_results(self):
+        """Write the player results memoized since the last call to the filesystem cache"""
+        with self._player_results_lock:
+            unsaved, self._unsaved_player_results = self._unsaved_player_results, set()
+            results = {key: dict(self._player_results[key]) for key in unsaved}
+        for (kind, player_id), player_results in results.items():
+            self.cache.store(f'youtube-{kind}-results', player_id, player_results)
+
     def _decrypt_signature(self, s, video_id, player_url):
         """Turn the encrypted s field into a working signature"""
-        extract_sig = self._cached(
-            self._extract_signature_function, 'sig', player_url, self._signature_cache_id(s))
-        func = extract_sig(video_id, player_url, s)
-        self._print_sig_code(func, s)
-        return func(s)
+        def decrypt_sig(s):
+            extract_sig = self._cached(
+                self._extract_signature_function, 'sig', player_url, self._signature_cache_id(s))
+            func = extract_sig(video_id, player_url, s)
+            self._print_sig_code(func, s)
+            return func(s)
+
+        return self._cached_player_result('sig', player_url, s, decrypt_sig)
 
     def _decrypt_nsig(self, s, video_id, player_url):
         """Turn the encrypted n field into a working signature"""
         if player_url is None:
             raise ExtractorError('Cannot decrypt nsig without player_url')
         player_url = urljoin('https://www.youtube.com', player_url)
+        return self._cached_player_result(
+            'nsig', player_url, s, lambda s: self._compute_nsig(s, video_id, player_url))
 
+    def _compute_nsig(self, s, video_id, player_url):
         try:
             jsi, player_id, func_code = self._extract_n_function_code(video_id, player_url)
         except ExtractorError as e:
@@ -3157,20 +3268,27 @@ def _extract_n_function_code(self, video_id, player_url):
         return jsi, player_id, func_code
 
     def _extract_n_function_from_code(self, jsi, func_code):
-        func = jsi.extract_function_from_code(*func_code)
+        def build(interpreter):
+            func = (jsi if isinstance(jsi, interpreter) else interpreter(jsi.code)).extract_function_from_code(
+                *func_code)
+
+            def nsig_function(args):
+                ret = func(args)
+                if ret.startswith('enhanced_except_'):
+                    raise interpreter.Exception('Signature function returned an exception')
+                return ret
+            return nsig_function
+
+        func = self._js_function_with_fallback('nsig', build)
 
         def extract_nsig(s):
             try:
-                ret = func([s])
+                return func([s])
             except JSInterpreter.Exception:
                 raise
             except Exception as e:
                 raise JSInterpreter.Exception(traceback.format_exc(), cause=e)
 
-            if ret.startswith('enhanced_except_'):
-                raise JSInterpreter.Exception('Signature function returned an exception')
-            return ret
-
         return extract_nsig
 
     def _extract_signature_timestamp(self, video_id, player_url, ytcfg=None, fatal=False):
@@ -3388,9 +3506,39 @@ def extract_header(contents):
                 break
             return _continuation
 
+        def prefetch_replies(contents):
+            """Download the first page of the reply threads in the background"""
+            if max_depth == 1 or not max_replies_per_thread or tracker['total_reply_comments'] >= max_replies:
+                return
+            comment_prog_str = f"({tracker['running_total']}/~{tracker['est_total']})"
+            remaining_parents = max_parents - tracker['total_parent_comments']
+            remaining_replies = max_replies - tracker['total_reply_comments']
+            remaining_comments = max_comments - tracker['running_total']
+            thread_num = submitted = 0
+            for parent_num, thread in enumerate(traverse_obj(contents, (..., 'commentThreadRenderer', {dict})), 1):
+                # Only the threads of the comments that will be extracted, each of which takes at least a reply
+                if (parent_num > remaining_parents or submitted >= remaining_replies
+                        or parent_num + submitted >= remaining_comments):
+                    break
+                renderer = traverse_obj(thread, ('replies', 'commentRepliesRenderer', {dict}))
+                if not renderer:
+                    continue
+                thread_num += 1
+                continuation = self._extract_continuation(renderer)
+                token = traverse_obj(continuation, 'continuation')
+                if token and token not in tracker['reply_pages']:
+                    submitted += 1
+                    tracker['reply_pages'][token] = tracker['reply_pool'].submit(
+                        self._extract_response, item_id=None, query=continuation, ep='next', ytcfg=ytcfg,
+                        headers=self.generate_api_headers(ytcfg=ytcfg),
+                        note=f'    Downloading comment API JSON reply thread {thread_num} {comment_prog_str}',
+                        check_get_keys=[[*continuation_items_path, ..., ('commentThreadRenderer', 'commentRenderer')]])
+
         def extract_thread(contents):
             if not parent:
                 tracker['current_page_thread'] = 0
+                if tracker['reply_pool']:
+                    prefetch_replies(contents)
             for content in contents:
                 if not parent and tracker['total_parent_comments'] >= max_parents:
                     yield
@@ -3444,8 +3592,21 @@ def extract_thread(contents):
                 total_parent_comments=0,
                 total_reply_comments=0,
                 seen_comment_ids=set(),
-                pinned_comment_ids=set()
+                pinned_comment_ids=set(),
+                reply_pages={},
+                reply_pool=None,
             )
+            # The first pages of the reply threads are downloaded concurrently, but are still consumed in order
+            comment_workers = int_or_none(get_single_config_arg('comment_workers')) or 1
+            if comment_workers > 1:
+                tracker['reply_pool'] = concurrent.futures.ThreadPoolExecutor(comment_workers)
+                try:
+                    yield from self._comment_entries(root_continuation_data, ytcfg, video_id, tracker=tracker)
+                finally:
+                    for future in tracker['reply_pages'].values():
+                        future.cancel()
+                    tracker['reply_pool'].shutdown(wait=False)
+                return
 
         # TODO: Deprecated
         # YouTube comments have a max depth of 2
@@ -3496,8 +3657,10 @@ def extract_thread(contents):
             if not is_forced_continuation and not (tracker['est_total'] == 0 and tracker['running_total'] == 0):
                 check_get_keys = [[*continuation_items_path, ..., (
                     'commentsHeaderRenderer' if is_first_continuation else ('commentThreadRenderer', 'commentRenderer'))]]
+            prefetched_page = page_num == 0 and parent and tracker['reply_pages'].pop(
+                traverse_obj(continuation, 'continuation'), None)
             try:
-                response = self._extract_response(
+                response = prefetched_page.result() if prefetched_page else self._extract_response(
                     item_id=None, query=continuation,
                     ep='next', ytcfg=ytcfg, headers=headers, note=note_prefix,
                     check_get_keys=check_get_keys)
@@ -3676,51 +3839,77 @@ def append_client(*client_names):
                         all_clients.add(actual_client)
                         return
 
+        player_skip = self._configuration_arg('player_skip')
+        player_url_lock = threading.Lock()
         tried_iframe_fallback = False
         player_url = None
-        skipped_clients = {}
-        while clients:
-            client, base_client, variant = _split_innertube_client(clients.pop())
+
+        def fetch_player_response(client):
+            """ Download the ytcfg and the player response of a client. Called from the worker threads """
+            nonlocal player_url, tried_iframe_fallback
             player_ytcfg = master_ytcfg if client == 'web' else {}
-            if 'configs' not in self._configuration_arg('player_skip') and client != 'web':
+            if 'configs' not in player_skip and client != 'web':
                 player_ytcfg = self._download_ytcfg(client, video_id) or player_ytcfg
 
-            player_url = player_url or self._extract_player_url(master_ytcfg, player_ytcfg, webpage=webpage)
             require_js_player = self._get_default_ytcfg(client).get('REQUIRE_JS_PLAYER')
-            if 'js' in self._configuration_arg('player_skip'):
-                require_js_player = False
-                player_url = None
-
-            if not player_url and not tried_iframe_fallback and require_js_player:
-                player_url = self._download_player_url(video_id)
-                tried_iframe_fallback = True
-
+            with player_url_lock:
+                player_url = player_url or self._extract_player_url(master_ytcfg, player_ytcfg, webpage=webpage)
+                if 'js' in player_skip:
+                    require_js_player = False
+                    player_url = None
+
+                if not player_url and not tried_iframe_fallback and require_js_player:
+                    player_url = self._download_player_url(video_id)
+                    tried_iframe_fallback = True
+                client_player_url = player_url
+
+            if client == 'web' and initial_pr:
+                return initial_pr
+            return self._extract_player_response(
+                client, video_id, player_ytcfg or master_ytcfg, player_ytcfg,
+                client_player_url if require_js_player else None, initial_pr, smuggled_data)
+
+        # The clients are requested concurrently, but the responses are processed in the same order as
+        # they would be if the clients were requested one after another
+        skipped_clients, futures = {}, {}
+        with concurrent.futures.ThreadPoolExecutor(self._PLAYER_RESPONSE_WORKERS) as pool:
             try:
-                pr = initial_pr if client == 'web' and initial_pr else self._extract_player_response(
-                    client, video_id, player_ytcfg or master_ytcfg, player_ytcfg, player_url if require_js_player else None, initial_pr, smuggled_data)
-            except ExtractorError as e:
-                self.report_warning(e)
-                continue
+                while clients:
+                    for client_name in reversed(clients):
+                        if client_name not in futures:
+                            futures[client_name] = pool.submit(
+                                fetch_player_response, _split_innertube_client(client_name)[0])
+
+                    client_name = clients.pop()
+                    client, base_client, variant = _split_innertube_client(client_name)
+                    try:
+                        pr = futures.pop(client_name).result()
+                    except ExtractorError as e:
+                        self.report_warning(e)
+                        continue
 
-            if pr_id := self._invalid_player_response(pr, video_id):
-                skipped_clients[client] = pr_id
-            elif pr:
-                # Save client name for introspection later
-                name = short_client_name(client)
-                sd = traverse_obj(pr, ('streamingData', {dict})) or {}
-                sd[STREAMING_DATA_CLIENT_NAME] = name
-                for f in traverse_obj(sd, (('formats', 'adaptiveFormats'), ..., {dict})):
-                    f[STREAMING_DATA_CLIENT_NAME] = name
-                prs.append(pr)
-
-            # creator clients can bypass AGE_VERIFICATION_REQUIRED if logged in
-            if variant == 'embedded' and self._is_unplayable(pr) and self.is_authenticated:
-                append_client(f'{base_client}_creator')
-            elif self._is_agegated(pr):
-                if variant == 'tv_embedded':
-                    append_client(f'{base_client}_embedded')
-                elif not variant:
-                    append_client(f'tv_embedded.{base_client}', f'{base_client}_embedded')
+                    if pr_id := self._invalid_player_response(pr, video_id):
+                        skipped_clients[client] = pr_id
+                    elif pr:
+                        # Save client name for introspection later
+                        name = short_client_name(client)
+                        sd = traverse_obj(pr, ('streamingData', {dict})) or {}
+                        sd[STREAMING_DATA_CLIENT_NAME] = name
+                        for f in traverse_obj(sd, (('formats', 'adaptiveFormats'), ..., {dict})):
+                            f[STREAMING_DATA_CLIENT_NAME] = name
+                        prs.append(pr)
+
+                    # creator clients can bypass AGE_VERIFICATION_REQUIRED if logged in
+                    if variant == 'embedded' and self._is_unplayable(pr) and self.is_authenticated:
+                        append_client(f'{base_client}_creator')
+                    elif self._is_agegated(pr):
+                        if variant == 'tv_embedded':
+                            append_client(f'{base_client}_embedded')
+                        elif not variant:
+                            append_client(f'tv_embedded.{base_client}', f'{base_client}_embedded')
+            finally:
+                for future in futures.values():
+                    future.cancel()
 
         if skipped_clients:
             self.report_warning(
@@ -3816,7 +4005,7 @@ def build_fragments(f):
             throttled = False
             if query.get('n'):
                 try:
-                    decrypt_nsig = self._cached(self._decrypt_nsig, 'nsig', query['n'][0])
+                    decrypt_nsig = self._cached(self._decrypt_nsig, 'nsig', player_url, query['n'][0])
                     fmt_url = update_url_query(fmt_url, {
                         'n': decrypt_nsig(query['n'][0], video_id, player_url)
                     })
@@ -4062,6 +4251,8 @@ def _list_formats(self, video_id, microformats, video_details, player_responses,
                        else None)
         streaming_data = traverse_obj(player_responses, (..., 'streamingData'))
         *formats, subtitles = self._extract_formats_and_subtitles(streaming_data, video_id, player_url, live_status, duration)
+        # Once per video rather than once per decrypted signature
+        self._save_player_results()
         if all(f.get('has_drm') for f in formats):
             # If there are no formats that definitely don't have DRM, all have DRM
             for f in formats:
@@ -4937,25 +5128,20 @@ def _extract_entries(self, parent_renderer, continuation_list):
             continuation_list[0] = self._extract_continuation(parent_renderer)
 
     def _entries(self, tab, item_id, ytcfg, account_syncid, visitor_data):
-        continuation_list = [None]
-        extract_entries = lambda x: self._extract_entries(x, continuation_list)
         tab_content = try_get(tab, lambda x: x['content'], dict)
         if not tab_content:
             return
         parent_renderer = (
             try_get(tab_content, lambda x: x['sectionListRenderer'], dict)
             or try_get(tab_content, lambda x: x['richGridRenderer'], dict) or {})
-        yield from extract_entries(parent_renderer)
+        continuation_list = [None]
+        # The entries of a page are collected before they are yielded, so that the next page
+        # can be downloaded in the background while they are being processed
+        entries = list(self._extract_entries(parent_renderer, continuation_list))
         continuation = continuation_list[0]
-        seen_continuations = set()
-        for page_num in itertools.count(1):
-            if not continuation:
-                break
-            continuation_token = continuation.get('continuation')
-            if continuation_token is not None and continuation_token in seen_continuations:
-                self.write_debug('Detected YouTube feed looping - assuming end of feed.')
-                break
-            seen_continuations.add(continuation_token)
+
+        def fetch_page(page_num, continuation, visitor_data):
+            """ @returns (entries, continuation, visitor_data) of the page, or None if there are no more pages """
             headers = self.generate_api_headers(
                 ytcfg=ytcfg, account_syncid=account_syncid, visitor_data=visitor_data)
             response = self._extract_response(
@@ -4964,11 +5150,13 @@ def _entries(self, tab, item_id, ytcfg, account_syncid, visitor_data):
                 check_get_keys=('continuationContents', 'onResponseReceivedActions', 'onResponseReceivedEndpoints'))
 
             if not response:
-                break
+                return
             # Extracting updated visitor data is required to prevent an infinite extraction loop in some cases
             # See: https://github.com/ytdl-org/youtube-dl/issues/28702
             visitor_data = self._extract_visitor_data(response) or visitor_data
 
+            continuation_list = [None]
+            extract_entries = lambda x: self._extract_entries(x, continuation_list)
             known_renderers = {
                 'videoRenderer': (self._grid_entries, 'items'),  # for membership tab
                 'gridPlaylistRenderer': (self._grid_entries, 'items'),
@@ -4991,18 +5179,43 @@ def _entries(self, tab, item_id, ytcfg, account_syncid, visitor_data):
             ), 'continuationContents', get_all=False)
             continuation_item = traverse_obj(continuation_items, 0, None, expected_type=dict, default={})
 
-            video_items_renderer = None
+            video_items_renderer, entries, continuation = None, [], None
             for key in continuation_item.keys():
                 if key not in known_renderers:
                     continue
                 func, parent_key = known_renderers[key]
                 video_items_renderer = {parent_key: continuation_items} if parent_key else continuation_items
-                continuation_list = [None]
-                yield from func(video_items_renderer)
+                continuation_list[0] = None
+                entries.extend(func(video_items_renderer))
                 continuation = continuation_list[0] or self._extract_continuation(video_items_renderer)
 
-            if not video_items_renderer:
-                break
+            if video_items_renderer:
+                return entries, continuation, visitor_data
+
+        seen_continuations = set()
+        pool = concurrent.futures.ThreadPoolExecutor(1)
+        next_page = None
+        try:
+            for page_num in itertools.count(1):
+                continuation_token = traverse_obj(continuation, 'continuation')
+                if continuation_token is not None and continuation_token in seen_continuations:
+                    self.write_debug('Detected YouTube feed looping - assuming end of feed.')
+                elif continuation:
+                    seen_continuations.add(continuation_token)
+                    next_page = pool.submit(fetch_page, page_num, continuation, visitor_data)
+
+                yield from entries
+                if not next_page:
+                    break
+                page, next_page = next_page.result(), None
+                if not page:
+                    break
+                entries, continuation, visitor_data = page
+        finally:
+            # Do not wait for a page that is no longer needed, e.g. when the consumer stops iterating
+            if next_page:
+                next_page.cancel()
+            pool.shutdown(wait=False)
 
     @staticmethod
     def _extract_selected_tab(tabs, fatal=True):
@@ -1,16 +1,13 @@
 import collections
 import contextlib
 import itertools
-import json
 import math
 import operator
 import re
 
 from .utils import (
-    NO_DEFAULT,
     ExtractorError,
     function_with_repr,
-    js_to_json,
     remove_quotes,
     truncate_string,
     unified_timestamp,
@@ -95,9 +92,24 @@ def _js_ternary(cndn, if_true=True, if_false=False):
     return if_true
 
 
+def _js_typeof(value):
+    if value is JS_Undefined:
+        return 'undefined'
+    elif value is None:
+        return 'object'
+    elif isinstance(value, bool):
+        return 'boolean'
+    elif isinstance(value, (int, float)):
+        return 'number'
+    elif isinstance(value, str):
+        return 'string'
+    elif callable(value):
+        return 'function'
+    return 'object'
+
+
 # Ref: https://developer.mozilla.org/en-US/docs/Web/JavaScript/Reference/Operators/Operator_Precedence
-_OPERATORS = {  # None => Defined in JSInterpreter._operator
-    '?': None,
+_OPERATORS = {  # None => Short-circuiting operators defined in JSInterpreter._compile_binary
     '??': None,
     '||': None,
     '&&': None,
@@ -116,6 +128,7 @@ def _js_ternary(cndn, if_true=True, if_false=False):
     '<': _js_comp_op(operator.lt),
     '>': _js_comp_op(operator.gt),
 
+    '>>>': _js_bit_op(lambda a, b: (int(a) & 0xffffffff) >> (int(b) & 31)),
     '>>': _js_bit_op(operator.rshift),
     '<<': _js_bit_op(operator.lshift),
 
@@ -128,17 +141,56 @@ def _js_ternary(cndn, if_true=True, if_false=False):
     '**': _js_exp,
 }
 
-_COMP_OPERATORS = {'===', '!==', '==', '!=', '<=', '>=', '<', '>'}
+# Binary operators from the lowest to the highest precedence. "**" is right-associative and is parsed separately
+_PRECEDENCE = (
+    ('||', '??'), ('&&',), ('|',), ('^',), ('&',), ('==', '!=', '===', '!=='), ('<', '<=', '>', '>='),
+    ('<<', '>>', '>>>'), ('+', '-'), ('*', '/', '%'))
+_ASSIGN_OPERATORS = {f'{op}=' for op in _OPERATORS} | {'='}
 
 _NAME_RE = r'[a-zA-Z_$][\w$]*'
 _MATCHING_PARENS = dict(zip(*zip('()', '{}', '[]')))
 _QUOTES = '\'"/'
 
+_PUNCTUATORS = sorted((
+    *_ASSIGN_OPERATORS, *_OPERATORS, '=>', '...', '?.', '++', '--', '!', '~', '?', ':', '.', ',', ';',
+    *_MATCHING_PARENS, *_MATCHING_PARENS.values()), key=len, reverse=True)
+_TOKEN_RE = re.compile(r'''(?s)(?P<space>\s+)|(?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<number>0[xX][\da-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<name>{})
+    |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<op>{})'''.format(
+    _NAME_RE, '|'.join(r'\?\.(?!\d)' if op == '?.' else re.escape(op) for op in _PUNCTUATORS)), re.X)
+_REGEX_LITERAL_RE = re.compile(r'/(?P<pattern>(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+)/(?P<flags>[a-zA-Z]*)')
+_STRING_ESCAPE_RE = re.compile(
+    r'(?s)\\(?:x(?P<x>[\da-fA-F]{2})|u\{(?P<u>[\da-fA-F]+)\}|u(?P<u4>[\da-fA-F]{4})|(?P<char>\r\n|.))')
+_STRING_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v', '0': '\0', '\n': '', '\r\n': ''}
+
+# Names that cannot be used as variables. "undefined", "NaN" and "Infinity" are treated as literals
+_KEYWORDS = {
+    'break', 'case', 'catch', 'const', 'continue', 'default', 'delete', 'do', 'else', 'false', 'finally', 'for',
+    'function', 'if', 'in', 'instanceof', 'let', 'new', 'null', 'of', 'return', 'switch', 'throw', 'true', 'try',
+    'typeof', 'var', 'void', 'while',
+}
+_LITERALS = {
+    'true': True,
+    'false': False,
+    'null': None,
+    'undefined': None,  # Replaced by JS_Undefined below
+    'NaN': float('nan'),
+    'Infinity': float('inf'),
+}
+# A "/" after these is the start of a regex literal rather than a division
+_KEYWORDS_BEFORE_EXPRESSION = {
+    'case', 'delete', 'do', 'else', 'in', 'instanceof', 'new', 'return', 'throw', 'typeof', 'void'}
+
 
 class JS_Undefined:
     pass
 
 
+_LITERALS['undefined'] = JS_Undefined
+
+
 class JS_Break(ExtractorError):
     def __init__(self):
         ExtractorError.__init__(self, 'Invalid break')
@@ -156,6 +208,8 @@ def __init__(self, e):
 
 
 class LocalNameSpace(collections.ChainMap):
+    allow_recursion = 100
+
     def __setitem__(self, key, value):
         for scope in self.maps:
             if key in scope:
@@ -176,29 +230,503 @@ def write(*args, level=100):
         write_string(f'[debug] JS: {"  " * (100 - level)}'
                      f'{" ".join(truncate_string(str(x), 50, 50) for x in args)}\n')
 
-    @classmethod
-    def wrap_interpreter(cls, f):
-        def interpret_statement(self, stmt, local_vars, allow_recursion, *args, **kwargs):
-            if cls.ENABLED and stmt.strip():
-                cls.write(stmt, level=allow_recursion)
-            try:
-                ret, should_ret = f(self, stmt, local_vars, allow_recursion, *args, **kwargs)
-            except Exception as e:
-                if cls.ENABLED:
-                    if isinstance(e, ExtractorError):
-                        e = e.orig_msg
-                    cls.write('=> Raises:', e, '<-|', stmt, level=allow_recursion)
-                raise
-            if cls.ENABLED and stmt.strip():
-                if should_ret or not repr(ret) == stmt:
-                    cls.write(['->', '=>'][should_ret], repr(ret), '<-|', stmt, level=allow_recursion)
-            return ret, should_ret
-        return interpret_statement
 
+# Completion signals of the compiled statements. A return is signaled by a tuple of the returned value
+_BREAK, _CONTINUE = object(), object()
+
+
+def _decode_string(literal):
+    def unescape(mobj):
+        code = mobj.group('x') or mobj.group('u') or mobj.group('u4')
+        if code:
+            return chr(int(code, 16))
+        char = mobj.group('char')
+        return _STRING_ESCAPES.get(char, char)
+
+    value = _STRING_ESCAPE_RE.sub(unescape, literal[1:-1])
+    # Combine surrogate pairs from \u escapes
+    with contextlib.suppress(UnicodeError):
+        value = value.encode('utf-16', 'surrogatepass').decode('utf-16')
+    return value
+
+
+def _tokenize(code):
+    """
+    Split the code into tokens
+
+    @returns    (kind, value, start, end, newline_before) for each token
+                where kind is one of "number", "name", "string", "regex", "op" and "eof"
+    """
+    pos, newline, prev = 0, False, None
+    while pos < len(code):
+        mobj = _TOKEN_RE.match(code, pos)
+        if not mobj:
+            raise JSInterpreter.Exception('Unexpected character', code[pos:])
+        kind, value = mobj.lastgroup, mobj.group()
+        if kind in ('space', 'comment'):
+            newline = newline or '\n' in value
+            pos = mobj.end()
+            continue
+
+        if kind == 'number':
+            if value[:2] in ('0x', '0X'):
+                value = int(value, 16)
+            else:
+                value = float(value) if re.search(r'[.eE]', value) else int(value)
+        elif kind == 'string':
+            value = _decode_string(value)
+        elif kind == 'op' and value in ('/', '/=') and (
+                prev is None or (prev[0] == 'op' and prev[1] not in (')', ']', '}'))
+                or (prev[0] == 'name' and prev[1] in _KEYWORDS_BEFORE_EXPRESSION)):
+            mobj = _REGEX_LITERAL_RE.match(code, pos) or mobj
+            if mobj.re is _REGEX_LITERAL_RE:
+                # We don't support regex methods yet, so no point compiling it
+                flags, _ = JSInterpreter._regex_flags(mobj.group('flags'))
+                kind, value = 'regex', f'/{mobj.group("pattern")}/{flags}'
+
+        prev = (kind, value, pos, mobj.end(), newline)
+        yield prev
+        pos, newline = mobj.end(), False
+    yield ('eof', None, len(code), len(code), True)
+
+
+class _JSParser:
+    """
+    Parse JavaScript code into a tree of tuples: (kind, source, *fields)
+
+    The kinds of the nodes are the names of the JSInterpreter._compile_* methods
+    """
+
+    def __init__(self, code):
+        self.code = code
+        self._tokens = list(_tokenize(code))
+        self._index = 0
+        self._token = self._tokens[0]
+        # (declared names, function declarations) of the functions being parsed
+        self._scopes = []
+
+        self._matching_parens, stack = {}, []
+        for i, token in enumerate(self._tokens):
+            if token[0] != 'op':
+                continue
+            elif token[1] in _MATCHING_PARENS:
+                stack.append(i)
+            elif token[1] in _MATCHING_PARENS.values() and stack:
+                self._matching_parens[stack.pop()] = i
+
+    def _advance(self):
+        token = self._token
+        self._index += 1
+        self._token = self._tokens[self._index]
+        return token
+
+    def _is(self, value, kind='op'):
+        return self._token[1] == value and self._token[0] == kind
+
+    def _accept(self, value, kind='op'):
+        if self._is(value, kind):
+            return self._advance()
+
+    def _expect(self, value, kind='op'):
+        if not self._is(value, kind):
+            self._error(f'Expected {value!r}')
+        return self._advance()
+
+    def _expect_name(self):
+        if self._token[0] != 'name' or self._token[1] in _KEYWORDS:
+            self._error('Expected a name')
+        return self._advance()[1]
+
+    def _error(self, msg=None):
+        start = self._token[2]
+        if not msg:
+            msg = 'Unexpected end of code' if self._token[0] == 'eof' else f'Unexpected token {self._token[1]!r}'
+        raise JSInterpreter.Exception(f'Unsupported JS expression: {msg}', self.code[start:])
+
+    def _source(self, start):
+        return self.code[start: self._tokens[self._index - 1][3]]
+
+    def parse_function(self, params):
+        """Parse the code as the body of a function"""
+        body = self._function_body(params, lambda: self._token[0] == 'eof')
+        return ('function', self.code, None, tuple(params), *body, False)
+
+    def parse_expression(self):
+        expr = self._expression()
+        if self._token[0] != 'eof':
+            self._error()
+        return expr
+
+    def _function_body(self, params, is_end):
+        self._scopes.append((set(), []))
+        body = []
+        while not is_end():
+            body.append(self._statement())
+        declared, functions = self._scopes.pop()
+        return body, tuple(declared - set(params)), tuple(functions)
+
+    def _function(self, start, arrow=False):
+        name = None if arrow or self._is('(') else self._expect_name()
+        if arrow and not self._is('('):
+            params = [self._expect_name()]
+        else:
+            self._expect('(')
+            params = []
+            while not self._accept(')'):
+                params.append(self._expect_name())
+                if not self._is(')'):
+                    self._expect(',')
+        if arrow:
+            self._expect('=>')
+        if arrow and not self._is('{'):
+            expr_start = self._token[2]
+            self._scopes.append((set(), []))
+            value = self._assignment()
+            body = ([('return', self._source(expr_start), value)], *self._scopes.pop())
+        else:
+            self._expect('{')
+            body = self._function_body(params, lambda: self._is('}') or self._token[0] == 'eof')
+            self._expect('}')
+        return ('function', self._source(start), name, tuple(params), *body, arrow)
+
+    def _is_arrow_function(self):
+        token, next_index = self._token, self._index + 1
+        if token[0] == 'name' and token[1] not in _KEYWORDS:
+            pass
+        elif token[0] == 'op' and token[1] == '(' and self._index in self._matching_parens:
+            next_index = self._matching_parens[self._index] + 1
+        else:
+            return False
+        return self._tokens[next_index][:2] == ('op', '=>')
+
+    # Statements
+
+    def _statement(self):
+        start, (kind, value) = self._token[2], self._token[:2]
+        if kind == 'op':
+            if value == '{':
+                return self._block()
+            elif value == ';':
+                self._advance()
+                return ('empty', self._source(start))
+        elif kind == 'name':
+            if value in ('var', 'let', 'const'):
+                node = self._declaration()
+                self._end_statement()
+                return node
+            elif value == 'function' and self._tokens[self._index + 1][0] == 'name':
+                self._advance()
+                node = self._function(start)
+                self._scopes[-1][0].add(node[2])
+                self._scopes[-1][1].append(node)
+                return ('empty', node[1])
+            parse = value in _KEYWORDS and getattr(self, f'_{value}_statement', None)
+            if parse:
+                self._advance()
+                return parse(start)
+
+        expr = self._expression()
+        self._end_statement()
+        return ('expression', self._source(start), expr)
+
+    def _end_statement(self):
+        if not self._accept(';') and not self._is('}') and not self._token[4]:
+            self._error()
+
+    def _block(self):
+        start = self._expect('{')[2]
+        body = []
+        while not self._accept('}'):
+            if self._token[0] == 'eof':
+                self._error()
+            body.append(self._statement())
+        return ('block', self._source(start), body)
+
+    def _declaration(self):
+        start, kind = self._advance()[2:0:-1]
+        declarations = []
+        while True:
+            name = self._expect_name()
+            self._scopes[-1][0].add(name)
+            declarations.append((name, self._assignment() if self._accept('=') else None))
+            if not self._accept(','):
+                break
+        return ('declaration', self._source(start), kind, declarations)
+
+    def _parenthesized(self):
+        self._expect('(')
+        expr = self._expression()
+        self._expect(')')
+        return expr
+
+    def _if_statement(self, start):
+        test = self._parenthesized()
+        consequent = self._statement()
+        alternate = self._statement() if self._accept('else', 'name') else None
+        return ('if', self._source(start), test, consequent, alternate)
+
+    def _for_statement(self, start):
+        self._expect('(')
+        init = None
+        if self._token[1] in ('var', 'let', 'const') and self._token[0] == 'name':
+            init = self._declaration()
+        elif not self._is(';'):
+            init = ('expression', None, self._expression())
+
+        iteration = self._token[1] in ('in', 'of') and self._token[0] == 'name' and self._advance()[1]
+        if iteration:
+            if init[0] == 'declaration' and len(init[3]) == 1 and not init[3][0][1]:
+                target = init[3][0][0]
+            elif init[0] == 'expression' and init[2][0] == 'name':
+                target = init[2][2]
+            else:
+                self._error('Unsupported for loop variable')
+            iterable = self._expression()
+            self._expect(')')
+            return ('for_in', self._source(start), iteration, target, iterable, self._statement())
+
+        self._expect(';')
+        test = None if self._is(';') else self._expression()
+        self._expect(';')
+        update = None if self._is(')') else self._expression()
+        self._expect(')')
+        return ('for', self._source(start), init, test, update, self._statement())
+
+    def _while_statement(self, start):
+        test = self._parenthesized()
+        return ('while', self._source(start), test, self._statement())
+
+    def _do_statement(self, start):
+        body = self._statement()
+        self._expect('while', 'name')
+        test = self._parenthesized()
+        self._accept(';')
+        return ('do', self._source(start), body, test)
+
+    def _return_statement(self, start):
+        value = None
+        if not self._is(';') and not self._is('}') and not self._token[4]:
+            value = self._expression()
+        self._end_statement()
+        return ('return', self._source(start), value)
+
+    def _throw_statement(self, start):
+        value = self._expression()
+        self._end_statement()
+        return ('throw', self._source(start), value)
+
+    def _break_statement(self, start):
+        self._end_statement()
+        return ('break', self._source(start))
+
+    def _continue_statement(self, start):
+        self._end_statement()
+        return ('continue', self._source(start))
+
+    def _switch_statement(self, start):
+        discriminant = self._parenthesized()
+        self._expect('{')
+        cases = []
+        while not self._accept('}'):
+            if self._accept('default', 'name'):
+                test = None
+            else:
+                self._expect('case', 'name')
+                test = self._expression()
+            self._expect(':')
+            body = []
+            while not (self._is('}') or self._is('case', 'name') or self._is('default', 'name')):
+                if self._token[0] == 'eof':
+                    self._error()
+                body.append(self._statement())
+            cases.append((test, body))
+        return ('switch', self._source(start), discriminant, cases)
+
+    def _try_statement(self, start):
+        block = self._block()
+        param = handler = finalizer = None
+        if self._accept('catch', 'name'):
+            if self._accept('('):
+                param = self._expect_name()
+                self._expect(')')
+            handler = self._block()
+        if self._accept('finally', 'name'):
+            finalizer = self._block()
+        if not handler and not finalizer:
+            self._error('Missing catch or finally after try')
+        return ('try', self._source(start), block, param, handler, finalizer)
+
+    # Expressions
+
+    def _expression(self):
+        start = self._token[2]
+        expr = self._assignment()
+        if not self._is(','):
+            return expr
+        exprs = [expr]
+        while self._accept(','):
+            exprs.append(self._assignment())
+        return ('sequence', self._source(start), exprs)
+
+    def _assignment(self):
+        start = self._token[2]
+        if self._is_arrow_function():
+            return self._function(start, arrow=True)
+        target = self._conditional()
+        if self._token[0] != 'op' or self._token[1] not in _ASSIGN_OPERATORS:
+            return target
+        elif target[0] not in ('name', 'member'):
+            self._error('Invalid assignment target')
+        op = self._advance()[1][:-1] or None
+        return ('assign', self._source(start), op, target, self._assignment())
+
+    def _conditional(self):
+        start = self._token[2]
+        test = self._binary(0)
+        if not self._accept('?'):
+            return test
+        consequent = self._assignment()
+        self._expect(':')
+        return ('conditional', self._source(start), test, consequent, self._assignment())
+
+    def _binary(self, level):
+        if level == len(_PRECEDENCE):
+            return self._exponent()
+        start, operators = self._token[2], _PRECEDENCE[level]
+        left, rest = self._binary(level + 1), []
+        while self._token[0] == 'op' and self._token[1] in operators:
+            rest.append((self._advance()[1], self._binary(level + 1)))
+        return ('binary', self._source(start), left, rest) if rest else left
+
+    def _exponent(self):
+        start = self._token[2]
+        base = self._unary()
+        if self._accept('**'):
+            return ('binary', self._source(start), base, [('**', self._exponent())])
+        return base
+
+    def _unary(self):
+        start, (kind, value) = self._token[2], self._token[:2]
+        if kind == 'op' and value in ('!', '~', '+', '-'):
+            self._advance()
+            operand = self._unary()
+            if value == '-' and operand[0] == 'constant' and type(operand[2]) in (int, float):
+                return ('constant', self._source(start), -operand[2])
+            return ('unary', self._source(start), value, operand)
+        elif kind == 'op' and value in ('++', '--'):
+            self._advance()
+            return ('update', self._source(start), value, True, self._target(self._unary()))
+        elif kind == 'name' and value in ('typeof', 'void', 'delete'):
+            self._advance()
+            return ('unary', self._source(start), value, self._unary())
+
+        expr = self._call_member()
+        if self._token[0] == 'op' and self._token[1] in ('++', '--') and not self._token[4]:
+            return ('update', self._source(start), self._advance()[1], False, self._target(expr))
+        return expr
+
+    def _target(self, expr):
+        if expr[0] not in ('name', 'member'):
+            self._error('Invalid update target')
+        return expr
+
+    def _arguments(self):
+        self._expect('(')
+        args = []
+        while not self._accept(')'):
+            args.append(self._assignment())
+            if not self._is(')'):
+                self._expect(',')
+        return args
+
+    def _call_member(self, allow_call=True):
+        start = self._token[2]
+        if self._accept('new', 'name'):
+            callee = self._call_member(allow_call=False)
+            expr = ('new', self._source(start), callee, self._arguments() if self._is('(') else [])
+        else:
+            expr = self._primary()
+
+        while True:
+            optional = bool(self._accept('?.'))
+            if self._is('(') and allow_call:
+                expr = ('call', None, expr, self._arguments(), optional)
+            elif self._accept('['):
+                key = self._expression()
+                self._expect(']')
+                expr = ('member', None, expr, key, optional)
+            elif optional or self._accept('.'):
+                key_start = self._token[2]
+                if self._token[0] != 'name':
+                    self._error('Expected a property name')
+                key = ('constant', self._source(key_start), self._advance()[1])
+                expr = ('member', None, expr, key, optional)
+            else:
+                return expr
+            expr = (expr[0], self._source(start), *expr[2:])
+
+    def _primary(self):
+        start, (kind, value) = self._token[2], self._token[:2]
+        if kind in ('number', 'string', 'regex'):
+            self._advance()
+            return ('constant', self._source(start), value)
+        elif kind == 'name':
+            if value in _LITERALS:
+                self._advance()
+                return ('constant', self._source(start), _LITERALS[value])
+            elif value == 'function':
+                self._advance()
+                return self._function(start)
+            elif value not in _KEYWORDS:
+                self._advance()
+                return ('name', self._source(start), value)
+        elif kind == 'op':
+            if value == '(':
+                return self._parenthesized()
+            elif value == '[':
+                return self._array()
+            elif value == '{':
+                return self._object()
+        self._error()
+
+    def _array(self):
+        start = self._expect('[')[2]
+        elements = []
+        while not self._accept(']'):
+            if self._is(','):
+                elements.append(('constant', '', JS_Undefined))
+            else:
+                elements.append(self._assignment())
+            if not self._is(']'):
+                self._expect(',')
+        return ('array', self._source(start), elements)
+
+    def _object(self):
+        start = self._expect('{')[2]
+        properties = []
+        while not self._accept('}'):
+            key_start, (kind, value) = self._token[2], self._token[:2]
+            if kind == 'op' and value == '[':
+                self._advance()
+                key = self._assignment()
+                self._expect(']')
+            elif kind in ('name', 'string', 'number'):
+                self._advance()
+                key = ('constant', self._source(key_start), value)
+            else:
+                self._error('Expected a property name')
+            if kind == 'name' and not self._is(':'):
+                value = ('name', key[1], value)  # Shorthand property
+            else:
+                self._expect(':')
+                value = self._assignment()
+            properties.append((key, value))
+            if not self._is('}'):
+                self._expect(',')
+        return ('object', self._source(start), properties)
 
-class JSInterpreter:
-    __named_object_counter = 0
 
+class JSInterpreter:
     _RE_FLAGS = {
         # special knowledge: Python's re flags are bitmask values, current max 128
         # invent new bitmask values well above that for literal parsing
@@ -222,14 +750,6 @@ def __init__(self, msg, expr=None, *args, **kwargs):
                 msg = f'{msg.rstrip()} in: {truncate_string(expr, 50, 50)}'
             super().__init__(msg, *args, **kwargs)
 
-    def _named_object(self, namespace, obj):
-        self.__named_object_counter += 1
-        name = f'__yt_dlp_jsinterp_obj{self.__named_object_counter}'
-        if callable(obj) and not isinstance(obj, function_with_repr):
-            obj = function_with_repr(obj, f'F<{self.__named_object_counter}>')
-        namespace[name] = obj
-        return name
-
     @classmethod
     def _regex_flags(cls, expr):
         flags = 0
@@ -289,25 +809,6 @@ def _separate_at_paren(cls, expr, delim=None):
             raise cls.Exception(f'No terminating paren {delim}', expr)
         return separated[0][1:].strip(), separated[1].strip()
 
-    def _operator(self, op, left_val, right_expr, expr, local_vars, allow_recursion):
-        if op in ('||', '&&'):
-            if (op == '&&') ^ _js_ternary(left_val):
-                return left_val  # short circuiting
-        elif op == '??':
-            if left_val not in (None, JS_Undefined):
-                return left_val
-        elif op == '?':
-            right_expr = _js_ternary(left_val, *self._separate(right_expr, ':', 1))
-
-        right_val = self.interpret_expression(right_expr, local_vars, allow_recursion)
-        if not _OPERATORS.get(op):
-            return right_val
-
-        try:
-            return _OPERATORS[op](left_val, right_val)
-        except Exception as e:
-            raise self.Exception(f'Failed to evaluate {left_val!r} {op} {right_val!r}', expr, cause=e)
-
     def _index(self, obj, idx, allow_undefined=False):
         if idx == 'length':
             return len(obj)
@@ -318,461 +819,556 @@ def _index(self, obj, idx, allow_undefined=False):
                 return JS_Undefined
             raise self.Exception(f'Cannot get index {idx}', repr(obj), cause=e)
 
-    def _dump(self, obj, namespace):
+    def _set_index(self, obj, idx, value, expr):
+        if obj is None or obj is JS_Undefined:
+            raise self.Exception(f'Cannot set index {idx} of {_js_typeof(obj)}', expr)
         try:
-            return json.dumps(obj)
-        except TypeError:
-            return self._named_object(namespace, obj)
-
-    @Debugger.wrap_interpreter
-    def interpret_statement(self, stmt, local_vars, allow_recursion=100):
-        if allow_recursion < 0:
-            raise self.Exception('Recursion limit reached')
-        allow_recursion -= 1
-
-        should_return = False
-        sub_statements = list(self._separate(stmt, ';')) or ['']
-        expr = stmt = sub_statements.pop().strip()
-
-        for sub_stmt in sub_statements:
-            ret, should_return = self.interpret_statement(sub_stmt, local_vars, allow_recursion)
-            if should_return:
-                return ret, should_return
-
-        m = re.match(r'(?P<var>(?:var|const|let)\s)|return(?:\s+|(?=["\'])|$)|(?P<throw>throw\s+)', stmt)
-        if m:
-            expr = stmt[len(m.group(0)):].strip()
-            if m.group('throw'):
-                raise JS_Throw(self.interpret_expression(expr, local_vars, allow_recursion))
-            should_return = not m.group('var')
-        if not expr:
-            return None, should_return
-
-        if expr[0] in _QUOTES:
-            inner, outer = self._separate(expr, expr[0], 1)
-            if expr[0] == '/':
-                flags, outer = self._regex_flags(outer)
-                # We don't support regex methods yet, so no point compiling it
-                inner = f'{inner}/{flags}'
-                # Avoid https://github.com/python/cpython/issues/74534
-                # inner = re.compile(inner[1:].replace('[[', r'[\['), flags=flags)
-            else:
-                inner = json.loads(js_to_json(f'{inner}{expr[0]}', strict=True))
-            if not outer:
-                return inner, should_return
-            expr = self._named_object(local_vars, inner) + outer
-
-        if expr.startswith('new '):
-            obj = expr[4:]
-            if obj.startswith('Date('):
-                left, right = self._separate_at_paren(obj[4:])
-                date = unified_timestamp(
-                    self.interpret_expression(left, local_vars, allow_recursion), False)
-                if date is None:
-                    raise self.Exception(f'Failed to parse date {left!r}', expr)
-                expr = self._dump(int(date * 1000), local_vars) + right
-            else:
-                raise self.Exception(f'Unsupported object {obj}', expr)
-
-        if expr.startswith('void '):
-            left = self.interpret_expression(expr[5:], local_vars, allow_recursion)
-            return None, should_return
-
-        if expr.startswith('{'):
-            inner, outer = self._separate_at_paren(expr)
-            # try for object expression (Map)
-            sub_expressions = [list(self._separate(sub_expr.strip(), ':', 1)) for sub_expr in self._separate(inner)]
-            if all(len(sub_expr) == 2 for sub_expr in sub_expressions):
-                def dict_item(key, val):
-                    val = self.interpret_expression(val, local_vars, allow_recursion)
-                    if re.match(_NAME_RE, key):
-                        return key, val
-                    return self.interpret_expression(key, local_vars, allow_recursion), val
-
-                return dict(dict_item(k, v) for k, v in sub_expressions), should_return
-
-            inner, should_abort = self.interpret_statement(inner, local_vars, allow_recursion)
-            if not outer or should_abort:
-                return inner, should_abort or should_return
-            else:
-                expr = self._dump(inner, local_vars) + outer
-
-        if expr.startswith('('):
-            inner, outer = self._separate_at_paren(expr)
-            inner, should_abort = self.interpret_statement(inner, local_vars, allow_recursion)
-            if not outer or should_abort:
-                return inner, should_abort or should_return
-            else:
-                expr = self._dump(inner, local_vars) + outer
-
-        if expr.startswith('['):
-            inner, outer = self._separate_at_paren(expr)
-            name = self._named_object(local_vars, [
-                self.interpret_expression(item, local_vars, allow_recursion)
-                for item in self._separate(inner)])
-            expr = name + outer
-
-        m = re.match(r'''(?x)
-                (?P<try>try)\s*\{|
-                (?P<if>if)\s*\(|
-                (?P<switch>switch)\s*\(|
-                (?P<for>for)\s*\(
-                ''', expr)
-        md = m.groupdict() if m else {}
-        if md.get('if'):
-            cndn, expr = self._separate_at_paren(expr[m.end() - 1:])
-            if_expr, expr = self._separate_at_paren(expr.lstrip())
-            # TODO: "else if" is not handled
-            else_expr = None
-            m = re.match(r'else\s*{', expr)
-            if m:
-                else_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
-            cndn = _js_ternary(self.interpret_expression(cndn, local_vars, allow_recursion))
-            ret, should_abort = self.interpret_statement(
-                if_expr if cndn else else_expr, local_vars, allow_recursion)
-            if should_abort:
-                return ret, True
-
-        if md.get('try'):
-            try_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
-            err = None
+            if isinstance(obj, list):
+                if not isinstance(idx, (int, float)):
+                    raise self.Exception(f'List index {idx} must be integer', expr)
+                idx = int(idx)
+                if idx >= len(obj):
+                    obj.extend([JS_Undefined] * (idx - len(obj) + 1))
+            obj[idx] = value
+        except self.Exception:
+            raise
+        except Exception as e:
+            raise self.Exception(f'Cannot set index {idx}', expr, cause=e)
+        return value
+
+    def _global_object(self, name, nullish=False):
+        types = {
+            'String': str,
+            'Math': float,
+        }
+        if name in types:
+            return types[name]
+        if name not in self._objects:
+            try:
+                self._objects[name] = self.extract_object(name)
+            except self.Exception:
+                if not nullish:
+                    raise
+        return self._objects.get(name, JS_Undefined)
+
+    def _global_function(self, name):
+        if name not in self._functions:
+            self._functions[name] = self.extract_function(name)
+        return self._functions[name]
+
+    def _call_method(self, obj, member, argvals, expr, allow_recursion):
+        def assertion(cndn, msg):
+            """ assert, but without risk of getting optimized out """
+            if not cndn:
+                raise self.Exception(f'{member} {msg}', expr)
+
+        if obj == str:
+            if member == 'fromCharCode':
+                assertion(argvals, 'takes one or more arguments')
+                return ''.join(map(chr, argvals))
+            raise self.Exception(f'Unsupported String method {member}', expr)
+        elif obj == float:
+            if member == 'pow':
+                assertion(len(argvals) == 2, 'takes two arguments')
+                return argvals[0] ** argvals[1]
+            raise self.Exception(f'Unsupported Math method {member}', expr)
+
+        if member == 'split':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) == 1, 'with limit argument is not implemented')
+            return obj.split(argvals[0]) if argvals[0] else list(obj)
+        elif member == 'join':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            return argvals[0].join(obj)
+        elif member == 'reverse':
+            assertion(not argvals, 'does not take any arguments')
+            obj.reverse()
+            return obj
+        elif member == 'slice':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            return obj[argvals[0]:]
+        elif member == 'splice':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(argvals, 'takes one or more arguments')
+            index, howMany = map(int, (argvals + [len(obj)])[:2])
+            if index < 0:
+                index += len(obj)
+            add_items = argvals[2:]
+            res = []
+            for i in range(index, min(index + howMany, len(obj))):
+                res.append(obj.pop(index))
+            for i, item in enumerate(add_items):
+                obj.insert(index + i, item)
+            return res
+        elif member == 'unshift':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(argvals, 'takes one or more arguments')
+            for item in reversed(argvals):
+                obj.insert(0, item)
+            return obj
+        elif member == 'pop':
+            assertion(isinstance(obj, list), 'must be applied on a list')
+            assertion(not argvals, 'does not take any arguments')
+            if not obj:
+                return
+            return obj.pop()
+        elif member == 'push':
+            assertion(argvals, 'takes one or more arguments')
+            obj.extend(argvals)
+            return obj
+        elif member == 'forEach':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
+            f, this = (argvals + [''])[:2]
+            return [f((item, idx, obj), {'this': this}, allow_recursion) for idx, item in enumerate(obj)]
+        elif member == 'indexOf':
+            assertion(argvals, 'takes one or more arguments')
+            assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
+            idx, start = (argvals + [0])[:2]
             try:
-                ret, should_abort = self.interpret_statement(try_expr, local_vars, allow_recursion)
-                if should_abort:
-                    return ret, True
+                return obj.index(idx, start)
+            except ValueError:
+                return -1
+        elif member == 'charCodeAt':
+            assertion(isinstance(obj, str), 'must be applied on a string')
+            assertion(len(argvals) == 1, 'takes exactly one argument')
+            idx = argvals[0] if isinstance(argvals[0], int) else 0
+            if idx >= len(obj):
+                return None
+            return ord(obj[idx])
+
+        return self._call(self._index(obj, member), argvals, expr, allow_recursion)
+
+    def _call(self, func, argvals, expr, allow_recursion):
+        if not callable(func):
+            raise self.Exception(f'{_js_typeof(func)} is not a function', expr)
+        return func(argvals, allow_recursion=allow_recursion)
+
+    # The code is parsed once by _JSParser and each node is compiled into a Python closure.
+    # Expressions compile to value(scope) and statements to completion(scope), which returns
+    # None, _BREAK, _CONTINUE or a tuple of the returned value
+
+    def _compile(self, node):
+        return getattr(self, f'_compile_{node[0]}')(*node[1:])
+
+    def _compile_constant(self, expr, value):
+        return lambda scope: value
+
+    def _compile_name(self, expr, name, fallback=lambda name: JS_Undefined):
+        def get(scope):
+            for variables in scope.maps:
+                if name in variables:
+                    return variables[name]
+            return fallback(name)
+        return get
+
+    def _compile_array(self, expr, elements):
+        elements = [self._compile(element) for element in elements]
+        return lambda scope: [element(scope) for element in elements]
+
+    def _compile_object(self, expr, properties):
+        properties = [(self._compile(key), self._compile(value)) for key, value in properties]
+        return lambda scope: {key(scope): value(scope) for key, value in properties}
+
+    def _compile_function(self, expr, name, params, body, declared, functions, arrow):
+        body = self._compile_block(expr, body)
+        functions = [(node[2], self._compile(node)) for node in functions]
+
+        def make_function(scope):
+            def resf(args, kwargs={}, allow_recursion=100):
+                if allow_recursion < 0:
+                    raise self.Exception('Recursion limit reached')
+                variables = dict.fromkeys(declared, JS_Undefined)
+                variables.update(zip(params, itertools.chain(args, itertools.repeat(None))))
+                if not arrow:
+                    variables.update(kwargs)
+                local_vars = LocalNameSpace(variables, *scope.maps)
+                local_vars.allow_recursion = allow_recursion - 1
+                for function_name, make_nested_function in functions:
+                    variables[function_name] = make_nested_function(local_vars)
+
+                ret = body(local_vars)
+                if ret is None:
+                    return None
+                elif ret is _BREAK:
+                    raise JS_Break()
+                elif ret is _CONTINUE:
+                    raise JS_Continue()
+                return ret[0]
+            return function_with_repr(resf, f'F<{name}>') if name else resf
+        return make_function
+
+    def _compile_unary(self, expr, op, operand):
+        if op == 'delete':
+            if operand[0] != 'member':
+                raise self.Exception('Only properties can be deleted', expr)
+            obj, key = self._compile(operand[2]), self._compile(operand[3])
+
+            def delete(scope):
+                with contextlib.suppress(LookupError, TypeError):
+                    del obj(scope)[key(scope)]
+                return True
+            return delete
+
+        operand = self._compile(operand)
+        if op == 'typeof':
+            return lambda scope: _js_typeof(operand(scope))
+        elif op == 'void':
+            return lambda scope: operand(scope) and None
+        elif op == '!':
+            return lambda scope: not _js_ternary(operand(scope))
+
+        func = {
+            '-': lambda value: _OPERATORS['-'](0, value),
+            '+': lambda value: _OPERATORS['+'](0, value),
+            '~': lambda value: _OPERATORS['^'](value, 0xffffffff),
+        }[op]
+
+        def unary(scope):
+            value = operand(scope)
+            try:
+                return func(value)
             except Exception as e:
-                # XXX: This works for now, but makes debugging future issues very hard
-                err = e
-
-            pending = (None, False)
-            m = re.match(fr'catch\s*(?P<err>\(\s*{_NAME_RE}\s*\))?\{{', expr)
-            if m:
-                sub_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
-                if err:
-                    catch_vars = {}
-                    if m.group('err'):
-                        catch_vars[m.group('err')] = err.error if isinstance(err, JS_Throw) else err
-                    catch_vars = local_vars.new_child(catch_vars)
-                    err, pending = None, self.interpret_statement(sub_expr, catch_vars, allow_recursion)
-
-            m = re.match(r'finally\s*\{', expr)
-            if m:
-                sub_expr, expr = self._separate_at_paren(expr[m.end() - 1:])
-                ret, should_abort = self.interpret_statement(sub_expr, local_vars, allow_recursion)
-                if should_abort:
-                    return ret, True
-
-            ret, should_abort = pending
-            if should_abort:
-                return ret, True
-
-            if err:
-                raise err
-
-        elif md.get('for'):
-            constructor, remaining = self._separate_at_paren(expr[m.end() - 1:])
-            if remaining.startswith('{'):
-                body, expr = self._separate_at_paren(remaining)
-            else:
-                switch_m = re.match(r'switch\s*\(', remaining)  # FIXME
-                if switch_m:
-                    switch_val, remaining = self._separate_at_paren(remaining[switch_m.end() - 1:])
-                    body, expr = self._separate_at_paren(remaining, '}')
-                    body = 'switch(%s){%s}' % (switch_val, body)
-                else:
-                    body, expr = remaining, ''
-            start, cndn, increment = self._separate(constructor, ';')
-            self.interpret_expression(start, local_vars, allow_recursion)
-            while True:
-                if not _js_ternary(self.interpret_expression(cndn, local_vars, allow_recursion)):
-                    break
-                try:
-                    ret, should_abort = self.interpret_statement(body, local_vars, allow_recursion)
-                    if should_abort:
-                        return ret, True
-                except JS_Break:
-                    break
-                except JS_Continue:
-                    pass
-                self.interpret_expression(increment, local_vars, allow_recursion)
-
-        elif md.get('switch'):
-            switch_val, remaining = self._separate_at_paren(expr[m.end() - 1:])
-            switch_val = self.interpret_expression(switch_val, local_vars, allow_recursion)
-            body, expr = self._separate_at_paren(remaining, '}')
-            items = body.replace('default:', 'case default:').split('case ')[1:]
-            for default in (False, True):
-                matched = False
-                for item in items:
-                    case, stmt = (i.strip() for i in self._separate(item, ':', 1))
-                    if default:
-                        matched = matched or case == 'default'
-                    elif not matched:
-                        matched = (case != 'default'
-                                   and switch_val == self.interpret_expression(case, local_vars, allow_recursion))
-                    if not matched:
-                        continue
-                    try:
-                        ret, should_abort = self.interpret_statement(stmt, local_vars, allow_recursion)
-                        if should_abort:
-                            return ret
-                    except JS_Break:
-                        break
-                if matched:
-                    break
+                raise self.Exception(f'Failed to evaluate {op}{value!r}', expr, cause=e)
+        return unary
+
+    def _compile_reference(self, expr, target):
+        """@returns get(scope), set(scope, value)"""
+        if target[0] == 'name':
+            name = target[2]
+
+            def set_name(scope, value):
+                scope[name] = value
+                return value
+            return self._compile(target), set_name
+
+        obj, key = self._compile(target[2]), self._compile(target[3])
+
+        def get_member(scope):
+            return self._index(obj(scope), key(scope))
+
+        def set_member(scope, value):
+            return self._set_index(obj(scope), key(scope), value, expr)
+
+        # The object and the key are evaluated only once when updating a member
+        def get_reference(scope):
+            obj_val, key_val = obj(scope), key(scope)
+            return (lambda _: self._index(obj_val, key_val),
+                    lambda _, value: self._set_index(obj_val, key_val, value, expr))
+        get_member.get_reference = get_reference
+        return get_member, set_member
+
+    def _references(self, scope, get, set_):
+        get_reference = getattr(get, 'get_reference', None)
+        return get_reference(scope) if get_reference else (get, set_)
+
+    def _compile_update(self, expr, op, prefix, target):
+        get, set_ = self._compile_reference(expr, target)
+        func = _OPERATORS[op[0]]
+
+        def update(scope):
+            get_val, set_val = self._references(scope, get, set_)
+            old = get_val(scope)
+            try:
+                new = func(old, 1)
+            except Exception as e:
+                raise self.Exception(f'Failed to evaluate {old!r} {op}', expr, cause=e)
+            set_val(scope, new)
+            return new if prefix else old
+        return update
+
+    def _compile_operation(self, expr, op, left, right):
+        """@returns value(scope, left_val) for the operation "left_val op right" """
+        right = self._compile(right)
+        if op in ('||', '&&'):
+            return lambda scope, left_val: (
+                left_val if (op == '&&') ^ _js_ternary(left_val) else right(scope))
+        elif op == '??':
+            return lambda scope, left_val: (
+                left_val if left_val is not None and left_val is not JS_Undefined else right(scope))
 
-        if md:
-            ret, should_abort = self.interpret_statement(expr, local_vars, allow_recursion)
-            return ret, should_abort or should_return
-
-        # Comma separated statements
-        sub_expressions = list(self._separate(expr))
-        if len(sub_expressions) > 1:
-            for sub_expr in sub_expressions:
-                ret, should_abort = self.interpret_statement(sub_expr, local_vars, allow_recursion)
-                if should_abort:
-                    return ret, True
-            return ret, False
-
-        for m in re.finditer(rf'''(?x)
-                (?P<pre_sign>\+\+|--)(?P<var1>{_NAME_RE})|
-                (?P<var2>{_NAME_RE})(?P<post_sign>\+\+|--)''', expr):
-            var = m.group('var1') or m.group('var2')
-            start, end = m.span()
-            sign = m.group('pre_sign') or m.group('post_sign')
-            ret = local_vars[var]
-            local_vars[var] += 1 if sign[0] == '+' else -1
-            if m.group('pre_sign'):
-                ret = local_vars[var]
-            expr = expr[:start] + self._dump(ret, local_vars) + expr[end:]
+        func = _OPERATORS[op]
 
-        if not expr:
-            return None, should_return
-
-        m = re.match(fr'''(?x)
-            (?P<assign>
-                (?P<out>{_NAME_RE})(?:\[(?P<index>[^\]]+?)\])?\s*
-                (?P<op>{"|".join(map(re.escape, set(_OPERATORS) - _COMP_OPERATORS))})?
-                =(?!=)(?P<expr>.*)$
-            )|(?P<return>
-                (?!if|return|true|false|null|undefined|NaN)(?P<name>{_NAME_RE})$
-            )|(?P<indexing>
-                (?P<in>{_NAME_RE})\[(?P<idx>.+)\]$
-            )|(?P<attribute>
-                (?P<var>{_NAME_RE})(?:(?P<nullish>\?)?\.(?P<member>[^(]+)|\[(?P<member2>[^\]]+)\])\s*
-            )|(?P<function>
-                (?P<fname>{_NAME_RE})\((?P<args>.*)\)$
-            )''', expr)
-        if m and m.group('assign'):
-            left_val = local_vars.get(m.group('out'))
-
-            if not m.group('index'):
-                local_vars[m.group('out')] = self._operator(
-                    m.group('op'), left_val, m.group('expr'), expr, local_vars, allow_recursion)
-                return local_vars[m.group('out')], should_return
-            elif left_val in (None, JS_Undefined):
-                raise self.Exception(f'Cannot index undefined variable {m.group("out")}', expr)
-
-            idx = self.interpret_expression(m.group('index'), local_vars, allow_recursion)
-            if not isinstance(idx, (int, float)):
-                raise self.Exception(f'List index {idx} must be integer', expr)
-            idx = int(idx)
-            left_val[idx] = self._operator(
-                m.group('op'), self._index(left_val, idx), m.group('expr'), expr, local_vars, allow_recursion)
-            return left_val[idx], should_return
-
-        elif expr.isdigit():
-            return int(expr), should_return
-
-        elif expr == 'break':
-            raise JS_Break()
-        elif expr == 'continue':
-            raise JS_Continue()
-        elif expr == 'undefined':
-            return JS_Undefined, should_return
-        elif expr == 'NaN':
-            return float('NaN'), should_return
-
-        elif m and m.group('return'):
-            return local_vars.get(m.group('name'), JS_Undefined), should_return
-
-        with contextlib.suppress(ValueError):
-            return json.loads(js_to_json(expr, strict=True)), should_return
-
-        if m and m.group('indexing'):
-            val = local_vars[m.group('in')]
-            idx = self.interpret_expression(m.group('idx'), local_vars, allow_recursion)
-            return self._index(val, idx), should_return
-
-        for op in _OPERATORS:
-            separated = list(self._separate(expr, op))
-            right_expr = separated.pop()
-            while True:
-                if op in '?<>*-' and len(separated) > 1 and not separated[-1].strip():
-                    separated.pop()
-                elif not (separated and op == '?' and right_expr.startswith('.')):
-                    break
-                right_expr = f'{op}{right_expr}'
-                if op != '-':
-                    right_expr = f'{separated.pop()}{op}{right_expr}'
-            if not separated:
-                continue
-            left_val = self.interpret_expression(op.join(separated), local_vars, allow_recursion)
-            return self._operator(op, left_val, right_expr, expr, local_vars, allow_recursion), should_return
-
-        if m and m.group('attribute'):
-            variable, member, nullish = m.group('var', 'member', 'nullish')
-            if not member:
-                member = self.interpret_expression(m.group('member2'), local_vars, allow_recursion)
-            arg_str = expr[m.end():]
-            if arg_str.startswith('('):
-                arg_str, remaining = self._separate_at_paren(arg_str)
-            else:
-                arg_str, remaining = None, arg_str
+        def operation(scope, left_val):
+            right_val = right(scope)
+            try:
+                return func(left_val, right_val)
+            except Exception as e:
+                raise self.Exception(f'Failed to evaluate {left_val!r} {op} {right_val!r}', expr, cause=e)
+        return operation
+
+    def _compile_binary(self, expr, left, rest):
+        left = self._compile(left)
+        operations = [self._compile_operation(expr, op, None, right) for op, right in rest]
+        if len(operations) == 1:
+            operation = operations[0]
+            return lambda scope: operation(scope, left(scope))
+
+        def binary(scope):
+            value = left(scope)
+            for operation in operations:
+                value = operation(scope, value)
+            return value
+        return binary
+
+    def _compile_conditional(self, expr, test, consequent, alternate):
+        test, consequent, alternate = map(self._compile, (test, consequent, alternate))
+        return lambda scope: consequent(scope) if _js_ternary(test(scope)) else alternate(scope)
+
+    def _compile_assign(self, expr, op, target, value):
+        get, set_ = self._compile_reference(expr, target)
+        if not op:
+            value = self._compile(value)
+            return lambda scope: set_(scope, value(scope))
+
+        operation = self._compile_operation(expr, op, None, value)
+
+        def assign(scope):
+            get_val, set_val = self._references(scope, get, set_)
+            return set_val(scope, operation(scope, get_val(scope)))
+        return assign
+
+    def _compile_sequence(self, expr, exprs):
+        *exprs, last = map(self._compile, exprs)
+
+        def sequence(scope):
+            for sub_expr in exprs:
+                sub_expr(scope)
+            return last(scope)
+        return sequence
+
+    def _compile_object_reference(self, node, nullish=False):
+        """Like _compile, but names that are not variables are looked up in the code"""
+        if node[0] == 'name':
+            return self._compile_name(*node[1:], fallback=lambda name: self._global_object(name, nullish))
+        return self._compile(node)
+
+    def _compile_member(self, expr, obj, key, optional):
+        obj, key = self._compile_object_reference(obj, optional), self._compile(key)
+
+        def member(scope):
+            obj_val = obj(scope)
+            if optional and obj_val is JS_Undefined:
+                return JS_Undefined
+            return self._index(obj_val, key(scope), optional)
+        return member
 
-            def assertion(cndn, msg):
-                """ assert, but without risk of getting optimized out """
-                if not cndn:
-                    raise self.Exception(f'{member} {msg}', expr)
+    def _compile_call(self, expr, callee, args, optional):
+        args = [self._compile(arg) for arg in args]
 
-            def eval_method():
-                if (variable, member) == ('console', 'debug'):
+        if callee[0] == 'member':
+            if (callee[2][:3:2], callee[3][:3:2]) == (('name', 'console'), ('constant', 'debug')):
+                def debug(scope):
                     if Debugger.ENABLED:
-                        Debugger.write(self.interpret_expression(f'[{arg_str}]', local_vars, allow_recursion))
-                    return
+                        Debugger.write([arg(scope) for arg in args])
+                return debug
 
-                types = {
-                    'String': str,
-                    'Math': float,
-                }
-                obj = local_vars.get(variable, types.get(variable, NO_DEFAULT))
-                if obj is NO_DEFAULT:
-                    if variable not in self._objects:
-                        try:
-                            self._objects[variable] = self.extract_object(variable)
-                        except self.Exception:
-                            if not nullish:
-                                raise
-                    obj = self._objects.get(variable, JS_Undefined)
-
-                if nullish and obj is JS_Undefined:
+            nullish = callee[4]
+            obj, key = self._compile_object_reference(callee[2], nullish), self._compile(callee[3])
+
+            def call_method(scope):
+                obj_val = obj(scope)
+                if nullish and obj_val is JS_Undefined:
                     return JS_Undefined
+                member = key(scope)
+                return self._call_method(
+                    obj_val, member, [arg(scope) for arg in args], expr, scope.allow_recursion)
+            return call_method
+
+        if callee[0] == 'name':
+            func = self._compile_name(*callee[1:], fallback=self._global_function)
+        else:
+            func = self._compile(callee)
+
+        def call(scope):
+            func_val = func(scope)
+            if optional and func_val in (None, JS_Undefined):
+                return JS_Undefined
+            return self._call(func_val, [arg(scope) for arg in args], expr, scope.allow_recursion)
+        return call
+
+    def _compile_new(self, expr, callee, args):
+        if callee[0] != 'name' or callee[2] != 'Date' or len(args) != 1:
+            raise self.Exception(f'Unsupported object {callee[1]}', expr)
+        arg = self._compile(args[0])
+
+        def new_date(scope):
+            date = unified_timestamp(arg(scope), False)
+            if date is None:
+                raise self.Exception(f'Failed to parse date {args[0][1]!r}', expr)
+            return int(date * 1000)
+        return new_date
+
+    # Statements
+
+    def _compile_empty(self, stmt):
+        return None
+
+    def _compile_block(self, stmt, body):
+        body = [compiled for compiled in map(self._compile, body) if compiled]
+        if len(body) == 1:
+            return body[0]
+
+        def block(scope):
+            for sub_stmt in body:
+                ret = sub_stmt(scope)
+                if ret is not None:
+                    return ret
+        return block
+
+    def _compile_expression(self, stmt, expr):
+        expr = self._compile(expr)
+
+        def expression(scope):
+            expr(scope)
+        return expression
+
+    def _compile_declaration(self, stmt, kind, declarations):
+        # var declarations without a value are no-ops, since the names are declared when calling the function
+        declarations = [(name, self._compile(value) if value else self._compile_constant(None, JS_Undefined))
+                        for name, value in declarations if value or kind != 'var']
+        if not declarations:
+            return None
+
+        def declaration(scope):
+            for name, value in declarations:
+                scope[name] = value(scope)
+        return declaration
+
+    def _compile_return(self, stmt, value):
+        value = self._compile(value) if value else self._compile_constant(None, None)
+        return lambda scope: (value(scope),)
+
+    def _compile_throw(self, stmt, value):
+        value = self._compile(value)
+
+        def throw(scope):
+            raise JS_Throw(value(scope))
+        return throw
+
+    def _compile_break(self, stmt):
+        return lambda scope: _BREAK
+
+    def _compile_continue(self, stmt):
+        return lambda scope: _CONTINUE
+
+    def _compile_if(self, stmt, test, consequent, alternate):
+        test = self._compile(test)
+        consequent = self._compile(consequent) or (lambda scope: None)
+        alternate = alternate and self._compile(alternate) or (lambda scope: None)
+        return lambda scope: consequent(scope) if _js_ternary(test(scope)) else alternate(scope)
+
+    def _compile_loop(self, init, test, update, body, test_first=True):
+        init, test, update, body = (node and self._compile(node) for node in (init, test, update, body))
+
+        def loop(scope):
+            if init:
+                init(scope)
+            if not test_first or not test or _js_ternary(test(scope)):
+                while True:
+                    ret = body and body(scope)
+                    if ret is _BREAK:
+                        break
+                    elif ret is not None and ret is not _CONTINUE:
+                        return ret
+                    if update:
+                        update(scope)
+                    if test and not _js_ternary(test(scope)):
+                        break
+        return loop
+
+    def _compile_for(self, stmt, init, test, update, body):
+        return self._compile_loop(init, test, update, body)
+
+    def _compile_while(self, stmt, test, body):
+        return self._compile_loop(None, test, None, body)
+
+    def _compile_do(self, stmt, body, test):
+        return self._compile_loop(None, test, None, body, test_first=False)
+
+    def _compile_for_in(self, stmt, iteration, target, iterable, body):
+        iterable, body = self._compile(iterable), self._compile(body)
 
-                # Member access
-                if arg_str is None:
-                    return self._index(obj, member, nullish)
-
-                # Function call
-                argvals = [
-                    self.interpret_expression(v, local_vars, allow_recursion)
-                    for v in self._separate(arg_str)]
-
-                if obj == str:
-                    if member == 'fromCharCode':
-                        assertion(argvals, 'takes one or more arguments')
-                        return ''.join(map(chr, argvals))
-                    raise self.Exception(f'Unsupported String method {member}', expr)
-                elif obj == float:
-                    if member == 'pow':
-                        assertion(len(argvals) == 2, 'takes two arguments')
-                        return argvals[0] ** argvals[1]
-                    raise self.Exception(f'Unsupported Math method {member}', expr)
-
-                if member == 'split':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) == 1, 'with limit argument is not implemented')
-                    return obj.split(argvals[0]) if argvals[0] else list(obj)
-                elif member == 'join':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    return argvals[0].join(obj)
-                elif member == 'reverse':
-                    assertion(not argvals, 'does not take any arguments')
-                    obj.reverse()
-                    return obj
-                elif member == 'slice':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    return obj[argvals[0]:]
-                elif member == 'splice':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(argvals, 'takes one or more arguments')
-                    index, howMany = map(int, (argvals + [len(obj)])[:2])
-                    if index < 0:
-                        index += len(obj)
-                    add_items = argvals[2:]
-                    res = []
-                    for i in range(index, min(index + howMany, len(obj))):
-                        res.append(obj.pop(index))
-                    for i, item in enumerate(add_items):
-                        obj.insert(index + i, item)
-                    return res
-                elif member == 'unshift':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(argvals, 'takes one or more arguments')
-                    for item in reversed(argvals):
-                        obj.insert(0, item)
-                    return obj
-                elif member == 'pop':
-                    assertion(isinstance(obj, list), 'must be applied on a list')
-                    assertion(not argvals, 'does not take any arguments')
-                    if not obj:
-                        return
-                    return obj.pop()
-                elif member == 'push':
-                    assertion(argvals, 'takes one or more arguments')
-                    obj.extend(argvals)
-                    return obj
-                elif member == 'forEach':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
-                    f, this = (argvals + [''])[:2]
-                    return [f((item, idx, obj), {'this': this}, allow_recursion) for idx, item in enumerate(obj)]
-                elif member == 'indexOf':
-                    assertion(argvals, 'takes one or more arguments')
-                    assertion(len(argvals) <= 2, 'takes at-most 2 arguments')
-                    idx, start = (argvals + [0])[:2]
-                    try:
-                        return obj.index(idx, start)
-                    except ValueError:
-                        return -1
-                elif member == 'charCodeAt':
-                    assertion(isinstance(obj, str), 'must be applied on a string')
-                    assertion(len(argvals) == 1, 'takes exactly one argument')
-                    idx = argvals[0] if isinstance(argvals[0], int) else 0
-                    if idx >= len(obj):
-                        return None
-                    return ord(obj[idx])
-
-                idx = int(member) if isinstance(obj, list) else member
-                return obj[idx](argvals, allow_recursion=allow_recursion)
-
-            if remaining:
-                ret, should_abort = self.interpret_statement(
-                    self._named_object(local_vars, eval_method()) + remaining,
-                    local_vars, allow_recursion)
-                return ret, should_return or should_abort
+        def for_in(scope):
+            obj = iterable(scope)
+            if iteration == 'of':
+                items = list(obj)
+            elif isinstance(obj, (list, str)):
+                items = list(map(str, range(len(obj))))
             else:
-                return eval_method(), should_return
-
-        elif m and m.group('function'):
-            fname = m.group('fname')
-            argvals = [self.interpret_expression(v, local_vars, allow_recursion)
-                       for v in self._separate(m.group('args'))]
-            if fname in local_vars:
-                return local_vars[fname](argvals, allow_recursion=allow_recursion), should_return
-            elif fname not in self._functions:
-                self._functions[fname] = self.extract_function(fname)
-            return self._functions[fname](argvals, allow_recursion=allow_recursion), should_return
-
-        raise self.Exception(
-            f'Unsupported JS expression {truncate_string(expr, 20, 20) if expr != stmt else ""}', stmt)
-
-    def interpret_expression(self, expr, local_vars, allow_recursion):
-        ret, should_return = self.interpret_statement(expr, local_vars, allow_recursion)
-        if should_return:
-            raise self.Exception('Cannot return from an expression', expr)
-        return ret
+                items = list(obj) if isinstance(obj, dict) else []
+            for item in items:
+                scope[target] = item
+                ret = body and body(scope)
+                if ret is _BREAK:
+                    break
+                elif ret is not None and ret is not _CONTINUE:
+                    return ret
+        return for_in
+
+    def _compile_switch(self, stmt, discriminant, cases):
+        discriminant = self._compile(discriminant)
+        cases = [(test and self._compile(test), self._compile_block(stmt, body) or (lambda scope: None))
+                 for test, body in cases]
+        default = next((i for i, (test, _) in enumerate(cases) if test is None), None)
+
+        def switch(scope):
+            switch_val = discriminant(scope)
+            start = next((i for i, (test, _) in enumerate(cases) if test and test(scope) == switch_val), default)
+            if start is None:
+                return
+            for _, body in cases[start:]:
+                ret = body(scope)
+                if ret is _BREAK:
+                    return
+                elif ret is not None:
+                    return ret
+        return switch
+
+    def _compile_try(self, stmt, block, param, handler, finalizer):
+        block, handler, finalizer = (node and self._compile(node) for node in (block, handler, finalizer))
+        block = block or (lambda scope: None)
+
+        def run_handler(scope, err):
+            if param:
+                allow_recursion = scope.allow_recursion
+                scope = LocalNameSpace({param: err.error if isinstance(err, JS_Throw) else err}, *scope.maps)
+                scope.allow_recursion = allow_recursion
+            return handler(scope)
+
+        def try_(scope):
+            try:
+                ret = block(scope)
+            except Exception as e:
+                # XXX: This works for now, but makes debugging future issues very hard
+                if handler is None:
+                    final_ret = finalizer(scope)
+                    if final_ret is not None:
+                        return final_ret
+                    raise
+                try:
+                    ret = run_handler(scope, e)
+                except Exception:
+                    if not finalizer:
+                        raise
+                    final_ret = finalizer(scope)
+                    if final_ret is not None:
+                        return final_ret
+                    raise
+            if finalizer:
+                final_ret = finalizer(scope)
+                if final_ret is not None:
+                    return final_ret
+            return ret
+        return try_
+
+    def interpret_expression(self, expr, local_vars, allow_recursion=100):
+        if not isinstance(local_vars, LocalNameSpace):
+            local_vars = LocalNameSpace(local_vars)
+        local_vars.allow_recursion = allow_recursion
+        return self._compile(_JSParser(expr).parse_expression())(local_vars)
 
     def extract_object(self, objname):
         _FUNC_NAME_RE = r'''(?:[a-zA-Z$0-9]+|"[a-zA-Z$0-9]+"|'[a-zA-Z$0-9]+')'''
@@ -814,8 +1410,16 @@ def extract_function_code(self, funcname):
             self.code)
         if func_m is None:
             raise self.Exception(f'Could not find JS function "{funcname}"')
-        code, _ = self._separate_at_paren(func_m.group('code'))
-        return [x.strip() for x in func_m.group('args').split(',')], code
+        code, depth = func_m.group('code'), 0
+        for kind, value, _, end, _ in _tokenize(code):
+            if kind == 'eof':
+                raise self.Exception('No terminating paren }', code)
+            elif kind != 'op':
+                continue
+            depth += (value in _MATCHING_PARENS) - (value in _MATCHING_PARENS.values())
+            if not depth:
+                break
+        return [x.strip() for x in func_m.group('args').split(',')], code[1:end - 1].strip()
 
     def extract_function(self, funcname):
         return function_with_repr(
@@ -823,31 +1427,13 @@ def extract_function(self, funcname):
             f'F<{funcname}>')
 
     def extract_function_from_code(self, argnames, code, *global_stack):
-        local_vars = {}
-        while True:
-            mobj = re.search(r'function\((?P<args>[^)]*)\)\s*{', code)
-            if mobj is None:
-                break
-            start, body_start = mobj.span()
-            body, remaining = self._separate_at_paren(code[body_start - 1:])
-            name = self._named_object(local_vars, self.extract_function_from_code(
-                [x.strip() for x in mobj.group('args').split(',')],
-                body, local_vars, *global_stack))
-            code = code[:start] + name + remaining
-        return self.build_function(argnames, code, local_vars, *global_stack)
+        return self.build_function(argnames, code, *global_stack)
 
     def call_function(self, funcname, *args):
         return self.extract_function(funcname)(args)
 
     def build_function(self, argnames, code, *global_stack):
-        global_stack = list(global_stack) or [{}]
-        argnames = tuple(argnames)
-
-        def resf(args, kwargs={}, allow_recursion=100):
-            global_stack[0].update(itertools.zip_longest(argnames, args, fillvalue=None))
-            global_stack[0].update(kwargs)
-            var_stack = LocalNameSpace(*global_stack)
-            ret, should_abort = self.interpret_statement(code.replace('\n', ' '), var_stack, allow_recursion - 1)
-            if should_abort:
-                return ret
-        return resf
+        """Compile the code into a function, which can then be called any number of times"""
+        argnames = tuple(filter(None, (name.strip() for name in argnames)))
+        make_function = self._compile(_JSParser(code).parse_function(argnames))
+        return make_function(LocalNameSpace(*global_stack))
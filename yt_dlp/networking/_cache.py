@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import contextlib
+import email.utils
+import io
+import json
+import os
+import threading
+import time
+
+from .common import Request, Response
+from .exceptions import HTTPError
+from ..dependencies import sqlite3
+from ..utils import int_or_none
+
+
+class HTTPCache:
+    """
+    Persistent cache of HTTP responses for GET requests
+
+    A response is fresh for the max-age given in Cache-Control (or until Expires),
+    unless a ttl is given in which case it overrides the headers.
+    Requests with cookies or credentials are not cached, nor are private responses.
+    A response is only reused for requests with the same values of the headers named in its Vary.
+    Stale responses are revalidated with If-None-Match/If-Modified-Since when possible.
+    The least recently used responses are evicted when the total size exceeds max_size bytes.
+
+    @param path: Path of the SQLite database.
+    @param logger: Logger instance.
+    @param max_size: Maximum total size of the cached bodies.
+    """
+
+    # Fraction of the time since Last-Modified that a response without explicit expiry is fresh for (RFC 9111 4.2.2)
+    _HEURISTIC_FRACTION = 0.1
+
+    def __init__(self, path, logger, max_size=256 * 1024 * 1024):
+        self.path = path
+        self.logger = logger
+        self.max_size = max_size
+        self.hits = self.revalidations = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    @staticmethod
+    def available():
+        return sqlite3 is not None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            with contextlib.suppress(sqlite3.Error):
+                self._db.execute('PRAGMA journal_mode=WAL')
+            # key is the URL, followed by the context of the request if any
+            self._db.execute('''CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, response_url TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL,
+                vary TEXT NOT NULL, body BLOB NOT NULL, expires REAL NOT NULL, size INTEGER NOT NULL,
+                accessed REAL NOT NULL)''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        return self._db
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _lookup(self, key):
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT response_url, status, headers, vary, body, expires FROM responses WHERE key = ?',
+                (key,)).fetchone()
+        if row:
+            return {
+                'url': row[0], 'status': row[1], 'headers': json.loads(row[2]), 'vary': json.loads(row[3]),
+                'body': row[4], 'expires': row[5],
+            }
+
+    def _store(self, key, entry):
+        with self._lock:
+            db = self._connect()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                    key, entry['url'], entry['status'], json.dumps(entry['headers']), json.dumps(entry['vary']),
+                    entry['body'], entry['expires'], len(entry['body']), time.time()))
+                excess = db.execute('SELECT TOTAL(size) FROM responses').fetchone()[0] - self.max_size
+                if excess > 0:
+                    evicted, size = [], 0
+                    for evicted_key, entry_size in db.execute('SELECT key, size FROM responses ORDER BY accessed'):
+                        evicted.append((evicted_key,))
+                        size += entry_size
+                        if size >= excess:
+                            break
+                    db.executemany('DELETE FROM responses WHERE key = ?', evicted)
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def _touch(self, key):
+        with self._lock:
+            self._connect().execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+
+    @staticmethod
+    def _get_header(headers, name):
+        return next((value for key, value in headers if key.lower() == name.lower()), None)
+
+    @classmethod
+    def _cache_control(cls, headers):
+        directives = {}
+        for directive in (cls._get_header(headers, 'Cache-Control') or '').split(','):
+            key, _, value = directive.strip().partition('=')
+            if key:
+                directives[key.lower()] = value.strip('"')
+        return directives
+
+    @staticmethod
+    def _parse_date(value):
+        with contextlib.suppress(TypeError, ValueError):
+            return email.utils.parsedate_to_datetime(value).timestamp()
+
+    def _expiry(self, headers, ttl, now):
+        """Return the time until which the response is fresh, or None if it must not be stored"""
+        cache_control = self._cache_control(headers)
+        # The cachedir may be shared by different accounts
+        if 'no-store' in cache_control or 'private' in cache_control or self._get_header(headers, 'Vary') == '*':
+            return None
+        if not isinstance(ttl, bool) and isinstance(ttl, (int, float)):
+            return now + ttl
+        if 'no-cache' in cache_control:
+            return now
+        max_age = int_or_none(cache_control.get('max-age'))
+        if max_age is not None:
+            return now + max_age - (int_or_none(self._get_header(headers, 'Age')) or 0)
+        date = self._parse_date(self._get_header(headers, 'Date')) or now
+        expires = self._parse_date(self._get_header(headers, 'Expires'))
+        if expires is not None:
+            return now + expires - date
+        last_modified = self._parse_date(self._get_header(headers, 'Last-Modified'))
+        if last_modified is not None:
+            return now + max(date - last_modified, 0) * self._HEURISTIC_FRACTION
+        return now
+
+    def _read_entry(self, response):
+        body = response.read()
+        response.close()
+        # The body is stored decoded
+        headers = [(key, value) for key, value in response.headers.items()
+                   if key.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')]
+        headers.append(('Content-Length', str(len(body))))
+        return {'url': response.url, 'status': response.status, 'headers': headers, 'body': body}
+
+    @staticmethod
+    def _make_response(entry):
+        response = Response(io.BytesIO(entry['body']), entry['url'], {}, status=entry['status'])
+        for name, value in entry['headers']:
+            response.headers.add_header(name, value)
+        return response
+
+    @staticmethod
+    def is_cacheable(request, cookiejar=None):
+        """
+        Whether the response to the request can be cached
+
+        @param cookiejar: The cookiejar the request will be sent with. Requests with cookies are not cached,
+                          since the response may depend on the account
+        """
+        return (request.method == 'GET' and request.data is None
+                and not any(header in request.headers for header in ('Range', 'Authorization', 'Cookie'))
+                and not (cookiejar and cookiejar.get_cookie_header(request.url)))
+
+    @classmethod
+    def _vary(cls, response_headers, request_headers):
+        """The values of the request headers named in the Vary of the response"""
+        names = {name.strip().lower() for name in (cls._get_header(response_headers, 'Vary') or '').split(',')}
+        return {name: request_headers.get(name) for name in sorted(names) if name}
+
+    def send(self, request: Request, send, ttl=None, *, headers=None, context=None) -> Response:
+        """
+        Return the cached response to the request if it is fresh, else send the request using send
+
+        @param request: The GET request. See is_cacheable.
+        @param send: Function that sends a request and returns its response.
+        @param ttl: Number of seconds the response is fresh for, overriding the response headers.
+        @param headers: All the headers the request is sent with, to match the Vary of the response.
+                        Default is the headers of the request.
+        @param context: JSON-serializable values that the response depends on besides the URL and headers,
+                        e.g. the proxy. Responses are only reused for the same context.
+        """
+        headers = request.headers if headers is None else headers
+        key = request.url if not context else f'{request.url} {json.dumps(context, sort_keys=True)}'
+        try:
+            entry = self._lookup(key)
+        except sqlite3.Error as e:
+            self.logger.warning(f'Unable to read the HTTP cache: {e}')
+            return send(request)
+        if entry and entry['vary'] != self._vary(entry['headers'], headers):
+            entry = None
+
+        now = time.time()
+        if entry and entry['expires'] > now:
+            self.hits += 1
+            self.logger.debug(f'Using cached response for {request.url}')
+            with contextlib.suppress(sqlite3.Error):
+                self._touch(key)
+            return self._make_response(entry)
+
+        etag = entry and self._get_header(entry['headers'], 'ETag')
+        last_modified = entry and self._get_header(entry['headers'], 'Last-Modified')
+        if etag or last_modified:
+            request = request.copy()
+            if etag:
+                request.headers['If-None-Match'] = etag
+            if last_modified:
+                request.headers['If-Modified-Since'] = last_modified
+
+        try:
+            response = send(request)
+        except HTTPError as e:
+            if e.status != 304 or not entry:
+                raise
+            response = e.response
+
+        if response.status == 304 and entry:
+            response.close()
+            self.revalidations += 1
+            self.logger.debug(f'Revalidated cached response for {request.url}')
+            # The 304 response carries the updated caching headers
+            updated = {key.lower() for key, _ in response.headers.items()} - {'content-length'}
+            entry['headers'] = [
+                *((key, value) for key, value in entry['headers'] if key.lower() not in updated),
+                *((key, value) for key, value in response.headers.items() if key.lower() in updated)]
+        elif response.status == 200:
+            self.misses += 1
+            entry = self._read_entry(response)
+        else:
+            return response
+
+        entry['vary'] = self._vary(entry['headers'], headers)
+        entry['expires'] = self._expiry(entry['headers'], ttl, now)
+        if entry['expires'] is not None and (
+                entry['expires'] > now or self._get_header(entry['headers'], 'ETag')
+                or self._get_header(entry['headers'], 'Last-Modified')):
+            try:
+                self._store(key, entry)
+            except sqlite3.Error as e:
+                self.logger.warning(f'Unable to write to the HTTP cache: {e}')
+        return self._make_response(entry)
@@ -41,42 +41,65 @@ class CurlCFFIResponseReader(io.IOBase):
     def __init__(self, response: curl_cffi.requests.Response):
         self._response = response
         self._iterator = response.iter_content()
-        self._buffer = b''
+        self._buffer = bytearray()
         self.bytes_read = 0
 
     def readable(self):
         return True
 
+    def _fill_buffer(self, size):
+        while self._iterator and (size is None or len(self._buffer) < size):
+            chunk = next(self._iterator, None)
+            if chunk is None:
+                self._iterator = None
+                break
+            self._buffer += chunk
+            self.bytes_read += len(chunk)
+
+    def _consume_buffer(self, size):
+        # Deleting from the start of a bytearray does not copy the rest of it
+        del self._buffer[:size]
+        # "free" the curl instance if the response is fully read.
+        # curl_cffi doesn't do this automatically and only allows one open response per thread
+        if not self._iterator and not self._buffer:
+            self.close()
+
     def read(self, size=None):
         exception_raised = True
         try:
-            while self._iterator and (size is None or len(self._buffer) < size):
-                chunk = next(self._iterator, None)
-                if chunk is None:
-                    self._iterator = None
-                    break
-                self._buffer += chunk
-                self.bytes_read += len(chunk)
-
+            self._fill_buffer(size)
             if size is None:
                 size = len(self._buffer)
-            data = self._buffer[:size]
-            self._buffer = self._buffer[size:]
-
-            # "free" the curl instance if the response is fully read.
-            # curl_cffi doesn't do this automatically and only allows one open response per thread
-            if not self._iterator and not self._buffer:
-                self.close()
+            with memoryview(self._buffer) as buffer:
+                data = bytes(buffer[:size])
+            self._consume_buffer(size)
             exception_raised = False
             return data
         finally:
             if exception_raised:
                 self.close()
 
+    def readinto(self, b):
+        exception_raised = True
+        try:
+            with memoryview(b) as view:
+                # Like a raw stream, only wait for data when none is available
+                if not self._buffer:
+                    self._fill_buffer(1)
+                size = min(len(view), len(self._buffer))
+                with memoryview(self._buffer) as buffer:
+                    view[:size] = buffer[:size]
+            self._consume_buffer(size)
+            exception_raised = False
+            return size
+        finally:
+            if exception_raised:
+                self.close()
+
     def close(self):
         if not self.closed:
             self._response.close()
-            self._buffer = b''
+            self._buffer = bytearray()
         super().close()
 
 
@@ -90,17 +113,26 @@ def __init__(self, response: curl_cffi.requests.Response):
             url=response.url,
             status=response.status_code)
 
+    def _handle_read_error(self, e):
+        if e.code == CurlECode.PARTIAL_FILE:
+            content_length = int_or_none(e.response.headers.get('Content-Length'))
+            raise IncompleteRead(
+                partial=self.fp.bytes_read,
+                expected=content_length - self.fp.bytes_read if content_length is not None else None,
+                cause=e) from e
+        raise TransportError(cause=e) from e
+
     def read(self, amt=None):
         try:
             return self.fp.read(amt)
         except curl_cffi.requests.errors.RequestsError as e:
-            if e.code == CurlECode.PARTIAL_FILE:
-                content_length = int_or_none(e.response.headers.get('Content-Length'))
-                raise IncompleteRead(
-                    partial=self.fp.bytes_read,
-                    expected=content_length - self.fp.bytes_read if content_length is not None else None,
-                    cause=e) from e
-            raise TransportError(cause=e) from e
+            self._handle_read_error(e)
+
+    def readinto(self, b):
+        try:
+            return self.fp.readinto(b)
+        except curl_cffi.requests.errors.RequestsError as e:
+            self._handle_read_error(e)
 
 
 @register_rh
@@ -312,6 +312,13 @@ def read(self, amt=None):
             handle_response_read_exceptions(e)
             raise e
 
+    def readinto(self, b):
+        try:
+            return self.fp.readinto(b)
+        except Exception as e:
+            handle_response_read_exceptions(e)
+            raise e
+
 
 def handle_sslerror(e: ssl.SSLError):
     if not isinstance(e, ssl.SSLError):
@@ -529,6 +529,17 @@ def read(self, amt: int = None) -> bytes:
         except Exception as e:
             raise TransportError(cause=e) from e
 
+    def readinto(self, b) -> int:
+        """
+        Read up to len(b) bytes into the writable buffer b and return the number of bytes read.
+        This copies the result of read(). Subclasses should redefine this method
+        to read into the buffer directly, when possible.
+        """
+        data = self.read(len(b))
+        with memoryview(b) as view:
+            view[:len(data)] = data
+        return len(data)
+
     def close(self):
         self.fp.close()
         return super().close()
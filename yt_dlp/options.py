@@ -389,6 +389,14 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
             'Use the value "auto" to let yt-dlp guess ("auto_warning" to emit a warning when guessing). '
             '"error" just throws an error. The default value "fixup_error" repairs broken URLs, '
             'but emits an error if this is not possible instead of searching'))
+    general.add_option(
+        '--serve', metavar='ADDRESS', dest='serve',
+        help=(
+            'Run a server at ADDRESS ([HOST:]PORT or unix:PATH) that accepts download jobs over HTTP, '
+            'keeping connections, caches and extractors warm between the jobs. See "Server mode" in the README for details'))
+    general.add_option(
+        '--serve-workers', metavar='N', dest='serve_workers', default=1, type=int,
+        help='Number of jobs the server runs at the same time (default is %default)')
     general.add_option(
         '--ignore-config', '--no-config',
         action='store_true', dest='ignoreconfig',
@@ -474,7 +482,7 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
                 'no-attach-info-json', 'embed-thumbnail-atomicparsley', 'no-external-downloader-progress',
                 'embed-metadata', 'seperate-video-versions', 'no-clean-infojson', 'no-keep-subs', 'no-certifi',
                 'no-youtube-channel-redirect', 'no-youtube-unavailable-videos', 'no-youtube-prefer-utc-upload-date',
-                'prefer-legacy-http-handler', 'manifest-filesize-approx'
+                'prefer-legacy-http-handler', 'manifest-filesize-approx', 'file-cache'
             }, 'aliases': {
                 'youtube-dl': ['all', '-multistreams', '-playlist-match-filter', '-manifest-filesize-approx'],
                 'youtube-dlc': ['all', '-no-youtube-channel-redirect', '-no-live-chat', '-playlist-match-filter', '-manifest-filesize-approx'],
@@ -678,7 +686,9 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
     selection.add_option(
         '--download-archive', metavar='FILE',
         dest='download_archive',
-        help='Download only videos not listed in the archive file. Record the IDs of all downloaded videos in it')
+        help=(
+            'Download only videos not listed in the archive file. Record the IDs of all downloaded videos in it. '
+            'An SQLite database is used if the file is one, or if it has a .sqlite, .sqlite3 or .db extension'))
     selection.add_option(
         '--no-download-archive',
         dest='download_archive', action="store_const", const=None,
@@ -912,6 +922,32 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
         '-N', '--concurrent-fragments',
         dest='concurrent_fragment_downloads', metavar='N', default=1, type=int,
         help='Number of fragments of a dash/hlsnative video that should be downloaded concurrently (default is %default)')
+    downloader.add_option(
+        '--fragment-host-connections',
+        dest='fragment_host_connections', metavar='N', default=None, type=int,
+        help=(
+            'Maximum number of fragments that are downloaded from the same host at a time, '
+            'counting all the concurrent downloads (default is no limit)'))
+    downloader.add_option(
+        '--concurrent-downloads',
+        dest='concurrent_downloads', metavar='N', default=1, type=int,
+        help=(
+            'Number of input URLs that should be extracted and downloaded concurrently (default is %default). '
+            '--max-downloads is then counted across all the URLs and the progress is printed on new lines'))
+    downloader.add_option(
+        '--concurrent-playlist-entries',
+        dest='concurrent_playlist_entries', metavar='N', default=1, type=int,
+        help=(
+            'Number of playlist entries that should be extracted and downloaded concurrently (default is %default). '
+            'The entries of nested playlists are processed sequentially'))
+    downloader.add_option(
+        '--concurrent-formats',
+        action='store_true', dest='concurrent_formats', default=True,
+        help='Download the formats that are to be merged at the same time (default)')
+    downloader.add_option(
+        '--no-concurrent-formats',
+        action='store_false', dest='concurrent_formats',
+        help='Download the formats that are to be merged one after the other')
     downloader.add_option(
         '-r', '--limit-rate', '--rate-limit',
         dest='ratelimit', metavar='RATE',
@@ -979,6 +1015,12 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
         help=(
             'Size of a chunk for chunk-based HTTP downloading, e.g. 10485760 or 10M (default is disabled). '
             'May be useful for bypassing bandwidth throttling imposed by a webserver (experimental)'))
+    downloader.add_option(
+        '--http-connections',
+        dest='http_connections', metavar='N', default=1, type=int,
+        help=(
+            'Number of connections used to download a file over HTTP in parallel segments (default is %default). '
+            'Only used for files of known size when the server supports Range requests'))
     downloader.add_option(
         '--test',
         action='store_true', dest='test', default=False,
@@ -1457,6 +1499,16 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
         '--no-write-comments', '--no-get-comments',
         action='store_false', dest='getcomments',
         help='Do not retrieve video comments unless the extraction is known to be quick (Alias: --no-get-comments)')
+    filesystem.add_option(
+        '--stream-comments',
+        action='store_true', dest='stream_comments', default=False,
+        help=(
+            'Write the comments to a temporary file as they are extracted instead of keeping them in memory. '
+            'Useful for videos with a very large number of comments'))
+    filesystem.add_option(
+        '--no-stream-comments',
+        action='store_false', dest='stream_comments',
+        help='Keep the extracted comments in memory (default)')
     filesystem.add_option(
         '--load-info-json', '--load-info',
         dest='load_info_filename', metavar='FILE',
@@ -1493,6 +1545,27 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
     filesystem.add_option(
         '--no-cache-dir', action='store_false', dest='cachedir',
         help='Disable filesystem caching')
+    filesystem.add_option(
+        '--extraction-cache', metavar='SECONDS',
+        dest='extraction_cache', type=float,
+        help=(
+            'Reuse the extracted information of videos from the cache dir for this many seconds. '
+            'The information is only reused when not downloading (e.g. with --simulate or --print), '
+            'and not after the format URLs expire'))
+    filesystem.add_option(
+        '--no-extraction-cache',
+        action='store_const', const=None, dest='extraction_cache',
+        help='Always extract the information of the videos (default)')
+    filesystem.add_option(
+        '--http-cache',
+        action='store_true', dest='http_cache', default=False,
+        help=(
+            'Store the HTTP responses of the requests that allow it (such as the YouTube player) in the cache dir '
+            'and reuse them while they are fresh, revalidating them when possible'))
+    filesystem.add_option(
+        '--no-http-cache',
+        action='store_false', dest='http_cache',
+        help='Do not use the HTTP cache (default)')
     filesystem.add_option(
         '--rm-cache-dir',
         action='store_true', dest='rm_cachedir',
@@ -1784,6 +1857,12 @@ def _alias_callback(option, opt_str, value, parser, opts, nargs):
             '"after_video" (after downloading and processing all formats of a video), '
             'or "playlist" (at end of playlist). '
             'This option can be used multiple times to add different postprocessors'))
+    postproc.add_option(
+        '--postprocessor-workers',
+        dest='postprocessor_workers', metavar='N', default=0, type=int,
+        help=(
+            'Number of videos to post-process in the background while the next ones are downloaded. '
+            'By default, each video is post-processed before the next one is downloaded'))
 
     sponsorblock = optparse.OptionGroup(parser, 'SponsorBlock Options', description=(
         'Make chapter entries for, or remove various segments (sponsor, introductions, etc.) '
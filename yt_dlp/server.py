@@ -0,0 +1,318 @@
+import hmac
+import http.server
+import ipaddress
+import json
+import optparse
+import queue
+import secrets
+import socketserver
+import threading
+import urllib.parse
+
+from . import parse_options
+from .YoutubeDL import YoutubeDL
+from .utils import DownloadCancelled, DownloadError, expand_path, traverse_obj
+from .version import __version__
+
+# Jobs with the same values of these params can share the network connections, cookies, cache and extractors
+_SHARED_STATE_PARAMS = (
+    'cachedir', 'cookiefile', 'cookiesfrombrowser', 'http_headers', 'proxy', 'geo_verification_proxy',
+    'source_address', 'impersonate', 'nocheckcertificate', 'legacyserverconnect', 'socket_timeout',
+    'client_certificate', 'client_certificate_key', 'client_certificate_password', 'enable_file_urls',
+    'username', 'password', 'twofactor', 'videopassword', 'usenetrc', 'netrc_location', 'netrc_cmd',
+    'ap_mso', 'ap_username', 'ap_password', 'geo_bypass', 'geo_bypass_country', 'geo_bypass_ip_block',
+    'extractor_args', 'compat_opts', 'debug_printtraffic',
+)
+
+_PROGRESS_FIELDS = (
+    'status', 'filename', 'downloaded_bytes', 'total_bytes', 'total_bytes_estimate',
+    'elapsed', 'eta', 'speed', 'fragment_index', 'fragment_count', 'postprocessor',
+)
+
+
+class _EventStream:
+    """Writes the events of a job to the response as JSON lines"""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def send(self, event_type, **kwargs):
+        data = json.dumps({'type': event_type, **kwargs}, default=repr).encode() + b'\n'
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self._wfile.write(data)
+                self._wfile.flush()
+            except OSError:
+                # The client disconnected; the job still runs to completion
+                self.closed = True
+
+    def progress_hook(self, d):
+        self.send('progress', id=traverse_obj(d, ('info_dict', 'id')), **{
+            k: d[k] for k in _PROGRESS_FIELDS if d.get(k) is not None})
+
+
+class _JobLogger:
+    def __init__(self, events):
+        self._events = events
+
+    def debug(self, msg):
+        self._events.send('log', level='debug' if msg.startswith('[debug] ') else 'info', message=msg)
+
+    def info(self, msg):
+        self._events.send('log', level='info', message=msg)
+
+    def warning(self, msg):
+        self._events.send('log', level='warning', message=msg)
+
+    def error(self, msg):
+        self._events.send('log', level='error', message=msg)
+
+
+class _JobOutput:
+    """Replaces stdout of the YoutubeDL instance, so that e.g. --print output is sent as events"""
+
+    def __init__(self, events):
+        self._events = events
+
+    def write(self, s):
+        for line in s.splitlines():
+            self._events.send('output', message=line)
+
+    def flush(self):
+        pass
+
+
+class _WarmState:
+    """The state that is kept between the jobs run in one worker slot"""
+
+    def __init__(self):
+        self.key = None
+        self.director = self.cookiejar = None
+        self.cache_memory = {}
+        self.extractors = {}
+
+    def attach(self, ydl):
+        key = json.dumps([ydl.params.get(k) for k in _SHARED_STATE_PARAMS], sort_keys=True, default=lambda x: (
+            sorted(map(repr, x)) if isinstance(x, (set, frozenset)) else repr(x)))
+        if key != self.key or 'cookiejar' in ydl.__dict__:
+            self.reset()
+            # Cookies passed in the Cookie header were already loaded into the cookiejar of this job
+            self.key = None if 'cookiejar' in ydl.__dict__ else key
+            return
+        if self.director is not None:
+            self.director.logger._ydl = ydl
+            ydl.__dict__['_request_director'] = self.director
+        if self.cookiejar is not None:
+            ydl.__dict__['cookiejar'] = self.cookiejar
+        ydl.cache._memory = self.cache_memory
+        for ie_key, ie in self.extractors.items():
+            if ie_key in ydl._ies:
+                ydl.add_info_extractor(ie)
+
+    def detach(self, ydl):
+        self.director = ydl.__dict__.pop('_request_director', None)
+        self.cookiejar = ydl.__dict__.get('cookiejar')
+        self.cache_memory, ydl.cache._memory = ydl.cache._memory, {}
+        self.extractors = dict(ydl._ies_instances)
+
+    def reset(self):
+        if self.director is not None:
+            self.director.close()
+        self.__init__()
+
+
+class JobServer:
+    """
+    Server that runs yt-dlp jobs while keeping the YoutubeDL machinery warm between them
+
+    POST /jobs with a JSON object {"args": [...], "params": {...}} runs a job with the given
+    command-line arguments (configuration files are not loaded), with params overriding the
+    resulting YoutubeDL params. The response streams the events of the job as JSON lines:
+    "log", "output" (stdout, e.g. of --print), "progress", and finally "finished" with the retcode.
+    GET / returns the version and the number of workers.
+
+    Since a job can run any command (e.g. with --exec), every request must have the header
+    "Authorization: Bearer TOKEN". Requests from web pages are rejected: those with an Origin header,
+    a Host header other than the address of the server (DNS rebinding), or jobs that are not
+    sent as application/json.
+
+    @param address: "HOST:PORT", "PORT" or "unix:PATH"
+    @param workers: Number of jobs that can run at the same time. Other jobs wait for a free worker
+    @param token:   The token the clients must send. Default is a random one
+    """
+
+    def __init__(self, address, workers=1, token=None):
+        self._slots = queue.Queue()
+        self.workers = workers
+        self.token = token or secrets.token_urlsafe(32)
+        for _ in range(workers):
+            self._slots.put(_WarmState())
+
+        handler = type('JobRequestHandler', (_JobRequestHandler,), {'job_server': self})
+        if address.startswith('unix:'):
+            self.httpd = _UnixHTTPServer(address[len('unix:'):], handler)
+        else:
+            host, _, port = address.rpartition(':')
+            self.httpd = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def is_allowed_host(self, host):
+        """Whether the Host header of a request is the address of the server"""
+        if isinstance(self.address, str):  # Unix socket; cannot be reached by browsers
+            return True
+        try:
+            parsed = urllib.parse.urlsplit(f'//{host}')
+            hostname, port = parsed.hostname, parsed.port or 80
+        except ValueError:
+            return False
+        server_host, server_port = self.address[:2]
+        server_ip = ipaddress.ip_address(server_host)
+        if not hostname or port != server_port:
+            return False
+        elif hostname == 'localhost':
+            return server_ip.is_loopback or server_ip.is_unspecified
+        try:
+            ip = ipaddress.ip_address(hostname)
+        except ValueError:  # Any other name may have been rebound to this address
+            return False
+        return ip == server_ip or server_ip.is_unspecified
+
+    def is_authorized(self, authorization):
+        scheme, _, token = (authorization or '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), self.token.encode())
+
+    def serve_forever(self):
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+
+    def close(self):
+        self.httpd.server_close()
+        while not self._slots.empty():
+            self._slots.get().reset()
+
+    def run_job(self, job, events):
+        args, params = job.get('args') or [], job.get('params') or {}
+        if not isinstance(args, list) or not isinstance(params, dict):
+            raise ValueError('"args" must be a list and "params" must be an object')
+        try:
+            _, opts, urls, ydl_opts = parse_options(list(map(str, args)))
+        except optparse.OptParseError as e:
+            raise ValueError(str(e).strip()) from e
+        except SystemExit as e:
+            raise ValueError('Options that exit, such as --help and --version, cannot be used in jobs') from e
+        if not urls and opts.load_info_filename is None:
+            raise ValueError('No URLs were given')
+        ydl_opts.update({'noprogress': True, **params, 'logger': _JobLogger(events)})
+        ydl_opts['progress_hooks'] = [*ydl_opts.get('progress_hooks', []), events.progress_hook]
+        ydl_opts['postprocessor_hooks'] = [*ydl_opts.get('postprocessor_hooks', []), events.progress_hook]
+
+        state = self._slots.get()
+        try:
+            ydl = YoutubeDL(ydl_opts, auto_init='no_verbose_header')
+            ydl._out_files.out = _JobOutput(events)
+            state.attach(ydl)
+            if ydl.params.get('verbose'):
+                ydl.print_debug_header()
+            try:
+                if opts.load_info_filename is not None:
+                    return ydl.download_with_info_file(expand_path(opts.load_info_filename))
+                return ydl.download(urls)
+            except DownloadCancelled:
+                return 101
+            except DownloadError:
+                return 1
+            finally:
+                state.detach(ydl)
+                ydl.close()
+        except BaseException:
+            state.reset()
+            raise
+        finally:
+            self._slots.put(state)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _JobRequestHandler(http.server.BaseHTTPRequestHandler):
+    job_server = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        data = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _check_request(self):
+        """Send an error and return False if the request is not allowed"""
+        if 'Origin' in self.headers or not self.job_server.is_allowed_host(self.headers.get('Host')):
+            self._send_json(403, {'error': 'Requests from web pages are not allowed'})
+        elif not self.job_server.is_authorized(self.headers.get('Authorization')):
+            self._send_json(401, {'error': 'Missing or invalid token'})
+        else:
+            return True
+        return False
+
+    def do_GET(self):
+        if not self._check_request():
+            return
+        if self.path != '/':
+            return self._send_json(404, {'error': 'Not found'})
+        self._send_json(200, {'version': __version__, 'workers': self.job_server.workers})
+
+    def do_POST(self):
+        if not self._check_request():
+            return
+        if self.path != '/jobs':
+            return self._send_json(404, {'error': 'Not found'})
+        if self.headers.get_content_type() != 'application/json':
+            return self._send_json(415, {'error': 'The job must be sent as application/json'})
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+            if not isinstance(job, dict):
+                raise ValueError('The job must be a JSON object')
+        except ValueError as e:
+            return self._send_json(400, {'error': f'Invalid job: {e}'})
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        events = _EventStream(self.wfile)
+        try:
+            retcode = self.job_server.run_job(job, events)
+        except ValueError as e:
+            events.send('finished', retcode=2, error=str(e))
+        except Exception as e:
+            events.send('finished', retcode=1, error=f'{type(e).__name__}: {e}')
+        else:
+            events.send('finished', retcode=retcode or 0)
+
+
+def serve(address, workers=1):
+    server = JobServer(address, workers)
+    address = server.address
+    print(f'[server] Listening on {address if isinstance(address, str) else "%s:%d" % address[:2]}', flush=True)
+    print(f'[server] Token: {server.token}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -42,6 +42,11 @@
 import urllib.request
 import xml.etree.ElementTree
 
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
 from . import traversal
 
 from ..compat import functools  # isort: split
@@ -186,6 +191,19 @@ def preferredencoding():
     return pref
 
 
+def _dump_json(obj, fp):
+    """ json.dump, but the JSONLinesList values of a dict are written without loading them into memory """
+    spooled = {k: v for k, v in obj.items() if isinstance(v, JSONLinesList)} if isinstance(obj, dict) else {}
+    if not spooled:
+        return json.dump(obj, fp, ensure_ascii=False)
+    head = json.dumps({k: v for k, v in obj.items() if k not in spooled}, ensure_ascii=False)
+    fp.write(head[:-1])
+    for i, (key, value) in enumerate(spooled.items()):
+        fp.write(f'{", " if i or head != "{}" else ""}{json.dumps(key, ensure_ascii=False)}: ')
+        value.dump(fp)
+    fp.write('}')
+
+
 def write_json_file(obj, fn):
     """ Encode obj as JSON and write it to fn, atomically if possible """
 
@@ -195,7 +213,7 @@ def write_json_file(obj, fn):
 
     try:
         with tf:
-            json.dump(obj, tf, ensure_ascii=False)
+            _dump_json(obj, tf)
         if sys.platform == 'win32':
             # Need to remove existing file on Windows, else os.rename raises
             # WindowsError or FileExistsError.
@@ -2250,6 +2268,63 @@ def __str__(self):
         return repr(self.exhaust())
 
 
+class JSONLinesList(collections.abc.Sequence):
+    """List of JSON-serializable objects that is kept in a temporary file as JSON lines
+    Only the offsets of the items are held in memory. Slices are lists and not JSONLinesList"""
+
+    def __init__(self, iterable=()):
+        self._file = tempfile.TemporaryFile(mode='w+b')
+        self._offsets = []
+        self._end = 0
+        for item in iterable:
+            self.append(item)
+
+    def append(self, item):
+        data = json.dumps(item, ensure_ascii=False).encode() + b'\n'
+        self._file.seek(self._end)
+        self._file.write(data)
+        self._offsets.append(self._end)
+        self._end += len(data)
+
+    def _lines(self, start=0):
+        self._file.seek(self._offsets[start] if start < len(self._offsets) else self._end)
+        pos = self._file.tell()
+        while pos < self._end:
+            line = self._file.readline()
+            pos += len(line)
+            yield line
+            # The file position may have been moved by another operation in between
+            self._file.seek(pos)
+
+    def __iter__(self):
+        for line in self._lines():
+            yield json.loads(line)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return json.loads(next(self._lines(range(len(self))[idx])))
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def dump(self, fp):
+        """Write the items to the text file fp as a JSON array"""
+        fp.write('[')
+        for i, line in enumerate(self._lines()):
+            fp.write(f'{", " if i else ""}{line.decode().rstrip()}')
+        fp.write(']')
+
+    def __repr__(self):
+        return f'<{type(self).__name__} of {len(self)} items>'
+
+
 class PagedList:
 
     class IndexError(IndexError):
@@ -5142,6 +5217,205 @@ def orderedSet_from_options(options, alias_dict, *, use_regex=False, start=None)
     return orderedSet(requested)
 
 
+def url_host_labels(pattern):
+    """
+    Find the host labels of http(s) URLs that can be matched by a regex
+
+    The regex is only analysed up to the end of the host. Any URL it matches (with re.match)
+    is guaranteed to have one of the returned labels as a dot-separated component of the
+    text between "://" and the first "/" (compared case-insensitively)
+
+    @param pattern      Regex pattern string
+    @returns            A set of lowercase labels; empty if the regex cannot match any http(s) URL.
+                        None if the labels cannot be determined
+    """
+    SCHEMES = ('http://', 'https://')
+    GENERIC_LABELS = {'ac', 'co', 'com', 'edu', 'gov', 'ne', 'net', 'or', 'org', 'www'}
+    SINGLE_CHAR_OPS = (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.ANY, sre_parse.IN)
+    REPEAT_OPS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+    ZERO_WIDTH_OPS = (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT)
+    CATEGORIES = {
+        sre_parse.CATEGORY_DIGIT: str.isdigit,
+        sre_parse.CATEGORY_SPACE: str.isspace,
+        sre_parse.CATEGORY_WORD: lambda c: c.isalnum() or c == '_',
+    }
+
+    def in_category(category, char):
+        for cat, func in CATEGORIES.items():
+            if category == cat:
+                return func(char)
+            elif category.name == cat.name.replace('CATEGORY_', 'CATEGORY_NOT_'):
+                return not func(char)
+        return True
+
+    def char_matches(op, av, char):
+        """Whether the single character atom may match the char"""
+        if op == sre_parse.ANY:
+            return char != '\n'
+        elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL):
+            return (chr(av).lower() == char.lower()) == (op == sre_parse.LITERAL)
+        negate = False
+        for set_op, set_av in av:
+            if set_op == sre_parse.NEGATE:
+                negate = True
+            elif set_op == sre_parse.LITERAL:
+                if chr(set_av).lower() == char.lower():
+                    return not negate
+            elif set_op == sre_parse.RANGE:
+                if any(set_av[0] <= ord(c) <= set_av[1] for c in (char, char.lower(), char.upper())):
+                    return not negate
+            elif set_op == sre_parse.CATEGORY:
+                if in_category(set_av, char):
+                    return not negate
+            else:  # Unknown set item; assume it can match
+                return True
+        return negate
+
+    def may_match_slash(items):
+        for op, av in items:
+            if op in SINGLE_CHAR_OPS:
+                if char_matches(op, av, '/'):
+                    return True
+            elif op in REPEAT_OPS:
+                if may_match_slash(av[2]):
+                    return True
+            elif op == sre_parse.SUBPATTERN:
+                if may_match_slash(av[-1]):
+                    return True
+            elif op == sre_parse.BRANCH:
+                if any(map(may_match_slash, av[1])):
+                    return True
+            elif op not in ZERO_WIDTH_OPS:
+                return True
+        return False
+
+    def ends_with_dot(items):
+        op, av = items[-1] if items else (None, None)
+        if op == sre_parse.SUBPATTERN:
+            return ends_with_dot(av[-1])
+        return op == sre_parse.LITERAL and chr(av) == '.'
+
+    def more_specific(label, best):
+        return label if not best or label not in GENERIC_LABELS else best
+
+    # Each path through the regex is walked with a state of either
+    #   (False, frozenset of (scheme, position)) while matching the scheme, or
+    #   (True, (current label or None if it is not literal, most specific complete label)) while in the host
+    # The remaining items of the path are kept as a linked list of (items, index, next)
+    results, steps = set(), 0
+    stack = [((sre_parse.parse(pattern), 0, None), (False, frozenset((scheme, 0) for scheme in SCHEMES)))]
+    while stack:
+        rest, (in_host, state) = stack.pop()
+        while rest and rest[1] >= len(rest[0]):
+            rest = rest[2]
+        if not rest:
+            if not in_host or not state[1]:  # Pattern ends before the host has a complete label
+                return None
+            results.add(state[1])
+            continue
+        steps += 1
+        if steps > 100000:  # Too many alternatives
+            return None
+
+        (op, av), rest = rest[0][rest[1]], (rest[0], rest[1] + 1, rest[2])
+        if op in ZERO_WIDTH_OPS:
+            stack.append((rest, (in_host, state)))
+        elif op == sre_parse.SUBPATTERN:
+            stack.append(((av[-1], 0, rest), (in_host, state)))
+        elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+            stack.append(((av, 0, rest), (in_host, state)))
+        elif op == sre_parse.BRANCH:
+            stack.extend(((branch, 0, rest), (in_host, state)) for branch in reversed(av[1]))
+        elif op == sre_parse.GROUPREF_EXISTS:
+            stack.extend(((branch or (), 0, rest), (in_host, state)) for branch in av[1:])
+        elif op in REPEAT_OPS:
+            min_count, max_count, sub = av
+            if min_count > 0:
+                stack.append(((sub, 0, ([(op, (min_count - 1, max_count - 1, sub))], 0, rest)), (in_host, state)))
+            elif max_count == 1:
+                stack.extend(((rest, (in_host, state)), ((sub, 0, rest), (in_host, state))))
+            elif max_count == 0:
+                stack.append((rest, (in_host, state)))
+            elif not in_host:
+                return None
+            elif may_match_slash(sub):  # The host may have ended
+                stack.append((None, (in_host, state)))
+            else:  # Repeated an unknown number of times; so this cannot be a part of a label
+                stack.extend(((rest, (in_host, state)), (rest, (in_host, ('' if ends_with_dot(sub) else None, state[1])))))
+        elif not in_host:
+            if op not in SINGLE_CHAR_OPS:
+                return None
+            state = frozenset((scheme, pos + 1) for scheme, pos in state if char_matches(op, av, scheme[pos]))
+            done = {pos == len(scheme) for scheme, pos in state}
+            if done == {True}:
+                stack.append((rest, (True, ('', ''))))
+            elif True in done:
+                return None
+            elif state:
+                stack.append((rest, (False, state)))
+        elif op == sre_parse.LITERAL and chr(av) != '/':
+            label, best = state
+            char = chr(av).lower()
+            if char != '.':
+                stack.append((rest, (True, (None if label is None else label + char, best))))
+            elif label:
+                stack.append((rest, (True, ('', more_specific(label, best)))))
+            else:
+                stack.append((rest, (True, ('', best))))
+        elif op in SINGLE_CHAR_OPS and not char_matches(op, av, '/'):
+            stack.append((rest, (True, (None, state[1]))))
+        else:  # May match "/", so the host may have ended
+            stack.append((None, (True, state)))
+
+    return results
+
+
+def required_literals(pattern):
+    """
+    Find literal strings, one of which is present in every match of a regex
+
+    @param pattern      Regex pattern string
+    @returns            A set of strings. None if no such strings could be determined
+    """
+    REPEAT_OPS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None)}
+
+    def score(literals):
+        return min(map(len, literals)) if literals else 0
+
+    def required(items):
+        best, run = None, ''
+        for op, av in (*items, (None, None)):
+            if op == sre_parse.LITERAL:
+                run += chr(av)
+                continue
+            candidates = [{run}]
+            if op == sre_parse.SUBPATTERN:
+                if av[1] & re.IGNORECASE:
+                    raise ValueError('Case-insensitive regex')
+                candidates.append(required(av[-1]))
+            elif op == getattr(sre_parse, 'ATOMIC_GROUP', None):
+                candidates.append(required(av))
+            elif op in REPEAT_OPS and av[0] > 0:
+                candidates.append(required(av[2]))
+            elif op == sre_parse.BRANCH:
+                branches = list(map(required, av[1]))
+                if None not in branches:
+                    candidates.append(set().union(*branches))
+            for literals in candidates:
+                if score(literals) > score(best):
+                    best = literals
+            run = ''
+        return best if score(best) else None
+
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    try:
+        return required(parsed)
+    except ValueError:
+        return None
+
+
 # TODO: Rewrite
 class FormatSorter:
     regex = r' *((?P<reverse>\+)?(?P<field>[a-zA-Z0-9_]+)((?P<separator>[~:])(?P<limit>.*?))?)? *$'